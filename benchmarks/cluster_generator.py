@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Seeded generator of synthetic clusters for the benchmarks."""
+from __future__ import absolute_import
+from __future__ import division
+
+import bisect
+import random
+from argparse import Namespace
+
+from six.moves import range
+
+from kafka_utils.kafka_cluster_manager.cluster_info.cluster_topology \
+    import ClusterTopology
+from kafka_utils.kafka_cluster_manager.cluster_info.partition_measurer \
+    import PartitionMeasurer
+
+DISTRIBUTIONS = {
+    'constant': lambda rand: 1.0,
+    'uniform': lambda rand: rand.uniform(0.0, 2.0),
+    'exponential': lambda rand: rand.expovariate(1.0),
+    'lognormal': lambda rand: rand.lognormvariate(0.0, 1.0),
+    'pareto': lambda rand: rand.paretovariate(1.5),
+}
+
+
+class SyntheticCluster(object):
+    """A randomly generated cluster.
+
+    Topic i gets a share of the partitions proportional to
+    (i + 1) ** -topic_skew, so a topic_skew of 0 gives every topic the same
+    number of partitions. Replicas are placed on distinct brokers drawn with
+    probability proportional to (b + 1) ** -broker_skew, so a broker_skew of
+    0 gives an assignment that is balanced on average and larger values load
+    the first brokers more heavily. Broker b belongs to the replication group
+    b % replication_groups.
+
+    The weight and size of each topic are drawn from the given distributions
+    and every partition of a topic gets the weight and size of the topic,
+    scaled by a random factor between 0.8 and 1.2.
+
+    :param brokers: The number of brokers.
+    :param replication_groups: The number of replication groups.
+    :param topics: The number of topics.
+    :param partitions: The total number of partitions. Must be at least the
+        number of topics.
+    :param replication_factor: The replication factor of every partition.
+    :param topic_skew: The skew of the number of partitions per topic.
+    :param broker_skew: The skew of the number of replicas per broker.
+    :param weight_distribution: The name of the distribution of the weights
+        in DISTRIBUTIONS.
+    :param size_distribution: The name of the distribution of the sizes in
+        DISTRIBUTIONS.
+    :param seed: The random seed. The same parameters and seed always
+        generate the same cluster.
+    """
+
+    def __init__(
+            self,
+            brokers=50,
+            replication_groups=1,
+            topics=100,
+            partitions=2000,
+            replication_factor=3,
+            topic_skew=0.0,
+            broker_skew=0.0,
+            weight_distribution='constant',
+            size_distribution='constant',
+            seed=0,
+    ):
+        if partitions < topics:
+            raise ValueError("Every topic needs at least one partition.")
+        if replication_factor > brokers:
+            raise ValueError("The replication factor exceeds the brokers.")
+        self.params = {
+            'brokers': brokers,
+            'replication_groups': replication_groups,
+            'topics': topics,
+            'partitions': partitions,
+            'replication_factor': replication_factor,
+            'topic_skew': topic_skew,
+            'broker_skew': broker_skew,
+            'weight_distribution': weight_distribution,
+            'size_distribution': size_distribution,
+            'seed': seed,
+        }
+        rand = random.Random(seed)
+        self.replication_groups = replication_groups
+        self.brokers = {
+            broker_id: {'host': 'broker{0}'.format(broker_id)}
+            for broker_id in range(brokers)
+        }
+
+        topic_partitions = _split(
+            partitions,
+            [(topic + 1) ** -topic_skew for topic in range(topics)],
+        )
+        broker_cdf = _cdf(
+            [(broker + 1) ** -broker_skew for broker in range(brokers)],
+        )
+        weight = DISTRIBUTIONS[weight_distribution]
+        size = DISTRIBUTIONS[size_distribution]
+        self.assignment = {}
+        self.weights = {}
+        self.sizes = {}
+        for topic, count in enumerate(topic_partitions):
+            topic_id = 'T{0}'.format(topic)
+            topic_weight = weight(rand)
+            topic_size = size(rand)
+            for partition_id in range(count):
+                name = (topic_id, partition_id)
+                self.assignment[name] = _sample(
+                    rand,
+                    broker_cdf,
+                    replication_factor,
+                )
+                self.weights[name] = topic_weight * rand.uniform(0.8, 1.2)
+                self.sizes[name] = topic_size * rand.uniform(0.8, 1.2)
+
+    def extract_group(self, broker):
+        return 'rg{0}'.format(broker.id % self.replication_groups)
+
+    def cluster_topology(self):
+        """Return a new ClusterTopology of the cluster."""
+        return ClusterTopology(
+            self.assignment,
+            self.brokers,
+            SyntheticPartitionMeasurer(self),
+            self.extract_group,
+        )
+
+
+class SyntheticPartitionMeasurer(PartitionMeasurer):
+    """A PartitionMeasurer returning the weights and sizes of a
+    SyntheticCluster.
+
+    :param cluster: The SyntheticCluster.
+    """
+
+    def __init__(self, cluster):
+        super(SyntheticPartitionMeasurer, self).__init__(
+            None,
+            cluster.brokers,
+            cluster.assignment,
+            Namespace(),
+        )
+        self.cluster = cluster
+
+    def get_weight(self, partition_name):
+        return self.cluster.weights[partition_name]
+
+    def get_size(self, partition_name):
+        return self.cluster.sizes[partition_name]
+
+
+def _split(total, shares):
+    """Split total into one positive integer per share, proportionally to
+    the shares.
+    """
+    # Every part gets one element and the rest is split proportionally, with
+    # the remainder going to the largest shares.
+    rest = total - len(shares)
+    share_sum = sum(shares)
+    parts = [1 + int(rest * share / share_sum) for share in shares]
+    by_share = sorted(range(len(shares)), key=lambda i: -shares[i])
+    for i in range(total - sum(parts)):
+        parts[by_share[i % len(shares)]] += 1
+    return parts
+
+
+def _cdf(weights):
+    """Return the cumulative distribution of weights."""
+    total = sum(weights)
+    cdf = []
+    cumulative = 0.0
+    for weight in weights:
+        cumulative += weight
+        cdf.append(cumulative / total)
+    return cdf
+
+
+def _sample(rand, cdf, count):
+    """Return count distinct indexes drawn from the cumulative distribution
+    cdf.
+    """
+    sample = []
+    while len(sample) < count:
+        index = min(bisect.bisect(cdf, rand.random()), len(cdf) - 1)
+        if index not in sample:
+            sample.append(index)
+    return sample
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Compare two JSON reports written by benchmarks.suite.
+
+Usage: python -m benchmarks.compare BASE_REPORT NEW_REPORT
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import argparse
+import json
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('base')
+    parser.add_argument('new')
+    return parser.parse_args()
+
+
+def load_results(path):
+    """Return the cluster parameters and the results of a report keyed by
+    (balancer, operation, case). The case of the results that aren't part of
+    a scaling case is empty.
+    """
+    with open(path) as report_file:
+        report = json.load(report_file)
+    return report['cluster'], {
+        (
+            result['balancer'],
+            result['operation'],
+            result.get('case', ''),
+        ): result
+        for result in report['results']
+    }
+
+
+def ratio(base, new):
+    """Return new / base formatted for display."""
+    if base is None or new is None:
+        return '-'
+    if not base:
+        return 'n/a'
+    return '{0:.2f}x'.format(new / base)
+
+
+def main():
+    args = parse_args()
+    base_cluster, base = load_results(args.base)
+    new_cluster, new = load_results(args.new)
+    if base_cluster != new_cluster:
+        print('Warning: the reports were run on different clusters.')
+
+    print('{0:<40} {1:>10} {2:>10} {3:>8} {4:>8} {5:>10}'.format(
+        'balancer operation', 'base (s)', 'new (s)', 'time', 'memory', 'score',
+    ))
+    for key in sorted(set(base) | set(new)):
+        base_result = base.get(key, {})
+        new_result = new.get(key, {})
+        base_seconds = base_result.get('seconds')
+        new_seconds = new_result.get('seconds')
+        base_score = base_result.get('score')
+        new_score = new_result.get('score')
+        print('{0:<40} {1:>10} {2:>10} {3:>8} {4:>8} {5:>10}'.format(
+            ' '.join(part for part in key if part),
+            '-' if base_seconds is None else '{0:.3f}'.format(base_seconds),
+            '-' if new_seconds is None else '{0:.3f}'.format(new_seconds),
+            ratio(base_seconds, new_seconds),
+            ratio(
+                base_result.get('peak_memory_bytes'),
+                new_result.get('peak_memory_bytes'),
+            ),
+            '-' if base_score is None or new_score is None
+            else '{0:+.4f}'.format(new_score - base_score),
+        ))
+
+
+if __name__ == '__main__':
+    main()
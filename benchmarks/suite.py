@@ -0,0 +1,436 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Time the operations of every cluster balancer on a synthetic cluster and
+write a JSON report that can be compared across commits with
+benchmarks.compare.
+
+Each operation runs on a fresh cluster topology. The reported time is the
+best of --repeat runs. Peak memory is measured with tracemalloc in a separate
+run, when tracemalloc is available.
+
+The scaling cases additionally rebalance larger clusters, with the cluster
+parameters and the movement limit of each case, to track how the balancers
+that are fast enough for them scale.
+
+Usage: python -m benchmarks.suite [--brokers N] [--output FILE]
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import argparse
+import json
+import platform
+import shlex
+import subprocess
+import sys
+import time
+import traceback
+from argparse import Namespace
+
+from six.moves import range
+
+from .cluster_generator import DISTRIBUTIONS
+from .cluster_generator import SyntheticCluster
+from kafka_utils.kafka_cluster_manager.cluster_info.genetic_balancer \
+    import GeneticBalancer
+from kafka_utils.kafka_cluster_manager.cluster_info.local_search_balancer \
+    import LocalSearchBalancer
+from kafka_utils.kafka_cluster_manager.cluster_info.min_cost_flow_balancer \
+    import MinCostFlowBalancer
+from kafka_utils.kafka_cluster_manager.cluster_info.partition_count_balancer \
+    import PartitionCountBalancer
+from kafka_utils.kafka_cluster_manager.cluster_info.stats \
+    import calculate_partition_movement
+from kafka_utils.kafka_cluster_manager.cluster_info.stats \
+    import coefficient_of_variation
+from kafka_utils.kafka_cluster_manager.cluster_info.stats \
+    import get_broker_leader_counts
+from kafka_utils.kafka_cluster_manager.cluster_info.stats \
+    import get_broker_partition_counts
+from kafka_utils.kafka_cluster_manager.cluster_info.stats \
+    import get_broker_weights
+from kafka_utils.kafka_cluster_manager.cluster_info.stats \
+    import get_net_imbalance
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+REPORT_VERSION = 1
+
+BALANCERS = {
+    'partition_count': PartitionCountBalancer,
+    'genetic': GeneticBalancer,
+    'local_search': LocalSearchBalancer,
+    'min_cost_flow': MinCostFlowBalancer,
+}
+
+DEFAULT_BALANCER_ARGS = {
+    'partition_count': '',
+    'genetic': '--num-gens 20 --max-exploration 2000',
+    'local_search': '--max-iterations 1000 --neighborhood-size 20',
+    'min_cost_flow': '',
+}
+
+OPERATIONS = [
+    'rebalance',
+    'decommission_brokers',
+    'revoke_leadership',
+    'add_replica',
+    'score',
+    'build_state',
+]
+
+# The balancer, the cluster parameters and the movement limit of the scaling
+# cases, that are rebalanced in addition to the synthetic cluster.
+SCALING_CASES = {
+    'min_cost_flow_2k': (
+        'min_cost_flow',
+        {'brokers': 50, 'topics': 100, 'partitions': 2000},
+        100,
+    ),
+    'min_cost_flow_10k': (
+        'min_cost_flow',
+        {
+            'brokers': 100,
+            'replication_groups': 3,
+            'topics': 500,
+            'partitions': 10000,
+        },
+        500,
+    ),
+}
+
+# The balancer method that an operation needs, when it is not named after the
+# operation. build_state times building the internal state of the balancers
+# that derive from GeneticBalancer.
+OPERATION_METHODS = {
+    'build_state': '_create_state',
+}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    cluster = parser.add_argument_group('synthetic cluster')
+    cluster.add_argument('--brokers', type=int, default=50)
+    cluster.add_argument('--replication-groups', type=int, default=1)
+    cluster.add_argument('--topics', type=int, default=100)
+    cluster.add_argument('--partitions', type=int, default=2000)
+    cluster.add_argument('--replication-factor', type=int, default=3)
+    cluster.add_argument(
+        '--topic-skew',
+        type=float,
+        default=0.0,
+        help='Skew of the number of partitions per topic. 0 gives every'
+        ' topic the same number of partitions. Default: %(default)s',
+    )
+    cluster.add_argument(
+        '--broker-skew',
+        type=float,
+        default=0.0,
+        help='Skew of the initial number of replicas per broker. 0 places'
+        ' replicas uniformly at random. Default: %(default)s',
+    )
+    cluster.add_argument(
+        '--weight-distribution',
+        choices=sorted(DISTRIBUTIONS),
+        default='constant',
+    )
+    cluster.add_argument(
+        '--size-distribution',
+        choices=sorted(DISTRIBUTIONS),
+        default='constant',
+    )
+    cluster.add_argument('--seed', type=int, default=0)
+
+    parser.add_argument(
+        '--balancers',
+        nargs='+',
+        choices=sorted(BALANCERS),
+        default=sorted(BALANCERS),
+    )
+    parser.add_argument(
+        '--operations',
+        nargs='+',
+        choices=OPERATIONS,
+        default=OPERATIONS,
+    )
+    for name in sorted(BALANCERS):
+        parser.add_argument(
+            '--{0}-balancer-args'.format(name.replace('_', '-')),
+            default=DEFAULT_BALANCER_ARGS[name],
+            help='Default: "%(default)s"',
+        )
+    parser.add_argument(
+        '--scaling-cases',
+        nargs='*',
+        choices=sorted(SCALING_CASES),
+        default=sorted(SCALING_CASES),
+        help='Scaling cases to run. Pass no case to skip them.'
+        ' Default: %(default)s',
+    )
+    parser.add_argument(
+        '--max-partition-movements',
+        type=int,
+        default=100,
+        help='Movement limit of rebalance. Default: %(default)s',
+    )
+    parser.add_argument(
+        '--decommission-count',
+        type=int,
+        default=1,
+        help='Number of brokers decommissioned and revoked from leadership.'
+        ' Default: %(default)s',
+    )
+    parser.add_argument(
+        '--add-replica-count',
+        type=int,
+        default=100,
+        help='Number of partitions add_replica is called on.'
+        ' Default: %(default)s',
+    )
+    parser.add_argument(
+        '--score-count',
+        type=int,
+        default=100,
+        help='Number of times score is called. Default: %(default)s',
+    )
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument(
+        '--no-memory',
+        dest='memory',
+        action='store_false',
+        help='Skip the peak memory measurement.',
+    )
+    parser.add_argument(
+        '--output',
+        '-o',
+        help='File to write the JSON report to. Default: standard output',
+    )
+    return parser.parse_args(argv)
+
+
+def create_balancer(name, cluster_topology, args):
+    """Return a new balancer of the given name acting on cluster_topology."""
+    balancer_args = getattr(
+        args,
+        '{0}_balancer_args'.format(name),
+    )
+    return BALANCERS[name](cluster_topology, Namespace(
+        replication_groups=args.replication_groups > 1,
+        brokers=True,
+        leaders=True,
+        max_partition_movements=args.max_partition_movements,
+        max_movement_size=None,
+        max_leader_changes=None,
+        balancer_args=shlex.split(balancer_args),
+    ))
+
+
+def prepare(operation, balancer, args):
+    """Return a function with no arguments that runs operation on
+    balancer.
+    """
+    brokers = sorted(balancer.cluster_topology.brokers)
+    broker_ids = brokers[len(brokers) - args.decommission_count:]
+    if operation == 'rebalance':
+        return balancer.rebalance
+    if operation == 'decommission_brokers':
+        return lambda: balancer.decommission_brokers(broker_ids)
+    if operation == 'revoke_leadership':
+        return lambda: balancer.revoke_leadership(broker_ids)
+    if operation == 'add_replica':
+        partition_names = sorted(balancer.cluster_topology.partitions)
+        partition_names = partition_names[:args.add_replica_count]
+
+        def add_replicas():
+            for partition_name in partition_names:
+                balancer.add_replica(partition_name)
+        return add_replicas
+    if operation == 'score':
+        def score():
+            for _ in range(args.score_count):
+                balancer.score()
+        return score
+    if operation == 'build_state':
+        cluster_topology = balancer.cluster_topology
+        return lambda: balancer._create_state(
+            cluster_topology,
+            brokers=cluster_topology.active_brokers,
+        )
+    raise ValueError(operation)
+
+
+def measure(cluster, name, operation, args, case=None):
+    """Run operation with the balancer of the given name and return the
+    result entry of the report.
+    """
+    result = {'balancer': name, 'operation': operation}
+    if case is not None:
+        result['case'] = case
+    if not hasattr(
+            BALANCERS[name],
+            OPERATION_METHODS.get(operation, operation),
+    ):
+        result['error'] = 'Not supported.'
+        return result
+    try:
+        timings = []
+        for _ in range(args.repeat):
+            cluster_topology = cluster.cluster_topology()
+            original = cluster_topology.assignment
+            balancer = create_balancer(name, cluster_topology, args)
+            run = prepare(operation, balancer, args)
+            start = time.time()
+            run()
+            timings.append(time.time() - start)
+        result['seconds'] = min(timings)
+        result.update(evaluate(balancer, original))
+
+        if args.memory and tracemalloc is not None:
+            balancer = create_balancer(name, cluster.cluster_topology(), args)
+            run = prepare(operation, balancer, args)
+            tracemalloc.start()
+            try:
+                run()
+                result['peak_memory_bytes'] = \
+                    tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+    except Exception:
+        result['error'] = traceback.format_exc().strip().splitlines()[-1]
+    return result
+
+
+def scaling_case(name, args):
+    """Return the synthetic cluster and the arguments of the scaling case of
+    the given name.
+    """
+    balancer, params, max_partition_movements = SCALING_CASES[name]
+    case_args = Namespace(**vars(args))
+    for param, value in params.items():
+        setattr(case_args, param, value)
+    case_args.max_partition_movements = max_partition_movements
+    return balancer, create_cluster(case_args), case_args
+
+
+def create_cluster(args):
+    """Return the synthetic cluster described by args."""
+    return SyntheticCluster(
+        brokers=args.brokers,
+        replication_groups=args.replication_groups,
+        topics=args.topics,
+        partitions=args.partitions,
+        replication_factor=args.replication_factor,
+        topic_skew=args.topic_skew,
+        broker_skew=args.broker_skew,
+        weight_distribution=args.weight_distribution,
+        size_distribution=args.size_distribution,
+        seed=args.seed,
+    )
+
+
+def evaluate(balancer, original):
+    """Return the score and the balance statistics of the cluster topology
+    of balancer after an operation.
+    """
+    cluster_topology = balancer.cluster_topology
+    brokers = sorted(
+        cluster_topology.active_brokers,
+        key=lambda broker: broker.id,
+    )
+    _, movements = calculate_partition_movement(
+        original,
+        cluster_topology.assignment,
+    )
+    return {
+        'score': balancer.score(),
+        'partition_imbalance': get_net_imbalance(
+            get_broker_partition_counts(brokers),
+        ),
+        'leader_imbalance': get_net_imbalance(
+            get_broker_leader_counts(brokers),
+        ),
+        'weight_cv': coefficient_of_variation(get_broker_weights(brokers)),
+        'partition_movements': movements,
+    }
+
+
+def git_commit():
+    """Return the hash of the checked out commit, or None."""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'],
+            stderr=subprocess.STDOUT,
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    cluster = create_cluster(args)
+    results = []
+    for name in args.balancers:
+        for operation in args.operations:
+            result = measure(cluster, name, operation, args)
+            print(format_result(result), file=sys.stderr)
+            results.append(result)
+    for case in args.scaling_cases:
+        name, case_cluster, case_args = scaling_case(case, args)
+        result = measure(case_cluster, name, 'rebalance', case_args, case)
+        print(format_result(result), file=sys.stderr)
+        results.append(result)
+
+    report = {
+        'version': REPORT_VERSION,
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'timestamp': time.time(),
+        'cluster': cluster.params,
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2, sort_keys=True)
+    else:
+        json.dump(report, sys.stdout, indent=2, sort_keys=True)
+        print()
+
+
+def format_result(result):
+    """Return a one-line summary of a result entry."""
+    if 'case' in result:
+        result = dict(result, operation='{operation} ({case})'.format(
+            **result
+        ))
+    if 'error' in result:
+        return '{balancer} {operation}: {error}'.format(**result)
+    return (
+        '{balancer} {operation}: {seconds:.3f}s, score {score}, '
+        '{partition_movements} movement(s), peak memory {memory}'.format(
+            memory=result.get('peak_memory_bytes'),
+            **result
+        )
+    )
+
+
+if __name__ == '__main__':
+    main()
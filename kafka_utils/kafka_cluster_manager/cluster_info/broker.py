@@ -15,19 +15,44 @@
 from __future__ import absolute_import
 
 import logging
-
-from six.moves import filter
+from collections import defaultdict
 
 
 class Broker(object):
     """Represent a Kafka broker.
     A broker object contains as attributes the broker id, metadata
     (content of the broker node in zookeeper), partitions and replication group.
+
+    The per-topic partition counts, the weight, the size and the leader count
+    and weight of the broker are computed on first access and then kept up to
+    date by add_partition, remove_partition and the leadership changes
+    reported by Partition, so the partitions of a broker must only be changed
+    through these methods. The changes of the partitions are also reported to
+    the replication group of the broker.
+
+    When a journal is given, add_partition, remove_partition and
+    move_partition record how to undo their changes in it.
     """
 
+    __slots__ = (
+        '_id',
+        '_metadata',
+        '_partitions',
+        '_decommissioned',
+        '_revoked_leadership',
+        '_inactive',
+        '_replication_group',
+        '_topic_counts',
+        '_weight',
+        '_size',
+        '_leader_count',
+        '_leader_weight',
+        '_journal',
+    )
+
     log = logging.getLogger(__name__)
 
-    def __init__(self, id, metadata=None, partitions=None):
+    def __init__(self, id, metadata=None, partitions=None, journal=None):
         self._id = id
         self._metadata = metadata
         self._partitions = partitions or set()
@@ -35,6 +60,13 @@ class Broker(object):
         self._revoked_leadership = False
         self._inactive = False
         self._replication_group = None
+        # Aggregates of the partitions, None until first computed.
+        self._topic_counts = None
+        self._weight = None
+        self._size = None
+        self._leader_count = None
+        self._leader_weight = None
+        self._journal = journal
 
     @property
     def metadata(self):
@@ -64,7 +96,11 @@ class Broker(object):
 
     @replication_group.setter
     def replication_group(self, group):
+        if self._replication_group is not None:
+            self._replication_group.reset_aggregates()
         self._replication_group = group
+        if group is not None:
+            group.reset_aggregates()
 
     @property
     def decommissioned(self):
@@ -85,25 +121,75 @@ class Broker(object):
     @property
     def topics(self):
         """Return the set of topics current in broker."""
-        return set([partition.topic for partition in self._partitions])
+        return set(self._get_topic_counts())
 
     @property
     def weight(self):
         """Return the total weight of all partitions on this broker."""
-        return sum(partition.weight for partition in self.partitions)
+        if self._weight is None:
+            self._weight = sum(partition.weight for partition in self._partitions)
+        return self._weight
 
     @property
     def size(self):
         """Return the total size of all partitions on this broker."""
-        return sum(partition.size for partition in self.partitions)
+        if self._size is None:
+            self._size = sum(partition.size for partition in self._partitions)
+        return self._size
 
     @property
     def leader_weight(self):
-        return sum(
-            partition.weight
-            for partition in self.partitions
-            if partition.leader == self
-        )
+        if self._leader_weight is None:
+            self._leader_weight = sum(
+                partition.weight
+                for partition in self._partitions
+                if partition.leader == self
+            )
+        return self._leader_weight
+
+    def _get_topic_counts(self):
+        """Return a dict mapping each topic to the number of its partitions
+        on this broker.
+        """
+        if self._topic_counts is None:
+            self._topic_counts = defaultdict(int)
+            for partition in self._partitions:
+                self._topic_counts[partition.topic] += 1
+        return self._topic_counts
+
+    def _update_aggregates(self, partition, sign):
+        """Update the aggregates that have been computed for partition being
+        added to (sign 1) or removed from (sign -1) this broker.
+        """
+        if self._topic_counts is not None:
+            topic = partition.topic
+            self._topic_counts[topic] += sign
+            if not self._topic_counts[topic]:
+                del self._topic_counts[topic]
+        if self._weight is not None:
+            self._weight += sign * partition.weight
+        if self._size is not None:
+            self._size += sign * partition.size
+        if self._replication_group is not None:
+            self._replication_group.update_aggregates(self, partition, sign)
+
+    def add_leadership(self, partition):
+        """Account for this broker becoming the preferred leader of partition.
+        Called by Partition.
+        """
+        if self._leader_count is not None:
+            self._leader_count += 1
+        if self._leader_weight is not None:
+            self._leader_weight += partition.weight
+
+    def remove_leadership(self, partition):
+        """Account for this broker no longer being the preferred leader of
+        partition. Called by Partition.
+        """
+        if self._leader_count is not None:
+            self._leader_count -= 1
+        if self._leader_weight is not None:
+            self._leader_weight -= partition.weight
 
     def empty(self):
         """Return true if the broker has no replicas assigned"""
@@ -114,8 +200,11 @@ class Broker(object):
         if partition in self._partitions:
             # Remove partition from set
             self._partitions.remove(partition)
+            self._update_aggregates(partition, -1)
             # Remove broker from replica list of partition
-            partition.replicas.remove(self)
+            index = partition.remove_replica(self)
+            if self._journal is not None:
+                self._journal.record(self.add_partition, partition, index)
         else:
             raise ValueError(
                 'Partition: {topic_id}:{partition_id} not found in broker '
@@ -126,28 +215,57 @@ class Broker(object):
                 )
             )
 
-    def add_partition(self, partition):
-        """Add partition to partition list."""
-        assert(partition not in self._partitions)
+    def add_partition(self, partition, index=None):
+        """Add partition to partition list.
+
+        :param index: The position of this broker in the replicas of the
+            partition. By default the broker is appended to the replicas.
+        """
+        assert partition not in self._partitions
         # Add partition to existing set
         self._partitions.add(partition)
+        self._update_aggregates(partition, 1)
         # Add broker to replica list
-        partition.add_replica(self)
+        partition.add_replica(self, index)
+        if self._journal is not None:
+            self._journal.record(self.remove_partition, partition)
+
+    def move_partition(self, partition, broker_destination, keep_position=False):
+        """Move partition to destination broker and adjust replicas.
 
-    def move_partition(self, partition, broker_destination):
-        """Move partition to destination broker and adjust replicas."""
-        self.remove_partition(partition)
-        broker_destination.add_partition(partition)
+        :param keep_position: If True, the destination broker takes the place
+            of this broker in the replicas of the partition, so the order of
+            the replicas is kept. Otherwise it is appended to the replicas.
+        """
+        if keep_position:
+            assert partition not in broker_destination.partitions
+            self._partitions.remove(partition)
+            self._update_aggregates(partition, -1)
+            broker_destination._partitions.add(partition)
+            broker_destination._update_aggregates(partition, 1)
+            partition.replace(self, broker_destination)
+            if self._journal is not None:
+                self._journal.record(
+                    broker_destination.move_partition,
+                    partition,
+                    self,
+                    True,
+                )
+        else:
+            self.remove_partition(partition)
+            broker_destination.add_partition(partition)
 
     def count_partitions(self, topic):
         """Return count of partitions for given topic."""
-        return sum(1 for p in topic.partitions if p in self.partitions)
+        return self._get_topic_counts().get(topic, 0)
 
     def count_preferred_replica(self):
         """Return number of times broker is set as preferred leader."""
-        return sum(
-            1 for partition in self.partitions if partition.leader == self
-        )
+        if self._leader_count is None:
+            self._leader_count = sum(
+                1 for partition in self._partitions if partition.leader == self
+            )
+        return self._leader_count
 
     def get_preferred_partition(self, broker, sibling_distance):
         """The preferred partition belongs to the topic with the minimum
@@ -173,146 +291,6 @@ class Broker(object):
         else:
             return None
 
-    def request_leadership(self, opt_count, skip_brokers, skip_partitions):
-        """Under-balanced broker requests leadership from current leader, on the
-        pretext that it recursively can maintain its leadership count as optimal.
-
-        :key_terms:
-        leader-balanced: Count of brokers as leader is at least opt-count
-
-        Algorithm:
-        =========
-        Step-1: Broker will request leadership from current-leader of partitions
-                it belongs to.
-        Step-2: Current-leaders will grant their leadership if one of these happens:-
-            a) Either they remain leader-balanced.
-            b) Or they will recursively request leadership from other partitions
-               until they are become leader-balanced.
-            If both of these conditions fail, they will revoke their leadership-grant
-        Step-3: If current-broker becomes leader-balanced it will return
-                otherwise it moves ahead with next partition.
-        """
-        # Possible partitions which can grant leadership to broker
-        owned_partitions = list(filter(
-            lambda p: self is not p.leader and len(p.replicas) > 1,
-            self.partitions,
-        ))
-        for partition in owned_partitions:
-            # Partition not available to grant leadership when:
-            # 1. Broker is already under leadership change or
-            # 2. Partition has already granted leadership before
-            if partition.leader in skip_brokers or partition in skip_partitions:
-                continue
-            # Current broker is granted leadership temporarily
-            prev_leader = partition.swap_leader(self)
-            # Partition shouldn't be used again
-            skip_partitions.append(partition)
-            # Continue if prev-leader remains balanced
-            # If leadership of prev_leader is to be revoked, it is considered balanced
-            if prev_leader.count_preferred_replica() >= opt_count or \
-                    prev_leader.revoked_leadership:
-                # If current broker is leader-balanced return else
-                # request next-partition
-                if self.count_preferred_replica() >= opt_count:
-                    return
-                else:
-                    continue
-            else:  # prev-leader (broker) became unbalanced
-                # Append skip-brokers list so that it is not unbalanced further
-                skip_brokers.append(prev_leader)
-                # Try recursively arrange leadership for prev-leader
-                prev_leader.request_leadership(opt_count, skip_brokers, skip_partitions)
-                # If prev-leader couldn't be leader-balanced
-                # revert its previous grant to current-broker
-                if prev_leader.count_preferred_replica() < opt_count:
-                    # Partition can be used again for rebalancing
-                    skip_partitions.remove(partition)
-                    partition.swap_leader(prev_leader)
-                    # Try requesting leadership from next partition
-                    continue
-                else:
-                    # If prev-leader successfully balanced
-                    skip_partitions.append(partition)
-                    # Removing from skip-broker list, since it can now again be
-                    # used for granting leadership for some other partition
-                    skip_brokers.remove(prev_leader)
-                    if self.count_preferred_replica() >= opt_count:
-                        # Return if current-broker is leader-balanced
-                        return
-                    else:
-                        continue
-
-    def donate_leadership(self, opt_count, skip_brokers, used_edges):
-        """Over-loaded brokers tries to donate their leadership to one of their
-        followers recursively until they become balanced.
-
-        :key_terms:
-        used_edges: Represent list of tuple/edges (partition, prev-leader, new-leader),
-                    which have already been used for donating leadership from
-                    prev-leader to new-leader in same partition before.
-        skip_brokers: This is to avoid using same broker recursively for balancing
-                      to prevent loops.
-
-        :Algorithm:
-        * Over-loaded leader tries to donate its leadership to one of its followers
-        * Follower will try to be balanced recursively if it becomes over-balanced
-        * If it is successful, over-loaded leader moves to next partition if required,
-            return otherwise.
-        * If it is unsuccessful, it tries for next-follower or next-partition whatever
-            or returns if none available.
-        """
-        owned_partitions = list(filter(
-            lambda p: self is p.leader and len(p.replicas) > 1,
-            self.partitions,
-        ))
-        for partition in owned_partitions:
-            # Skip using same partition with broker if already used before
-            potential_new_leaders = list(filter(
-                lambda f: f not in skip_brokers,
-                partition.followers,
-            ))
-            for follower in potential_new_leaders:
-                # Don't swap the broker-pair if already swapped before
-                # in same partition
-                if (partition, self, follower) in used_edges:
-                    continue
-                partition.swap_leader(follower)
-                used_edges.append((partition, follower, self))
-                # new-leader didn't unbalance
-                if follower.count_preferred_replica() <= opt_count + 1:
-                    # over-broker balanced
-                    # If over-broker is the one which needs to be revoked from leadership
-                    # it's considered balanced only if its preferred replica count is 0
-                    if (self.count_preferred_replica() <= opt_count + 1 and not self.revoked_leadership) or \
-                            (self.count_preferred_replica() == 0 and self.revoked_leadership):
-                        return
-                    else:
-                        # Try next-partition, not another follower
-                        break
-                else:  # new-leader (broker) became over-balanced
-                    skip_brokers.append(follower)
-                    follower.donate_leadership(opt_count, skip_brokers, used_edges)
-                    # new-leader couldn't be balanced, revert
-                    if follower.count_preferred_replica() > opt_count + 1:
-                        used_edges.append((partition, follower, self))
-                        partition.swap_leader(self)
-                        # Try next leader or partition
-                        continue
-                    else:
-                        # New-leader was successfully balanced
-                        used_edges.append((partition, follower, self))
-                        # New-leader can be reused
-                        skip_brokers.remove(follower)
-                        # If broker is the one which needs to be revoked from leadership
-                        # it's considered balanced only if its preferred replica count is 0
-                        if (self.count_preferred_replica() <= opt_count + 1 and not self.revoked_leadership) or \
-                                (self.count_preferred_replica() == 0 and self.revoked_leadership):
-                            # Now broker is balanced
-                            return
-                        else:
-                            # Try next-partition, not another follower
-                            break
-
     def __str__(self):
         return "{id}".format(id=self._id)
 
@@ -30,6 +30,13 @@ class ClusterBalancer(object):
     :param args: The program arguments.
     """
 
+    # Whether pareto_assignments returns the assignments found by rebalance
+    # when args.pareto_plans_dir is set.
+    tracks_pareto_assignments = False
+
+    # The names of the methods that also work on a ColumnarClusterTopology.
+    columnar_topology_methods = frozenset()
+
     def __init__(self, cluster_topology, args=None):
         self.cluster_topology = cluster_topology
         self.args = args
@@ -81,6 +88,35 @@ class ClusterBalancer(object):
         """
         raise NotImplementedError("Implement in subclass")
 
+    def add_replicas(self, partition_names, count=1):
+        """Add replicas of several partitions to the cluster, while maintaining the cluster's balance.
+
+        Balancers that can place many replicas more efficiently than one
+        partition at a time should override this method.
+
+        :param partition_names: A list of (topic_id, partition_id) of the partitions to add replicas of.
+        :param count: The number of replicas to add to each partition.
+
+        :raises InvalidReplicationFactorError: The resulting replication factor is invalid.
+        """
+        for partition_name in partition_names:
+            self.add_replica(partition_name, count)
+
+    def remove_replicas(self, osr_broker_ids, count=1):
+        """Remove replicas of several partitions from the cluster, while maintaining the cluster's balance.
+
+        Balancers that can remove many replicas more efficiently than one
+        partition at a time should override this method.
+
+        :param osr_broker_ids: A dict mapping the (topic_id, partition_id) of each partition
+            to remove replicas of to a set of the partition's out-of-sync broker ids.
+        :param count: The number of replicas to remove from each partition.
+
+        :raises InvalidReplicationFactorError: The resulting replication factor is invalid.
+        """
+        for partition_name, partition_osr_broker_ids in six.iteritems(osr_broker_ids):
+            self.remove_replica(partition_name, partition_osr_broker_ids, count)
+
     def score(self):
         """Give the current cluster topology a numerical score.
         The score should be relative to other possible cluster assignments.
@@ -88,6 +124,19 @@ class ClusterBalancer(object):
         """
         return None
 
+    def pareto_assignments(self):
+        """Return the assignments found by the last rebalance that offer the
+        best score for their number and size of partition movements, when
+        args.pareto_plans_dir is set.
+
+        Each assignment is returned as a dict with the keys 'assignment',
+        'score', 'movement_count', 'movement_size' and 'leader_change_count',
+        sorted by movement count and size.
+        A result of None signifies that this ClusterBalancer cannot track
+        assignments at several movement budgets.
+        """
+        return None
+
     def rebalance_replicas(
             self,
             max_movement_count=None,
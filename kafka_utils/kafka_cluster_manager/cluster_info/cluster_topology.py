@@ -24,6 +24,7 @@ import six
 from .broker import Broker
 from .error import InvalidBrokerIdError
 from .error import InvalidPartitionError
+from .journal import UndoJournal
 from .partition import Partition
 from .rg import ReplicationGroup
 from .topic import Topic
@@ -42,6 +43,11 @@ class ClusterTopology(object):
             from each broker. The extract_group function is called for each
             broker passing the Broker object as argument. It should return a
             string representing the ReplicationGroup id.
+
+    Changes of the replicas and preferred leaders made between begin() and
+    rollback() are undone by rollback(), at a cost proportional to the number
+    of changes. Other changes, like marking brokers decommissioned, are not
+    undone.
     """
 
     def __init__(
@@ -54,6 +60,7 @@ class ClusterTopology(object):
         self.extract_group = extract_group
         self.partition_measurer = partition_measurer
         self.log = logging.getLogger(self.__class__.__name__)
+        self._journal = UndoJournal()
         self.topics = {}
         self.rgs = {}
         self.brokers = {}
@@ -86,7 +93,7 @@ class ClusterTopology(object):
         A broker object with no metadata is considered inactive.
         An inactive broker may or may not belong to a group.
         """
-        broker = Broker(broker_id, metadata)
+        broker = Broker(broker_id, metadata, journal=self._journal)
         if not metadata:
             broker.mark_inactive()
         rg_id = self.extract_group(broker)
@@ -100,38 +107,46 @@ class ClusterTopology(object):
         topic objects.
         """
         self.partitions = {}
+        # The metrics of all partitions are gathered in one call, so that
+        # measurers can fetch them in bulk.
+        metrics = self.partition_measurer.get_metrics(list(assignment))
+        topics = self.topics
+        brokers = self.brokers
         for partition_name, replica_ids in six.iteritems(assignment):
             # Get topic
-            topic_id = partition_name[0]
-            partition_id = partition_name[1]
-            topic = self.topics.setdefault(
-                topic_id,
-                Topic(topic_id, replication_factor=len(replica_ids))
-            )
+            topic_id, partition_id = partition_name
+            topic = topics.get(topic_id)
+            if topic is None:
+                topic = Topic(topic_id, replication_factor=len(replica_ids))
+                topics[topic_id] = topic
 
             # Creating partition object
+            weight, size = metrics[partition_name]
             partition = Partition(
                 topic,
                 partition_id,
-                weight=self.partition_measurer.get_weight(partition_name),
-                size=self.partition_measurer.get_size(partition_name),
+                weight=weight,
+                size=size,
+                journal=self._journal,
             )
             self.partitions[partition_name] = partition
             topic.add_partition(partition)
 
             # Updating corresponding broker objects
             for broker_id in replica_ids:
+                broker = brokers.get(broker_id)
                 # Check if broker-id is present in current active brokers
-                if broker_id not in list(self.brokers.keys()):
+                if broker is None:
                     self.log.warning(
                         "Broker %s containing partition %s is not in "
                         "active brokers.",
                         broker_id,
                         partition,
                     )
-                    self.brokers[broker_id] = self._create_broker(broker_id)
+                    broker = self._create_broker(broker_id)
+                    brokers[broker_id] = broker
 
-                self.brokers[broker_id].add_partition(partition)
+                broker.add_partition(partition)
 
     @property
     def active_brokers(self):
@@ -151,6 +166,28 @@ class ClusterTopology(object):
         # assignment map created in sorted order for deterministic solution
         return OrderedDict(sorted(list(assignment.items()), key=lambda t: t[0]))
 
+    def begin(self):
+        """Begin a transaction. The replica and leader changes made until the
+        matching commit() or rollback() can be undone with rollback().
+        Transactions can be nested.
+        """
+        self._journal.begin()
+
+    def commit(self):
+        """Keep the changes of the innermost transaction. They are still
+        undone if an enclosing transaction is rolled back.
+
+        :raises: TransactionError, when no transaction has begun.
+        """
+        self._journal.commit()
+
+    def rollback(self):
+        """Undo the changes of the innermost transaction.
+
+        :raises: TransactionError, when no transaction has begun.
+        """
+        self._journal.rollback()
+
     def replace_broker(self, source_id, dest_id):
         """Move all partitions in source broker to destination broker.
 
@@ -163,12 +200,9 @@ class ClusterTopology(object):
             dest = self.brokers[dest_id]
             # Move all partitions from source to destination broker
             for partition in source.partitions.copy():  # Partitions set changes
-                # We cannot move partition directly since that re-orders the
-                # replicas for the partition
-                source.partitions.remove(partition)
-                dest.partitions.add(partition)
-                # Replace broker in replica
-                partition.replace(source, dest)
+                # Keep the position of the replica, since appending it would
+                # re-order the replicas for the partition
+                source.move_partition(partition, dest, keep_position=True)
         except KeyError as e:
             self.log.error("Invalid broker id %s.", e.args[0])
             raise InvalidBrokerIdError(
@@ -0,0 +1,848 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import bisect
+import logging
+from array import array
+from collections import defaultdict
+from collections import OrderedDict
+
+import six
+from six.moves import range
+
+from .error import InvalidBrokerIdError
+from .error import InvalidPartitionError
+from .error import InvalidPartitionMeasurementError
+
+
+class ColumnarClusterTopology(object):
+    """A cluster topology that stores the partitions and their replicas in
+    flat arrays rather than in one object per partition, for clusters whose
+    ClusterTopology does not fit in memory.
+
+    Topics, brokers and replication groups are referred to by integer
+    indexes. Partitions are sorted by name and the replicas of partition p
+    are the broker indexes replicas[offsets[p]:offsets[p + 1]], like the rows
+    of a compressed sparse row matrix. The partition count, weight, size,
+    leader count and leader weight of every broker are kept in arrays indexed
+    by broker and updated along with the replicas. The per-topic partition
+    counts of the brokers are computed on first use and then kept up to date
+    too. The partitions of each broker are indexed on first use and then kept
+    up to date too.
+
+    brokers, topics, rgs and partitions map ids to lightweight views with the
+    attributes of Broker, Topic, ReplicationGroup and Partition used by the
+    statistics of display.py and by the balancers that work on a snapshot of
+    the cluster, like GeneticBalancer and MinCostFlowBalancer. Partition views
+    are created on access. The replicas can only be changed with
+    update_cluster_topology, replace_broker, Partition.swap_leader and
+    ReplicationGroup.move_partition, so balancers that move single replicas
+    between brokers, like PartitionCountBalancer, are not supported.
+
+    :param assignment: cluster assignment is a dict (topic, partition): replicas
+    :param brokers: dict representing the active brokers of the
+        cluster broker_id: metadata (metadata is the content of the zookeeper
+        node of the broker)
+    :param partition_measurer: Instance of PartitionMeasurer to use when
+        assigning partitions a weight and size.
+    :param extract_group: function used to extract the replication group
+        from each broker. The extract_group function is called for each
+        broker passing the broker view as argument. It should return a
+        string representing the ReplicationGroup id.
+    """
+
+    def __init__(
+            self,
+            assignment,
+            brokers,
+            partition_measurer,
+            extract_group=lambda x: None,
+    ):
+        self.extract_group = extract_group
+        self.partition_measurer = partition_measurer
+        self.log = logging.getLogger(self.__class__.__name__)
+        self.topics = {}
+        self.rgs = {}
+        self.brokers = {}
+
+        # Views indexed by topic, broker and replication group index.
+        self._topics = []
+        self._brokers = []
+        self._rgs = []
+        self._broker_rg = array(str('i'))
+
+        # The partition names, sorted, so that a partition is found by
+        # bisection without an index of its own.
+        self._partition_names = []
+        self._partition_topic = array(str('i'))
+        self._partition_weights = array(str('d'))
+        self._partition_sizes = array(str('d'))
+        self._offsets = array(str('l'), [0])
+        self._replicas = array(str('i'))
+
+        # Aggregates indexed by broker.
+        self._partition_counts = array(str('l'))
+        self._weights = array(str('d'))
+        self._sizes = array(str('d'))
+        self._leader_counts = array(str('l'))
+        self._leader_weights = array(str('d'))
+        # The weight of each topic, indexed by topic.
+        self._topic_weights = array(str('d'))
+        # A list mapping a broker index to a dict mapping a topic index to the
+        # number of partitions of the topic on the broker, or None until it
+        # is needed.
+        self._topic_counts = None
+
+        # A list mapping a broker index to an array of the indexes of its
+        # partitions, or None until it is needed.
+        self._broker_partitions = None
+
+        self._build_brokers(brokers)
+        self._build_partitions(assignment)
+        self.partitions = _PartitionMap(self)
+        self.log.debug(
+            'Total partitions in cluster {partitions}'.format(
+                partitions=len(self._partition_names),
+            ),
+        )
+        self.log.debug(
+            'Total replication-groups in cluster {rgs}'.format(
+                rgs=len(self.rgs),
+            ),
+        )
+        self.log.debug(
+            'Total brokers in cluster {brokers}'.format(
+                brokers=len(self.brokers),
+            ),
+        )
+
+    def _build_brokers(self, brokers):
+        """Build broker views using broker-ids."""
+        for broker_id, metadata in six.iteritems(brokers):
+            self._create_broker(broker_id, metadata)
+
+    def _create_broker(self, broker_id, metadata=None):
+        """Create a broker view and assign it to a replication group.
+        A broker with no metadata is considered inactive.
+        """
+        broker = _Broker(self, len(self._brokers), broker_id, metadata)
+        if not metadata:
+            broker.mark_inactive()
+        rg_id = self.extract_group(broker)
+        group = self.rgs.get(rg_id)
+        if group is None:
+            group = _ReplicationGroup(self, len(self._rgs), rg_id)
+            self._rgs.append(group)
+            self.rgs[rg_id] = group
+        group.add_broker(broker)
+        broker.replication_group = group
+        self._broker_rg.append(group.index)
+        self._brokers.append(broker)
+        self.brokers[broker_id] = broker
+
+        self._partition_counts.append(0)
+        self._weights.append(0)
+        self._sizes.append(0)
+        self._leader_counts.append(0)
+        self._leader_weights.append(0)
+        return broker
+
+    def _build_partitions(self, assignment):
+        """Fill the partition and replica arrays from assignment."""
+        names = sorted(assignment)
+        metrics = self.partition_measurer.get_metrics(names)
+        brokers = self.brokers
+        for partition, name in enumerate(names):
+            topic_id, _ = name
+            replica_ids = assignment[name]
+            topic = self.topics.get(topic_id)
+            if topic is None:
+                topic = _Topic(self, len(self._topics), topic_id, len(replica_ids))
+                topic.first_partition = partition
+                self._topics.append(topic)
+                self.topics[topic_id] = topic
+            topic.end_partition = partition + 1
+
+            weight, size = metrics[name]
+            if weight < 0:
+                raise InvalidPartitionMeasurementError(
+                    "Partition {pname} assigned negative weight: {weight}: "
+                    .format(pname=name, weight=weight)
+                )
+            if size < 0:
+                raise InvalidPartitionMeasurementError(
+                    "Partition {pname} assigned negative size: {size}: "
+                    .format(pname=name, size=size)
+                )
+            self._partition_names.append(name)
+            self._partition_topic.append(topic.index)
+            self._partition_weights.append(weight)
+            self._partition_sizes.append(size)
+
+            for broker_id in replica_ids:
+                broker = brokers.get(broker_id)
+                # Check if broker-id is present in current active brokers
+                if broker is None:
+                    self.log.warning(
+                        "Broker %s containing partition %s is not in "
+                        "active brokers.",
+                        broker_id,
+                        name,
+                    )
+                    broker = self._create_broker(broker_id)
+                self._replicas.append(broker.index)
+            self._offsets.append(len(self._replicas))
+        self._compute_aggregates()
+
+    def _find_partition(self, name):
+        """Return the index of the partition with the given name.
+
+        :raises: KeyError, when there is no such partition.
+        """
+        partition = bisect.bisect_left(self._partition_names, name)
+        if self._partition_names[partition:partition + 1] != [name]:
+            raise KeyError(name)
+        return partition
+
+    def _replica_indexes(self, partition):
+        """Return the array of the broker indexes of the replicas of
+        partition.
+        """
+        return self._replicas[
+            self._offsets[partition]:self._offsets[partition + 1]
+        ]
+
+    def _update_aggregates(self, partition, sign):
+        """Add (sign 1) or remove (sign -1) the replicas of partition to or
+        from the aggregates of their brokers.
+        """
+        start = self._offsets[partition]
+        end = self._offsets[partition + 1]
+        if start == end:
+            return
+        weight = self._partition_weights[partition]
+        size = self._partition_sizes[partition]
+        for slot in range(start, end):
+            broker = self._replicas[slot]
+            self._partition_counts[broker] += sign
+            self._weights[broker] += sign * weight
+            self._sizes[broker] += sign * size
+        if self._topic_counts is not None:
+            topic = self._partition_topic[partition]
+            for slot in range(start, end):
+                topic_counts = self._topic_counts[self._replicas[slot]]
+                topic_counts[topic] += sign
+                if not topic_counts[topic]:
+                    del topic_counts[topic]
+        leader = self._replicas[start]
+        self._leader_counts[leader] += sign
+        self._leader_weights[leader] += sign * weight
+
+    def _set_replicas(self, partition, broker_indexes):
+        """Replace the replicas of partition with broker_indexes, which must
+        have as many brokers as the partition has replicas.
+        """
+        start = self._offsets[partition]
+        assert len(broker_indexes) == self._offsets[partition + 1] - start
+        if self._broker_partitions is not None:
+            old_brokers = set(self._replica_indexes(partition))
+            new_brokers = set(broker_indexes)
+            # The partitions of each broker stay sorted, so only the brokers
+            # that lose or gain the partition are changed.
+            for broker in old_brokers - new_brokers:
+                broker_partitions = self._broker_partitions[broker]
+                del broker_partitions[
+                    bisect.bisect_left(broker_partitions, partition)
+                ]
+            for broker in new_brokers - old_brokers:
+                broker_partitions = self._broker_partitions[broker]
+                broker_partitions.insert(
+                    bisect.bisect_left(broker_partitions, partition),
+                    partition,
+                )
+        self._update_aggregates(partition, -1)
+        for offset, broker in enumerate(broker_indexes):
+            self._replicas[start + offset] = broker
+        self._update_aggregates(partition, 1)
+
+    def _rebuild_replicas(self, new_replicas):
+        """Rebuild the replica arrays with the replicas of some partitions
+        replaced, when the replication factor of a partition changes.
+
+        :param new_replicas: A dict mapping a partition index to the list of
+            the broker indexes of its new replicas.
+        """
+        offsets = array(str('l'), [0])
+        replicas = array(str('i'))
+        for partition in range(len(self._partition_names)):
+            if partition in new_replicas:
+                replicas.extend(new_replicas[partition])
+            else:
+                replicas.extend(self._replica_indexes(partition))
+            offsets.append(len(replicas))
+        self._offsets = offsets
+        self._replicas = replicas
+        self._compute_aggregates()
+
+    def _compute_aggregates(self):
+        """Compute the aggregates of all brokers and the weights of all
+        topics in a single pass over the replicas.
+        """
+        broker_count = len(self._brokers)
+        partition_counts = [0] * broker_count
+        weights = [0.0] * broker_count
+        sizes = [0.0] * broker_count
+        leader_counts = [0] * broker_count
+        leader_weights = [0.0] * broker_count
+        topic_weights = [0.0] * len(self._topics)
+        offsets = self._offsets
+        replicas = self._replicas
+        partition_weights = self._partition_weights
+        partition_sizes = self._partition_sizes
+        for partition in range(len(self._partition_names)):
+            start = offsets[partition]
+            end = offsets[partition + 1]
+            if start == end:
+                continue
+            weight = partition_weights[partition]
+            size = partition_sizes[partition]
+            topic_weights[self._partition_topic[partition]] += \
+                weight * (end - start)
+            for broker in replicas[start:end]:
+                partition_counts[broker] += 1
+                weights[broker] += weight
+                sizes[broker] += size
+            leader = replicas[start]
+            leader_counts[leader] += 1
+            leader_weights[leader] += weight
+        self._partition_counts = array(str('l'), partition_counts)
+        self._weights = array(str('d'), weights)
+        self._sizes = array(str('d'), sizes)
+        self._leader_counts = array(str('l'), leader_counts)
+        self._leader_weights = array(str('d'), leader_weights)
+        self._topic_weights = array(str('d'), topic_weights)
+        self._topic_counts = None
+        self._broker_partitions = None
+
+    def _get_topic_counts(self, broker):
+        """Return a dict mapping each topic index to the number of partitions
+        of the topic on broker.
+        """
+        if self._topic_counts is None:
+            topic_counts = [defaultdict(int) for _ in range(len(self._brokers))]
+            for partition in range(len(self._partition_names)):
+                topic = self._partition_topic[partition]
+                for slot in range(
+                        self._offsets[partition],
+                        self._offsets[partition + 1],
+                ):
+                    topic_counts[self._replicas[slot]][topic] += 1
+            self._topic_counts = topic_counts
+        return self._topic_counts[broker]
+
+    def _get_broker_partitions(self, broker):
+        """Return an array of the indexes of the partitions of broker. The
+        partitions of all brokers are indexed at once, in a single pass over
+        the replicas.
+        """
+        if self._broker_partitions is None:
+            broker_partitions = [
+                array(str('i')) for _ in range(len(self._brokers))
+            ]
+            for partition in range(len(self._partition_names)):
+                for slot in range(
+                        self._offsets[partition],
+                        self._offsets[partition + 1],
+                ):
+                    broker_partitions[self._replicas[slot]].append(partition)
+            self._broker_partitions = broker_partitions
+        return self._broker_partitions[broker]
+
+    @property
+    def active_brokers(self):
+        """Set of brokers that are not inactive or decommissioned."""
+        return {
+            broker for broker in self._brokers
+            if not broker.inactive and not broker.decommissioned
+        }
+
+    @property
+    def assignment(self):
+        # The partitions are sorted by name, so the assignment is too.
+        return OrderedDict(
+            (name, [
+                self._brokers[broker].id
+                for broker in self._replica_indexes(partition)
+            ])
+            for partition, name in enumerate(self._partition_names)
+        )
+
+    def replace_broker(self, source_id, dest_id):
+        """Move all partitions in source broker to destination broker.
+
+        :param source_id: source broker-id
+        :param dest_id: destination broker-id
+        :raises: InvalidBrokerIdError, when either of given broker-ids is invalid.
+        """
+        try:
+            source = self.brokers[source_id].index
+            dest = self.brokers[dest_id].index
+        except KeyError as e:
+            self.log.error("Invalid broker id %s.", e.args[0])
+            raise InvalidBrokerIdError(
+                "Broker id {} does not exist in cluster".format(e.args[0])
+            )
+        # The partitions of the source change while they are moved.
+        for partition in list(self._get_broker_partitions(source)):
+            replicas = self._replica_indexes(partition)
+            assert dest not in replicas
+            # Keep the position of the replica, since appending it would
+            # re-order the replicas for the partition
+            self._set_replicas(
+                partition,
+                [dest if broker == source else broker for broker in replicas],
+            )
+
+    def update_cluster_topology(self, assignment):
+        """Modify the cluster-topology with given assignment.
+
+        Change the replica set of partitions as in given assignment. The
+        assignment is validated before any partition is changed.
+
+        :param assignment: dict representing actions to be used to update the current
+        cluster-topology
+        :raises: InvalidBrokerIdError when broker-id is invalid
+        :raises: InvalidPartitionError when partition-name is invalid
+        """
+        new_replicas = {}
+        for partition_name, replica_ids in six.iteritems(assignment):
+            try:
+                brokers = [self.brokers[b_id].index for b_id in replica_ids]
+            except KeyError:
+                self.log.error(
+                    "Invalid replicas %s for topic-partition %s-%s.",
+                    ', '.join([str(id) for id in replica_ids]),
+                    partition_name[0],
+                    partition_name[1],
+                )
+                raise InvalidBrokerIdError(
+                    "Invalid replicas {0}.".format(
+                        ', '.join([str(id) for id in replica_ids])
+                    ),
+                )
+            try:
+                new_replicas[self._find_partition(partition_name)] = brokers
+            except KeyError:
+                self.log.error(
+                    "Invalid topic-partition %s-%s.",
+                    partition_name[0],
+                    partition_name[1],
+                )
+                raise InvalidPartitionError(
+                    "Invalid topic-partition {0}-{1}."
+                    .format(partition_name[0], partition_name[1]),
+                )
+
+        if all(
+            len(brokers) == self._offsets[partition + 1] - self._offsets[partition]
+            for partition, brokers in six.iteritems(new_replicas)
+        ):
+            for partition, brokers in six.iteritems(new_replicas):
+                self._set_replicas(partition, brokers)
+        else:
+            self._rebuild_replicas(new_replicas)
+
+
+class _PartitionMap(object):
+    """A read-only dict-like mapping of the partition names of a
+    ColumnarClusterTopology to partition views created on access.
+    """
+
+    def __init__(self, topology):
+        self._topology = topology
+
+    def __getitem__(self, name):
+        return _Partition(self._topology, self._topology._find_partition(name))
+
+    def get(self, name, default=None):
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+    def __contains__(self, name):
+        try:
+            self._topology._find_partition(name)
+        except KeyError:
+            return False
+        return True
+
+    def __len__(self):
+        return len(self._topology._partition_names)
+
+    def __iter__(self):
+        return iter(self._topology._partition_names)
+
+    def keys(self):
+        return list(self._topology._partition_names)
+
+    def values(self):
+        return list(self.itervalues())
+
+    def items(self):
+        return list(self.iteritems())
+
+    def itervalues(self):
+        for partition in range(len(self._topology._partition_names)):
+            yield _Partition(self._topology, partition)
+
+    def iteritems(self):
+        for partition, name in enumerate(self._topology._partition_names):
+            yield name, _Partition(self._topology, partition)
+
+
+class _Partition(object):
+    """A view of a partition of a ColumnarClusterTopology. Views of the same
+    partition are equal.
+    """
+
+    __slots__ = ('_topology', '_index')
+
+    def __init__(self, topology, index):
+        self._topology = topology
+        self._index = index
+
+    @property
+    def name(self):
+        return self._topology._partition_names[self._index]
+
+    @property
+    def partition_id(self):
+        return self.name[1]
+
+    @property
+    def topic(self):
+        return self._topology._topics[
+            self._topology._partition_topic[self._index]
+        ]
+
+    @property
+    def replicas(self):
+        brokers = self._topology._brokers
+        return [
+            brokers[broker]
+            for broker in self._topology._replica_indexes(self._index)
+        ]
+
+    @property
+    def leader(self):
+        return self.replicas[0]
+
+    @property
+    def replication_factor(self):
+        offsets = self._topology._offsets
+        return offsets[self._index + 1] - offsets[self._index]
+
+    @property
+    def followers(self):
+        return self.replicas[1:]
+
+    @property
+    def weight(self):
+        return self._topology._partition_weights[self._index]
+
+    @property
+    def size(self):
+        return self._topology._partition_sizes[self._index]
+
+    def swap_leader(self, new_leader):
+        """Change the preferred leader with one of the replicas and return
+        the previous preferred leader.
+        """
+        replicas = self._topology._replica_indexes(self._index)
+        curr_leader = self._topology._brokers[replicas[0]]
+        idx = replicas.index(new_leader.index)
+        replicas[0], replicas[idx] = replicas[idx], replicas[0]
+        self._topology._set_replicas(self._index, replicas)
+        return curr_leader
+
+    def __eq__(self, other):
+        if not isinstance(other, _Partition):
+            return False
+        same_topology = self._topology is other._topology
+        return same_topology and self._index == other._index
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self._index)
+
+    def __str__(self):
+        return "{name}".format(name=self.name)
+
+    def __repr__(self):
+        return "{0}".format(self)
+
+
+class _Topic(object):
+    """A view of a topic of a ColumnarClusterTopology. Its partitions are
+    the partitions first_partition to end_partition - 1, since partitions
+    are sorted by name.
+    """
+
+    __slots__ = (
+        '_topology',
+        'index',
+        '_id',
+        '_replication_factor',
+        'first_partition',
+        'end_partition',
+    )
+
+    def __init__(self, topology, index, id, replication_factor):
+        self._topology = topology
+        self.index = index
+        self._id = id
+        self._replication_factor = replication_factor
+        self.first_partition = 0
+        self.end_partition = 0
+
+    @property
+    def id(self):
+        return self._id
+
+    @property
+    def replication_factor(self):
+        return self._replication_factor
+
+    @property
+    def partitions(self):
+        return {
+            _Partition(self._topology, partition)
+            for partition in range(self.first_partition, self.end_partition)
+        }
+
+    @property
+    def weight(self):
+        return self._topology._topic_weights[self.index]
+
+    def __str__(self):
+        return "{0}".format(self._id)
+
+    def __repr__(self):
+        return "{0}".format(self)
+
+
+class _Broker(object):
+    """A view of a broker of a ColumnarClusterTopology."""
+
+    __slots__ = (
+        '_topology',
+        'index',
+        '_id',
+        '_metadata',
+        '_decommissioned',
+        '_revoked_leadership',
+        '_inactive',
+        'replication_group',
+    )
+
+    def __init__(self, topology, index, id, metadata=None):
+        self._topology = topology
+        self.index = index
+        self._id = id
+        self._metadata = metadata
+        self._decommissioned = False
+        self._revoked_leadership = False
+        self._inactive = False
+        self.replication_group = None
+
+    @property
+    def metadata(self):
+        return self._metadata
+
+    def mark_decommissioned(self):
+        """Mark broker as being decommissioned. Decommissioned brokers are not
+        allowed to have any partitions assigned.
+        """
+        self._decommissioned = True
+
+    def mark_revoked_leadership(self):
+        """Mark broker as having its leadership revoked."""
+        self._revoked_leadership = True
+
+    def mark_inactive(self):
+        """Mark broker as inactive (no metadata)."""
+        self._inactive = True
+
+    @property
+    def inactive(self):
+        return self._inactive
+
+    @property
+    def decommissioned(self):
+        return self._decommissioned
+
+    @property
+    def revoked_leadership(self):
+        return self._revoked_leadership
+
+    @property
+    def id(self):
+        return self._id
+
+    @property
+    def partitions(self):
+        return frozenset(
+            _Partition(self._topology, partition)
+            for partition in self._topology._get_broker_partitions(self.index)
+        )
+
+    @property
+    def topics(self):
+        return set(
+            self._topology._topics[topic]
+            for topic in self._topology._get_topic_counts(self.index)
+        )
+
+    @property
+    def weight(self):
+        return self._topology._weights[self.index]
+
+    @property
+    def size(self):
+        return self._topology._sizes[self.index]
+
+    @property
+    def leader_weight(self):
+        return self._topology._leader_weights[self.index]
+
+    def empty(self):
+        """Return true if the broker has no replicas assigned"""
+        return not self._topology._partition_counts[self.index]
+
+    def count_partitions(self, topic):
+        """Return count of partitions for given topic."""
+        return self._topology._get_topic_counts(self.index).get(topic.index, 0)
+
+    def count_preferred_replica(self):
+        """Return number of times broker is set as preferred leader."""
+        return self._topology._leader_counts[self.index]
+
+    def __str__(self):
+        return "{id}".format(id=self._id)
+
+    def __repr__(self):
+        return "{0}".format(self)
+
+
+class _ReplicationGroup(object):
+    """A view of a replication group of a ColumnarClusterTopology."""
+
+    log = logging.getLogger(__name__)
+
+    def __init__(self, topology, index, id):
+        self._topology = topology
+        self.index = index
+        self._id = id
+        self._brokers = set()
+
+    @property
+    def id(self):
+        return self._id
+
+    @property
+    def brokers(self):
+        return self._brokers
+
+    @property
+    def active_brokers(self):
+        """Return set of brokers that are not inactive or decommissioned."""
+        return {
+            broker
+            for broker in self._brokers
+            if not broker.inactive and not broker.decommissioned
+        }
+
+    def add_broker(self, broker):
+        self._brokers.add(broker)
+
+    @property
+    def partition_count(self):
+        """Return the number of replicas in the replication-group."""
+        counts = self._topology._partition_counts
+        return sum(counts[broker.index] for broker in self._brokers)
+
+    def count_replica(self, partition):
+        """Return count of replicas of given partition."""
+        broker_rg = self._topology._broker_rg
+        return sum(
+            1 for broker in self._topology._replica_indexes(partition._index)
+            if broker_rg[broker] == self.index
+        )
+
+    def move_partition(self, rg_destination, victim_partition):
+        """Move a replica of victim_partition from this replication group to
+        rg_destination. The source broker is the one with the most partitions
+        of the topic of victim_partition and the destination broker the one
+        with the fewest, as in ReplicationGroup.move_partition.
+        """
+        counts = self._topology._partition_counts
+        replicas = victim_partition.replicas
+        topic = victim_partition.topic
+        sources = [
+            broker for broker in self._brokers
+            if broker in replicas and not broker.inactive
+        ]
+        dests = [
+            broker for broker in rg_destination.brokers
+            if broker not in replicas
+            if not broker.inactive and not broker.decommissioned
+        ]
+        source = max(
+            sources,
+            key=lambda b: (b.count_partitions(topic), counts[b.index]),
+        )
+        dest = min(
+            dests,
+            key=lambda b: (b.count_partitions(topic), counts[b.index]),
+        )
+        self.log.debug(
+            'Moving partition {p_name} from broker {broker_source} to '
+            'replication-group:broker {rg_dest}:{dest_broker}'.format(
+                p_name=victim_partition.name,
+                broker_source=source.id,
+                dest_broker=dest.id,
+                rg_dest=rg_destination.id,
+            ),
+        )
+        # As Broker.move_partition, the destination broker is appended to
+        # the replicas.
+        self._topology._set_replicas(
+            victim_partition._index,
+            [
+                broker.index for broker in replicas if broker is not source
+            ] + [dest.index],
+        )
+
+    def __str__(self):
+        return "{0}".format(self._id)
+
+    def __repr__(self):
+        return "{0}".format(self)
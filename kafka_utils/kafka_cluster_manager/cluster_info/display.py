@@ -23,8 +23,6 @@ import six
 from six.moves import zip
 
 import kafka_utils.kafka_cluster_manager.cluster_info.stats as stats
-from kafka_utils.kafka_cluster_manager.cluster_info.cluster_topology \
-    import ClusterTopology
 from kafka_utils.util.validation import assignment_to_plan
 _log = logging.getLogger('kafka-cluster-manager')
 
@@ -350,7 +348,8 @@ def display_movements_stats(ct, base_assignment):
 
 def display_cluster_topology_stats(cluster_topology, base_assignment=None):
     if base_assignment:
-        base_cluster_topology = ClusterTopology(
+        # The base cluster topology is built with the same backend.
+        base_cluster_topology = type(cluster_topology)(
             base_assignment,
             {broker.id: broker.metadata for broker in cluster_topology.brokers.values()},
             cluster_topology.partition_measurer,
@@ -61,3 +61,10 @@ class NotEligibleGroupError(KafkaToolError):
 class RebalanceError(KafkaToolError):
     """Raised when a rebalance operation is not possible."""
     pass
+
+
+class TransactionError(KafkaToolError):
+    """Raised when a transaction of the cluster topology is committed or
+    rolled back without having begun.
+    """
+    pass
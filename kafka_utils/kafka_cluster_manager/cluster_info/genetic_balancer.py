@@ -16,11 +16,18 @@ from __future__ import absolute_import
 from __future__ import division
 
 import argparse
+import json
 import logging
+import os
 import random
+import struct
+import sys
 import time
+import traceback
 from collections import defaultdict
 from copy import copy
+from functools import partial
+from operator import itemgetter
 from math import sqrt
 
 import six
@@ -30,21 +37,46 @@ from .error import BrokerDecommissionError
 from .error import InvalidBrokerIdError
 from .error import InvalidPartitionError
 from .error import InvalidReplicationFactorError
+from .error import RebalanceError
 from .util import compute_optimum
+from .util import multiprocessing_context
 from kafka_utils.kafka_cluster_manager.cluster_info.cluster_balancer \
     import ClusterBalancer
-from kafka_utils.kafka_cluster_manager.cluster_info.stats \
-    import coefficient_of_variation
 from kafka_utils.util import positive_float
 from kafka_utils.util import positive_int
+from kafka_utils.util import positive_nonzero_int
 from kafka_utils.util import tuple_alter
 from kafka_utils.util import tuple_remove
 from kafka_utils.util import tuple_replace
+from kafka_utils.util.validation import plan_to_assignment
+
+try:
+    import resource
+except ImportError:
+    resource = None
 
 RANDOM_SEED = 0xcafca
 DEFAULT_NUM_GENS = 100
 DEFAULT_MAX_POP = 50
 DEFAULT_MAX_EXPLORATION = 10000
+DEFAULT_WORKERS = 1
+DEFAULT_ISLANDS = 1
+DEFAULT_MIGRATION_INTERVAL = 10
+DEFAULT_MIGRANTS = 2
+DEFAULT_ISLAND_WEIGHT_JITTER = 0.2
+DEFAULT_HEURISTIC_MUTATION_RATIO = 0.0
+CHECKPOINT_VERSION = 1
+# The number of partitions of the heaviest broker that heuristic partition
+# movements choose from.
+HEURISTIC_PARTITION_SAMPLES = 8
+
+# Mask keeping _State.replicas_hash within 64 bits.
+_HASH_MASK = (1 << 64) - 1
+
+# The number of updates after which the running sums of the broker weights
+# are computed again from the weights, so that rounding errors do not build
+# up over generations.
+_WEIGHT_SUMS_REFRESH_INTERVAL = 64
 
 # In practice, overall weight is more important than leader weight which is
 # more important than topic-broker imbalance so different weights are used
@@ -61,6 +93,15 @@ DEFAULT_BROKER_LEADER_COUNT_SCORE_WEIGHT = 0.10
 # improvement in score is expected most of the time).
 DEFAULT_MOVEMENT_SIZE_SCORE_WEIGHT = 0.01
 DEFAULT_LEADER_CHANGE_SCORE_WEIGHT = 0.001
+# The balance terms of the scoring function, whose weights differ between the
+# islands of the island model.
+_BALANCE_SCORE_WEIGHT_ARGS = (
+    'partition_weight_cv_score_weight',
+    'leader_weight_cv_score_weight',
+    'topic_broker_imbalance_score_weight',
+    'broker_partition_count_score_weight',
+    'broker_leader_count_score_weight',
+)
 
 
 class GeneticBalancer(ClusterBalancer):
@@ -72,9 +113,25 @@ class GeneticBalancer(ClusterBalancer):
     :param args: The program arguments.
     """
 
+    _description = 'Perform cluster rebalancing using a genetic algorithm.'
+
+    tracks_pareto_assignments = True
+
+    # Decommissioning removes replicas from the brokers one at a time, which
+    # ColumnarClusterTopology does not support.
+    columnar_topology_methods = frozenset([
+        'rebalance',
+        'add_replica',
+        'add_replicas',
+        'remove_replica',
+        'remove_replicas',
+        'score',
+    ])
+
     def __init__(self, cluster_topology, args):
         super(GeneticBalancer, self).__init__(cluster_topology, args)
         self.log = logging.getLogger(self.__class__.__name__)
+        self._pareto_archive = None
 
     def _set_arg_default(self, arg, value):
         if not hasattr(self.args, arg):
@@ -89,33 +146,14 @@ class GeneticBalancer(ClusterBalancer):
         self._set_arg_default('max_partition_movements', None)
         self._set_arg_default('max_movement_size', None)
         self._set_arg_default('max_leader_changes', None)
+        self._set_arg_default('pareto_plans_dir', None)
+        self._set_arg_default('pareto_size_buckets', None)
 
         parser = argparse.ArgumentParser(
             prog=self.__class__.__name__,
-            description='Perform cluster rebalancing using a genetic algorithm.',
-        )
-        parser.add_argument(
-            '--num-gens',
-            type=positive_int,
-            default=DEFAULT_NUM_GENS,
-            help='Number of generations of the genetic algorithm to perform. '
-            'Should be at leasn max-partition-movements + max-leader-changes.'
-            ' Default: %(default)',
-        )
-        parser.add_argument(
-            '--max-pop',
-            type=positive_int,
-            default=DEFAULT_MAX_POP,
-            help='Maximum population carried over between generations. '
-            'Default: %(default)',
-        )
-        parser.add_argument(
-            '--max-exploration',
-            type=positive_int,
-            default=DEFAULT_MAX_EXPLORATION,
-            help='Maximum exploration attempts to make each generation. '
-            'Default: %(default)',
+            description=self._description,
         )
+        self._add_search_arguments(parser)
         parser.add_argument(
             '--partition-weight-cv-score-weight',
             type=positive_float,
@@ -165,7 +203,150 @@ class GeneticBalancer(ClusterBalancer):
             help='How much to value leader changes when scoring assignments'
             ' during the genetic algorithm. Default: %(default)',
         )
+        parser.add_argument(
+            '--heuristic-mutation-ratio',
+            type=positive_float,
+            default=DEFAULT_HEURISTIC_MUTATION_RATIO,
+            help='Fraction of the proposed movements that move a partition'
+            ' from the heaviest broker to the lightest eligible broker, or'
+            ' leadership from the broker with the heaviest leader weight to'
+            ' its lightest follower, instead of being chosen at random.'
+            ' Must be at most 1. Default: %(default)s',
+        )
         parser.parse_args(balancer_args, self.args)
+        self._check_args(parser)
+
+    def _check_args(self, parser):
+        """Report invalid combinations of parsed arguments with
+        parser.error.
+        """
+        if self.args.heuristic_mutation_ratio > 1:
+            parser.error('--heuristic-mutation-ratio must be at most 1.')
+        self._check_search_args(parser)
+
+    def _check_search_args(self, parser):
+        """Report invalid combinations of the arguments added by
+        _add_search_arguments with parser.error.
+        """
+        if self.args.islands > 1 and self.args.workers > 1:
+            parser.error('--islands cannot be combined with --workers.')
+        if self.args.island_weight_jitter >= 1:
+            parser.error('--island-weight-jitter must be less than 1.')
+
+    def _add_search_arguments(self, parser):
+        """Add the arguments that control the search algorithm to parser. The
+        arguments of the scoring function are shared by all subclasses.
+        """
+        parser.add_argument(
+            '--num-gens',
+            type=positive_int,
+            default=DEFAULT_NUM_GENS,
+            help='Number of generations of the genetic algorithm to perform. '
+            'Should be at leasn max-partition-movements + max-leader-changes.'
+            ' Default: %(default)',
+        )
+        parser.add_argument(
+            '--max-pop',
+            type=positive_int,
+            default=DEFAULT_MAX_POP,
+            help='Maximum population carried over between generations. '
+            'Default: %(default)',
+        )
+        parser.add_argument(
+            '--max-exploration',
+            type=positive_int,
+            default=DEFAULT_MAX_EXPLORATION,
+            help='Maximum exploration attempts to make each generation. '
+            'Default: %(default)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=positive_nonzero_int,
+            default=DEFAULT_WORKERS,
+            help='Number of worker processes used to explore and score'
+            ' candidate assignments. Each worker uses its own random seed'
+            ' derived from the fixed seed of the balancer, so results are'
+            ' reproducible for a given number of workers. Default: %(default)s',
+        )
+        parser.add_argument(
+            '--islands',
+            type=positive_nonzero_int,
+            default=DEFAULT_ISLANDS,
+            help='Number of populations evolved independently in separate'
+            ' processes. Each island uses its own random seed and its own'
+            ' variation of the score weights, and periodically sends its best'
+            ' assignments to the next island. Cannot be combined with'
+            ' --workers. Default: %(default)s',
+        )
+        parser.add_argument(
+            '--migration-interval',
+            type=positive_nonzero_int,
+            default=DEFAULT_MIGRATION_INTERVAL,
+            help='Number of generations between migrations of assignments'
+            ' between islands. Default: %(default)s',
+        )
+        parser.add_argument(
+            '--migrants',
+            type=positive_int,
+            default=DEFAULT_MIGRANTS,
+            help='Number of the best assignments of each island sent to the'
+            ' next island at every migration. Default: %(default)s',
+        )
+        parser.add_argument(
+            '--island-weight-jitter',
+            type=positive_float,
+            default=DEFAULT_ISLAND_WEIGHT_JITTER,
+            help='Every island but the first multiplies each balance score'
+            ' weight by a random factor between 1 - jitter and 1 + jitter.'
+            ' The final assignment is chosen with the unchanged weights.'
+            ' Default: %(default)s',
+        )
+        parser.add_argument(
+            '--time-budget',
+            type=positive_float,
+            metavar='SECONDS',
+            help='Stop the genetic algorithm once rebalancing has run for this'
+            ' long and use the best assignment found so far. The budget is'
+            ' checked after every generation and, unless --workers is used,'
+            ' during exploration.'
+            ' Default: no limit.',
+        )
+        parser.add_argument(
+            '--patience',
+            type=positive_nonzero_int,
+            help='Stop the genetic algorithm after this many generations'
+            ' without improvement of the best score. Default: no limit.',
+        )
+        parser.add_argument(
+            '--checkpoint-file',
+            metavar='PATH',
+            help='Write the population to this file after every generation,'
+            ' so that an interrupted rebalance can be resumed with'
+            ' --warm-start.',
+        )
+        parser.add_argument(
+            '--warm-start',
+            metavar='PATH',
+            help='Add the assignments of a file written by --checkpoint-file,'
+            ' or of a reassignment plan written by --write-to-file, to the'
+            ' initial population. Partitions and brokers that are no longer'
+            ' in the cluster are ignored.',
+        )
+        parser.add_argument(
+            '--telemetry-file',
+            metavar='PATH',
+            help='Write a JSON record per generation to this file, one per'
+            ' line, with the time spent exploring and pruning, the'
+            ' candidates proposed and rejected by each type of movement,'
+            ' the best, median and worst score, the score components and'
+            ' movements of the best assignment and the resident memory of'
+            ' the process. With --islands, one record is written per'
+            ' migration interval.',
+        )
+
+    def _create_state(self, cluster_topology, brokers=None):
+        """Return a new state modeling cluster_topology."""
+        return _State(cluster_topology, brokers=brokers)
 
     def rebalance(self):
         """The genetic rebalancing algorithm runs for a fixed number of
@@ -176,6 +357,10 @@ class GeneticBalancer(ClusterBalancer):
         states with the highest scores are chosen as the starting states for
         the next generation.
         """
+        deadline = None
+        if self.args.time_budget is not None:
+            deadline = time.time() + self.args.time_budget
+
         if self.args.num_gens < self.args.max_partition_movements:
             self.log.warning(
                 "num-gens ({num_gens}) is less than max-partition-movements"
@@ -186,6 +371,189 @@ class GeneticBalancer(ClusterBalancer):
                 )
             )
 
+        state = self._initial_state()
+        pop = {state}
+
+        if self.args.pareto_plans_dir:
+            size_bucket = None
+            if self.args.max_movement_size and self.args.pareto_size_buckets:
+                size_bucket = \
+                    self.args.max_movement_size / self.args.pareto_size_buckets
+            self._pareto_archive = _ParetoArchive(self, size_bucket)
+
+        if self._should_rebalance(state):
+            if self.args.warm_start:
+                pop.update(self._warm_start(state))
+            if self._pareto_archive:
+                self._pareto_archive.add(pop)
+            self.log.info("Rebalancing with genetic algorithm.")
+            if self.args.islands > 1:
+                pop = self._evolve_islands(state, pop, deadline)
+            else:
+                pop = self._evolve(state, pop, deadline)
+
+        # Choose the state with the greatest score.
+        state = sorted(pop, key=self._score, reverse=True)[0]
+        self._update_cluster_topology(state)
+
+    def _evolve(self, state, pop, deadline):
+        """Run the genetic algorithm on a single population and return the
+        final population.
+
+        :param state: The initial state of the rebalance.
+        :param pop: The initial population.
+        :param deadline: The time.time() value at which to stop, or None.
+        """
+        pool = None
+        if self.args.workers > 1:
+            pool = _ExplorationPool(self, list(pop), self.args.workers)
+        telemetry = None
+        if self.args.telemetry_file:
+            telemetry = _Telemetry(self, self.args.telemetry_file)
+        best_score = self._score(state)
+        stale_gens = 0
+        try:
+            # Run the genetic algorithm for a fixed number of generations
+            # unless it runs out of time or stops improving. The current
+            # population is always kept as candidates, so the best state
+            # found so far survives every generation.
+            for i in range(self.args.num_gens):
+                start = time.time()
+                record = {'generation': i}
+                mutation_stats = None
+                if telemetry:
+                    mutation_stats = _MutationStats()
+                if pool:
+                    pop, candidate_count, explored = \
+                        pool.evolve(mutation_stats)
+                else:
+                    pop_candidates = self._explore(
+                        pop,
+                        deadline,
+                        mutation_stats,
+                    )
+                    explored = time.time()
+                    pop = self._prune(pop_candidates)
+                    candidate_count = len(pop_candidates)
+                    if self._pareto_archive:
+                        self._pareto_archive.add(pop_candidates)
+                if telemetry:
+                    record['explore_seconds'] = explored - start
+                    record['prune_seconds'] = time.time() - explored
+                    record['mutations'] = mutation_stats.summary(pop)
+                end = time.time()
+                self.log.debug(
+                    "Generation %d: keeping %d of %d assignment(s) in %f seconds",
+                    i,
+                    len(pop),
+                    candidate_count,
+                    end - start,
+                )
+                if telemetry:
+                    record['seconds'] = end - start
+                    record['candidates'] = candidate_count
+                    telemetry.write(record, pop)
+
+                if self.args.checkpoint_file:
+                    self._write_checkpoint(state, pop)
+
+                gen_score = max(self._score(new_state) for new_state in pop)
+                if gen_score > best_score:
+                    best_score = gen_score
+                    stale_gens = 0
+                else:
+                    stale_gens += 1
+                patience = self.args.patience
+                if patience is not None and stale_gens >= patience:
+                    self.log.info(
+                        "Best score unchanged for %d generations. Stopping"
+                        " after generation %d.",
+                        stale_gens,
+                        i,
+                    )
+                    break
+                if deadline is not None and end >= deadline:
+                    self.log.info(
+                        "Time budget of %f seconds exhausted. Stopping"
+                        " after generation %d.",
+                        self.args.time_budget,
+                        i,
+                    )
+                    break
+        finally:
+            if pool:
+                pool.close()
+            if telemetry:
+                telemetry.close()
+        return pop
+
+    def _evolve_islands(self, state, pop, deadline):
+        """Run the genetic algorithm on --islands populations in separate
+        processes and return the union of their final populations.
+
+        The islands run --migration-interval generations at a time. After
+        each interval, the best --migrants assignments of every island are
+        added to the population of the next island. Islands stop on their own
+        when they run out of --patience or time.
+
+        :param state: The initial state of the rebalance.
+        :param pop: The initial population of every island.
+        :param deadline: The time.time() value at which to stop, or None.
+        """
+        pool = _IslandPool(self, state, list(pop), deadline)
+        telemetry = None
+        if self.args.telemetry_file:
+            telemetry = _Telemetry(self, self.args.telemetry_file)
+        try:
+            generation = 0
+            while generation < self.args.num_gens:
+                start = time.time()
+                generations = min(
+                    self.args.migration_interval,
+                    self.args.num_gens - generation,
+                )
+                ran = pool.evolve(generations)
+                generation += generations
+                pop = pool.population()
+                if self._pareto_archive:
+                    self._pareto_archive.add(pop)
+                self.log.debug(
+                    "Generations %d-%d: keeping %d assignment(s) on %d"
+                    " island(s) in %f seconds",
+                    generation - generations,
+                    generation - 1,
+                    len(pop),
+                    self.args.islands,
+                    time.time() - start,
+                )
+                if telemetry:
+                    telemetry.write(
+                        {
+                            'generation': generation - 1,
+                            'first_generation': generation - generations,
+                            'seconds': time.time() - start,
+                        },
+                        pop,
+                    )
+                if self.args.checkpoint_file:
+                    self._write_checkpoint(state, pop)
+                if not any(ran):
+                    self.log.info(
+                        "All islands stopped. Stopping after generation %d.",
+                        generation - 1,
+                    )
+                    break
+        finally:
+            pool.close()
+            if telemetry:
+                telemetry.close()
+        return pool.population()
+
+    def _initial_state(self):
+        """Rebalance replicas across replication groups if requested and
+        return the state that rebalancing starts from. The random number
+        generator is seeded so that results are reproducible.
+        """
         if self.args.replication_groups:
             self.log.info("Rebalancing replicas across replication groups...")
             rg_movement_count, rg_movement_size = self.rebalance_replicas(
@@ -204,63 +572,165 @@ class GeneticBalancer(ClusterBalancer):
         random.seed(RANDOM_SEED)
 
         # NOTE: only active brokers are considered when rebalancing
-        state = _State(
+        state = self._create_state(
             self.cluster_topology,
             brokers=self.cluster_topology.active_brokers
         )
         state.movement_size = rg_movement_size
-        pop = {state}
+        return state
+
+    def _warm_start(self, state):
+        """Return the states reached from state by applying the assignments
+        read from --warm-start.
 
-        do_rebalance = self.args.brokers or self.args.leaders
+        :param state: The initial state.
+        """
+        with open(self.args.warm_start) as warm_start_file:
+            data = json.load(warm_start_file)
+        if 'population' in data:
+            # A checkpoint written by _write_checkpoint.
+            partitions = [tuple(name) for name in data['partitions']]
+            brokers = data['brokers']
+            assignments = [
+                {
+                    partitions[partition]: [brokers[b] for b in replicas]
+                    for partition, replicas in changes
+                }
+                for changes in data['population']
+            ]
+        else:
+            # A reassignment plan written by --write-to-file.
+            assignments = [plan_to_assignment(data)]
+
+        partition_index = {
+            partition.name: index
+            for index, partition in enumerate(state.partitions)
+        }
+        broker_index = {
+            broker.id: index for index, broker in enumerate(state.brokers)
+        }
+        states = []
+        for assignment in assignments:
+            new_state = state
+            for name, broker_ids in six.iteritems(assignment):
+                if name not in partition_index:
+                    continue
+                if not all(b in broker_index for b in broker_ids):
+                    continue
+                new_state = new_state.reassign(
+                    partition_index[name],
+                    tuple(broker_index[b] for b in broker_ids),
+                )
+            states.append(new_state)
+        self.log.info(
+            "Warm-starting with %d assignment(s) from %s.",
+            len(states),
+            self.args.warm_start,
+        )
+        return states
+
+    def _write_checkpoint(self, base, pop):
+        """Write the population to --checkpoint-file. Each state is stored as
+        the replicas of the partitions that differ from the base state, with
+        partitions and brokers referred to by their index in lists of names
+        and ids. The file is replaced atomically.
+
+        :param base: The initial state of the rebalance.
+        :param pop: The population to write.
+        """
+        partitions = {}
+        brokers = {}
+        population = []
+        for state in sorted(pop, key=self._score, reverse=True):
+            population.append([
+                [
+                    partitions.setdefault(partition, len(partitions)),
+                    [
+                        brokers.setdefault(broker, len(brokers))
+                        for broker in state.replicas[partition]
+                    ],
+                ]
+                for partition in state.replicas.diff(base.replicas)
+            ])
+        checkpoint = {
+            'version': CHECKPOINT_VERSION,
+            'partitions': [
+                list(base.partitions[partition].name)
+                for partition in sorted(partitions, key=partitions.get)
+            ],
+            'brokers': [
+                base.brokers[broker].id
+                for broker in sorted(brokers, key=brokers.get)
+            ],
+            'population': population,
+        }
+        temp_file = self.args.checkpoint_file + '.tmp'
+        with open(temp_file, 'w') as checkpoint_file:
+            json.dump(checkpoint, checkpoint_file)
+        os.rename(temp_file, self.args.checkpoint_file)
+
+    def _should_rebalance(self, state):
+        """Return whether brokers or leaders should be rebalanced from
+        state.
+        """
+        if not (self.args.brokers or self.args.leaders):
+            return False
 
         # Cannot rebalance when all partitions have zero weight because the
         # score function is undefined.
-        if do_rebalance and not state.total_weight:
+        if not state.total_weight:
             self.log.error(
                 "Rebalance impossible. All partitions have zero weight.",
             )
-            do_rebalance = False
-
-        if do_rebalance:
-            self.log.info("Rebalancing with genetic algorithm.")
-            # Run the genetic algorithm for a fixed number of generations.
-            for i in range(self.args.num_gens):
-                start = time.time()
-                pop_candidates = self._explore(pop)
-                pop = self._prune(pop_candidates)
-                end = time.time()
-                self.log.debug(
-                    "Generation %d: keeping %d of %d assignment(s) in %f seconds",
-                    i,
-                    len(pop),
-                    len(pop_candidates),
-                    end - start,
-                )
+            return False
+        return True
 
-        # Choose the state with the greatest score.
-        state = sorted(pop, key=self._score, reverse=True)[0]
+    def _update_cluster_topology(self, state):
+        """Update the cluster topology with the assignment of the chosen
+        state.
+        """
         self.log.info(
             "Done rebalancing. %d partitions moved.",
             state.movement_count,
         )
         self.log.info("Total movement size: %f", state.movement_size)
+        self.cluster_topology.update_cluster_topology(
+            self._cluster_assignment(state),
+        )
+
+    def _cluster_assignment(self, state):
+        """Return the assignment of the cluster for a state."""
         assignment = state.assignment
 
         # Since only active brokers are considered when rebalancing, inactive
         # brokers need to be added back to the new assignment.
         all_brokers = set(self.cluster_topology.brokers.values())
         inactive_brokers = all_brokers - set(state.brokers)
-        for partition_name, replicas in assignment:
+        for partition_name, replicas in six.iteritems(assignment):
             for broker in inactive_brokers:
                 if broker in self.cluster_topology.partitions[partition_name].replicas:
                     replicas.append(broker.id)
+        return assignment
 
-        self.cluster_topology.update_cluster_topology(assignment)
+    def pareto_assignments(self):
+        if self._pareto_archive is None:
+            return None
+        return [
+            {
+                'assignment': self._cluster_assignment(state),
+                'score': score,
+                'movement_count': state.movement_count,
+                'movement_size': state.movement_size,
+                'leader_change_count': state.leader_movement_count,
+            }
+            for score, state in self._pareto_archive.front()
+        ]
 
     def decommission_brokers(self, broker_ids):
         """Decommissioning brokers is done by removing all partitions from
         the decommissioned brokers and adding them, one-by-one, back to the
-        cluster.
+        cluster. All replicas are placed in a single state, and the cluster
+        topology is updated once at the end.
 
         :param broker_ids: List of broker ids that should be decommissioned.
         """
@@ -286,12 +756,9 @@ class GeneticBalancer(ClusterBalancer):
 
         active_brokers = self.cluster_topology.active_brokers
 
-        # Add partition replicas to active brokers one-by-one.
         for partition_name, count in six.iteritems(partitions):
             partition = self.cluster_topology.partitions[partition_name]
-            try:
-                self.add_replica(partition_name, count)
-            except InvalidReplicationFactorError:
+            if partition.replication_factor + count > len(active_brokers):
                 raise BrokerDecommissionError(
                     "Not enough active brokers in the cluster. "
                     "Partition {partition} has replication-factor {rf}, "
@@ -303,6 +770,24 @@ class GeneticBalancer(ClusterBalancer):
                     )
                 )
 
+        # Add partition replicas to active brokers one-by-one.
+        state = self._create_state(
+            self.cluster_topology,
+            brokers=active_brokers,
+        )
+        partition_index = {
+            partition.name: index
+            for index, partition in enumerate(state.partitions)
+        }
+        for partition_name, count in six.iteritems(partitions):
+            state = self._add_replicas(
+                state,
+                partition_index[partition_name],
+                count,
+            )
+
+        self._update_partitions(state, partitions)
+
     def add_replica(self, partition_name, count=1):
         """Adding a replica is done by trying to add the replica to every
         broker in the cluster and choosing the resulting state with the
@@ -311,41 +796,71 @@ class GeneticBalancer(ClusterBalancer):
         :param partition_name: (topic_id, partition_id) of the partition to add replicas of.
         :param count: The number of replicas to add.
         """
-        try:
-            partition = self.cluster_topology.partitions[partition_name]
-        except KeyError:
-            raise InvalidPartitionError(
-                "Partition name {name} not found.".format(name=partition_name),
-            )
+        self.add_replicas([partition_name], count)
 
-        active_brokers = self.cluster_topology.active_brokers
+    def add_replicas(self, partition_names, count=1):
+        """Add replicas of several partitions as add_replica does, using a
+        single state for all of them and updating the cluster topology once.
 
-        if partition.replication_factor + count > len(active_brokers):
-            raise InvalidReplicationFactorError(
-                "Cannot increase replication factor from {rf} to {new_rf}."
-                " There are only {brokers} active brokers."
-                .format(
-                    rf=partition.replication_factor,
-                    new_rf=partition.replication_factor + count,
-                    brokers=len(active_brokers),
+        :param partition_names: A list of (topic_id, partition_id) of the partitions to add replicas of.
+        :param count: The number of replicas to add to each partition.
+        """
+        active_brokers = self.cluster_topology.active_brokers
+        for partition_name in partition_names:
+            partition = self._get_partition(partition_name)
+            if partition.replication_factor + count > len(active_brokers):
+                raise InvalidReplicationFactorError(
+                    "Cannot increase replication factor from {rf} to {new_rf}."
+                    " There are only {brokers} active brokers."
+                    .format(
+                        rf=partition.replication_factor,
+                        new_rf=partition.replication_factor + count,
+                        brokers=len(active_brokers),
+                    )
                 )
-            )
 
         # Create state from current cluster topology.
-        state = _State(self.cluster_topology, brokers=active_brokers)
-        partition_index = state.partitions.index(partition)
+        state = self._create_state(
+            self.cluster_topology,
+            brokers=active_brokers,
+        )
+        partition_index = {
+            partition.name: index
+            for index, partition in enumerate(state.partitions)
+        }
+        for partition_name in partition_names:
+            state = self._add_replicas(
+                state,
+                partition_index[partition_name],
+                count,
+            )
+        self._update_partitions(state, partition_names)
+
+    def _add_replicas(self, state, partition, count):
+        """Return the state reached by adding replicas of a partition, one at
+        a time, to the broker that gives the highest scoring state. Replicas
+        are only added to under-replicated replication groups.
+
+        :param state: The state to add the replicas to. Its brokers must be
+            the active brokers of the cluster.
+        :param partition: The partition index of the partition.
+        :param count: The number of replicas to add.
+        """
+        rg_brokers = [[] for _ in state.rgs]
+        for broker, rg in enumerate(state.broker_rg):
+            rg_brokers[rg].append(broker)
 
         for _ in range(count):
             # Find eligible replication-groups.
             non_full_rgs = [
-                rg for rg in six.itervalues(self.cluster_topology.rgs)
-                if rg.count_replica(partition) < len(rg.active_brokers)
+                rg for rg, brokers in enumerate(rg_brokers)
+                if state.rg_replicas[rg][partition] < len(brokers)
             ]
             # Since replicas can only be added to non-full rgs, only consider
             # replicas on those rgs when determining which rgs are
             # under-replicated.
             replica_count = sum(
-                rg.count_replica(partition)
+                state.rg_replicas[rg][partition]
                 for rg in non_full_rgs
             )
             opt_replicas, _ = compute_optimum(
@@ -354,22 +869,45 @@ class GeneticBalancer(ClusterBalancer):
             )
             under_replicated_rgs = [
                 rg for rg in non_full_rgs
-                if rg.count_replica(partition) < opt_replicas
+                if state.rg_replicas[rg][partition] < opt_replicas
             ] or non_full_rgs
 
             # Add the replica to every eligible broker.
             new_states = []
             for rg in under_replicated_rgs:
-                for broker in rg.active_brokers:
-                    if broker not in partition.replicas:
-                        broker_index = state.brokers.index(broker)
+                for broker in rg_brokers[rg]:
+                    if broker not in state.replicas[partition]:
                         new_states.append(
-                            state.add_replica(partition_index, broker_index)
+                            state.add_replica(partition, broker)
                         )
 
-            # Update cluster topology with highest scoring state.
+            # Keep the highest scoring state.
             state = sorted(new_states, key=self._score, reverse=True)[0]
-            self.cluster_topology.update_cluster_topology(state.assignment)
+        return state
+
+    def _update_partitions(self, state, partition_names):
+        """Update the cluster topology with the replicas of some partitions in
+        state. The replicas on brokers that are not in state are kept.
+
+        :param state: The state with the new replicas.
+        :param partition_names: The names of the partitions to update.
+        """
+        state_brokers = set(state.brokers)
+        partition_index = {
+            partition.name: index
+            for index, partition in enumerate(state.partitions)
+        }
+        assignment = {}
+        for partition_name in partition_names:
+            replicas = state.replicas[partition_index[partition_name]]
+            assignment[partition_name] = [
+                state.brokers[broker].id for broker in replicas
+            ] + [
+                broker.id for broker
+                in self.cluster_topology.partitions[partition_name].replicas
+                if broker not in state_brokers
+            ]
+        self.cluster_topology.update_cluster_topology(assignment)
 
     def remove_replica(self, partition_name, osr_broker_ids, count=1):
         """Removing a replica is done by trying to remove a replica from every
@@ -380,106 +918,193 @@ class GeneticBalancer(ClusterBalancer):
         :param osr_broker_ids: A list of the partition's out-of-sync broker ids.
         :param count: The number of replicas to remove.
         """
-        try:
-            partition = self.cluster_topology.partitions[partition_name]
-        except KeyError:
-            raise InvalidPartitionError(
-                "Partition name {name} not found.".format(name=partition_name),
-            )
+        self.remove_replicas({partition_name: osr_broker_ids}, count)
+
+    def remove_replicas(self, osr_broker_ids, count=1):
+        """Remove replicas of several partitions as remove_replica does, using
+        a single state for all of them and updating the cluster topology once.
 
-        if partition.replication_factor - count < 1:
-            raise InvalidReplicationFactorError(
-                "Cannot decrease replication factor from {rf} to {new_rf}."
-                "Replication factor must be at least 1."
-                .format(
-                    rf=partition.replication_factor,
-                    new_rf=partition.replication_factor - count,
+        :param osr_broker_ids: A dict mapping the (topic_id, partition_id) of each partition
+            to remove replicas of to a list of the partition's out-of-sync broker ids.
+        :param count: The number of replicas to remove from each partition.
+        """
+        for partition_name in osr_broker_ids:
+            partition = self._get_partition(partition_name)
+            if partition.replication_factor - count < 1:
+                raise InvalidReplicationFactorError(
+                    "Cannot decrease replication factor from {rf} to {new_rf}."
+                    "Replication factor must be at least 1."
+                    .format(
+                        rf=partition.replication_factor,
+                        new_rf=partition.replication_factor - count,
+                    )
                 )
-            )
 
-        osr = {
-            broker for broker in partition.replicas
-            if broker.id in osr_broker_ids
+        # Create state from current cluster topology.
+        state = self._create_state(self.cluster_topology)
+        partition_index = {
+            partition.name: index
+            for index, partition in enumerate(state.partitions)
+        }
+        broker_index = {
+            broker.id: index for index, broker in enumerate(state.brokers)
         }
+        for partition_name, partition_osr_broker_ids in six.iteritems(osr_broker_ids):
+            state = self._remove_replicas(
+                state,
+                partition_index[partition_name],
+                {
+                    broker_index[broker_id]
+                    for broker_id in partition_osr_broker_ids
+                    if broker_id in broker_index
+                },
+                count,
+            )
+        self._update_partitions(state, list(osr_broker_ids))
 
-        # Create state from current cluster topology.
-        state = _State(self.cluster_topology)
-        partition_index = state.partitions.index(partition)
+    def _remove_replicas(self, state, partition, osr, count):
+        """Return the state reached by removing replicas of a partition, one at
+        a time, from the broker that gives the highest scoring state. Replicas
+        are removed from over-replicated replication groups, and out-of-sync
+        replicas are removed first.
+
+        :param state: The state to remove the replicas from.
+        :param partition: The partition index of the partition.
+        :param osr: The set of broker indexes of the out-of-sync replicas.
+        :param count: The number of replicas to remove.
+        """
+        rg_brokers = [[] for _ in state.rgs]
+        for broker, rg in enumerate(state.broker_rg):
+            rg_brokers[rg].append(broker)
 
         for _ in range(count):
             # Find eligible replication groups.
             non_empty_rgs = [
-                rg for rg in six.itervalues(self.cluster_topology.rgs)
-                if rg.count_replica(partition) > 0
+                rg for rg in range(len(state.rgs))
+                if state.rg_replicas[rg][partition] > 0
             ]
             rgs_with_osr = [
                 rg for rg in non_empty_rgs
-                if any(b in osr for b in rg.brokers)
+                if any(state.broker_rg[b] == rg for b in osr)
             ]
             candidate_rgs = rgs_with_osr or non_empty_rgs
             # Since replicas will only be removed from the candidate rgs, only
             # count replicas on those rgs when determining which rgs are
             # over-replicated.
             replica_count = sum(
-                rg.count_replica(partition)
+                state.rg_replicas[rg][partition]
                 for rg in candidate_rgs
             )
             opt_replicas, _ = compute_optimum(
                 len(candidate_rgs),
                 replica_count,
             )
-            over_replicated_rgs = [
+            candidate_rgs = [
                 rg for rg in candidate_rgs
-                if rg.count_replica(partition) > opt_replicas
+                if state.rg_replicas[rg][partition] > opt_replicas
             ] or candidate_rgs
-            candidate_rgs = over_replicated_rgs or candidate_rgs
 
             # Remove the replica from every eligible broker.
             new_states = []
             for rg in candidate_rgs:
-                osr_brokers = {
-                    broker for broker in rg.brokers
+                osr_brokers = [
+                    broker for broker in rg_brokers[rg]
                     if broker in osr
-                }
-                candidate_brokers = osr_brokers or rg.brokers
-                for broker in candidate_brokers:
-                    if broker in partition.replicas:
-                        broker_index = state.brokers.index(broker)
+                ]
+                for broker in osr_brokers or rg_brokers[rg]:
+                    if broker in state.replicas[partition]:
                         new_states.append(
-                            state.remove_replica(partition_index, broker_index)
+                            state.remove_replica(partition, broker)
                         )
 
-            # Update cluster topology with highest scoring state.
+            # Keep the highest scoring state.
             state = sorted(new_states, key=self._score, reverse=True)[0]
-            self.cluster_topology.update_cluster_topology(state.assignment)
-            osr = {b for b in osr if b in partition.replicas}
+            osr = {b for b in osr if b in state.replicas[partition]}
+        return state
+
+    def _get_partition(self, partition_name):
+        """Return the partition of the cluster topology with the given name.
+
+        :param partition_name: (topic_id, partition_id) of the partition.
+        :raises InvalidPartitionError: The partition does not exist.
+        """
+        try:
+            return self.cluster_topology.partitions[partition_name]
+        except KeyError:
+            raise InvalidPartitionError(
+                "Partition name {name} not found.".format(name=partition_name),
+            )
 
     def score(self):
-        return self._score(_State(self.cluster_topology), score_movement=False)
+        return self._score(
+            self._create_state(self.cluster_topology),
+            score_movement=False,
+        )
 
-    def _explore(self, pop):
+    def _explore(self, pop, deadline=None, mutation_stats=None):
         """Exploration phase: Find a set of candidate states based on
         the current population.
 
         :param pop: The starting population for this generation.
+        :param deadline: If given, exploration stops after the first state
+            that is explored past this time.time() value.
+        :param mutation_stats: If given, a _MutationStats that counts the
+            candidates proposed by each mutation.
         """
         new_pop = set(pop)
         exploration_per_state = self.args.max_exploration // len(pop)
 
-        mutations = []
-        if self.args.brokers:
-            mutations.append(self._move_partition)
-        if self.args.leaders:
-            mutations.append(self._move_leadership)
+        mutations = self._mutations(mutation_stats)
 
+        explored = _explored_states(pop)
         for state in pop:
             for _ in range(exploration_per_state):
                 new_state = random.choice(mutations)(state)
                 if new_state:
+                    if mutation_stats:
+                        mutation_stats.add_candidate(explored, new_state)
                     new_pop.add(new_state)
+            if deadline is not None and time.time() >= deadline:
+                break
 
         return new_pop
 
+    def _mutations(self, mutation_stats=None):
+        """Return the list of mutation functions used during exploration.
+
+        :param mutation_stats: If given, a _MutationStats that counts the
+            candidates proposed by each mutation.
+        """
+        mutations = []
+        if self.args.brokers:
+            mutations.append((self._move_partition, self._move_heavy_partition))
+        if self.args.leaders:
+            mutations.append(
+                (self._move_leadership, self._move_heavy_leadership),
+            )
+        if mutation_stats:
+            mutations = [
+                (
+                    mutation_stats.wrap(random_mutation),
+                    mutation_stats.wrap(heuristic_mutation),
+                )
+                for random_mutation, heuristic_mutation in mutations
+            ]
+        if not self.args.heuristic_mutation_ratio:
+            return [random_mutation for random_mutation, _ in mutations]
+        return [
+            partial(self._mix_mutations, random_mutation, heuristic_mutation)
+            for random_mutation, heuristic_mutation in mutations
+        ]
+
+    def _mix_mutations(self, random_mutation, heuristic_mutation, state):
+        """Apply heuristic_mutation to state with a probability of
+        --heuristic-mutation-ratio and random_mutation otherwise.
+        """
+        if random.random() < self.args.heuristic_mutation_ratio:
+            return heuristic_mutation(state)
+        return random_mutation(state)
+
     def _move_partition(self, state):
         """Attempt to move a random partition to a random broker. If the
         chosen movement is not possible, None is returned.
@@ -493,9 +1118,65 @@ class GeneticBalancer(ClusterBalancer):
 
         # Choose distinct source and destination brokers.
         source = random.choice(state.replicas[partition])
-        dest = random.randint(0, len(self.cluster_topology.brokers) - 1)
-        if dest in state.replicas[partition]:
+        dest = random.randint(0, len(state.brokers) - 1)
+        if not self._can_move(state, partition, source, dest):
             return None
+
+        return state.move(partition, source, dest)
+
+    def _move_heavy_partition(self, state):
+        """Attempt to move a random partition from the broker with the
+        greatest weight to the broker with the smallest weight that the
+        partition can be moved to. If no such movement is possible, None is
+        returned.
+
+        :param state: The starting state.
+
+        :return: The resulting State object if a movement is found. None if
+            no movement is found.
+        """
+        brokers = sorted(
+            range(len(state.brokers)),
+            key=state.broker_weights.__getitem__,
+        )
+        source = brokers[-1]
+        # Moving half of the weight difference between the heaviest and the
+        # lightest broker balances them best.
+        target_weight = (
+            state.broker_weights[source] - state.broker_weights[brokers[0]]
+        ) / 2
+
+        partitions = self._random_partitions(
+            state,
+            lambda partition: source in state.replicas[partition],
+            HEURISTIC_PARTITION_SAMPLES,
+        )
+        if not partitions:
+            return None
+        partition = min(
+            partitions,
+            key=lambda partition: abs(
+                state.partition_weights[partition] - target_weight
+            ),
+        )
+
+        for dest in brokers[:-1]:
+            if self._can_move(state, partition, source, dest):
+                return state.move(partition, source, dest)
+        return None
+
+    def _can_move(self, state, partition, source, dest):
+        """Return whether a partition can be moved from the source broker to
+        the destination broker.
+
+        :param state: The starting state.
+        :param partition: The partition index of the partition to move.
+        :param source: The broker index of the broker to move the partition
+            from.
+        :param dest: The broker index of the broker to move the partition to.
+        """
+        if dest in state.replicas[partition]:
+            return False
         source_rg = state.broker_rg[source]
         dest_rg = state.broker_rg[dest]
 
@@ -504,16 +1185,16 @@ class GeneticBalancer(ClusterBalancer):
             source_rg_replicas = state.rg_replicas[source_rg][partition]
             dest_rg_replicas = state.rg_replicas[dest_rg][partition]
             if source_rg_replicas <= dest_rg_replicas:
-                return None
+                return False
 
         # Ensure movement size capacity is not surpassed
         partition_size = state.partition_sizes[partition]
         if (self.args.max_movement_size is not None and
                 state.movement_size + partition_size >
                 self.args.max_movement_size):
-            return None
+            return False
 
-        return state.move(partition, source, dest)
+        return True
 
     def _move_leadership(self, state):
         """Attempt to move a random partition to a random broker. If the
@@ -541,16 +1222,75 @@ class GeneticBalancer(ClusterBalancer):
 
         return state.move_leadership(partition, dest)
 
+    def _move_heavy_leadership(self, state):
+        """Attempt to move the leadership of a random partition led by the
+        broker with the greatest leader weight to the follower with the
+        smallest leader weight. If no such change is possible, None is
+        returned.
+
+        :param state: The starting state.
+
+        :return: The resulting State object if a leader change is found. None
+            if no change is found.
+        """
+        max_changes = self.args.max_leader_changes
+        if max_changes is not None and state.leader_movement_count >= max_changes:
+            return None
+
+        source = max(
+            range(len(state.brokers)),
+            key=state.broker_leader_weights.__getitem__,
+        )
+
+        def led_by_source(partition):
+            replicas = state.replicas[partition]
+            return len(replicas) > 1 and replicas[0] == source
+
+        partitions = self._random_partitions(state, led_by_source, 1)
+        if not partitions:
+            return None
+        partition = partitions[0]
+
+        dest = min(
+            state.replicas[partition][1:],
+            key=state.broker_leader_weights.__getitem__,
+        )
+        return state.move_leadership(partition, dest)
+
+    def _random_partitions(self, state, predicate, count):
+        """Return the indexes of up to count partitions with a nonzero weight
+        for which predicate is true, scanning the partitions from a random
+        one. Moving zero weight partitions doesn't improve the balance of the
+        weights.
+
+        :param state: The state whose partitions are scanned.
+        :param predicate: A function of a partition index.
+        :param count: The maximum number of partitions to return.
+        """
+        partitions = []
+        partition_count = len(state.partitions)
+        start = random.randint(0, partition_count - 1)
+        for offset in range(partition_count):
+            partition = (start + offset) % partition_count
+            if state.partition_weights[partition] > 0 and predicate(partition):
+                partitions.append(partition)
+                if len(partitions) == count:
+                    break
+        return partitions
+
     def _prune(self, pop_candidates):
         """Choose a subset of the candidate states to continue on to the next
         generation.
 
         :param pop_candidates: The set of candidate states.
         """
-        return set(
-            sorted(pop_candidates, key=self._score, reverse=True)
-            [:self.args.max_pop]
-        )
+        return set(_select_best(
+            pop_candidates,
+            self._score,
+            lambda state: state.replicas_hash,
+            _same_replicas,
+            self.args.max_pop,
+        ))
 
     def _score(self, state, score_movement=True):
         """Score a state based on how balanced it is. A higher score represents
@@ -558,6 +1298,9 @@ class GeneticBalancer(ClusterBalancer):
 
         :param state: The state to score.
         """
+        if score_movement and state.cached_score is not None:
+            return state.cached_score
+
         score = 0
         max_score = 0
         if state.total_weight:
@@ -584,17 +1327,895 @@ class GeneticBalancer(ClusterBalancer):
             max_score += self.args.broker_partition_count_score_weight
             max_score += self.args.broker_leader_count_score_weight
 
-        if self.args.max_movement_size is not None and score_movement:
+        # A limit of 0 allows no movements, so every state scores the same.
+        if self.args.max_movement_size and score_movement:
             score += self.args.movement_size_score_weight * \
                 (1 - state.movement_size / self.args.max_movement_size)
             max_score += self.args.movement_size_score_weight
 
-        if self.args.max_leader_changes is not None and score_movement:
+        if self.args.max_leader_changes and score_movement:
             score += self.args.leader_change_score_weight * \
                 (1 - state.leader_movement_count / self.args.max_leader_changes)
             max_score += self.args.leader_change_score_weight
 
-        return score / max_score
+        score /= max_score
+        if score_movement:
+            state.cached_score = score
+        return score
+
+
+_MUTATION_METHODS = ('move', 'move_leadership', 'add_replica', 'remove_replica')
+
+
+class _ParetoArchive(object):
+    """Keep the best state seen for every movement count and movement size
+    bucket, to offer assignments at several movement budgets from a single
+    run. States are compared by the score of their balance alone, without
+    the movement terms of the score.
+
+    :param balancer: The GeneticBalancer scoring the states.
+    :param size_bucket: The width of the movement size buckets, or None to
+        keep one state per movement count.
+    """
+
+    def __init__(self, balancer, size_bucket):
+        self.balancer = balancer
+        self.size_bucket = size_bucket
+        # A dict mapping (movement count, size bucket) to a (score, state)
+        # tuple.
+        self._best = {}
+
+    def add(self, states):
+        """Consider states for the archive. States with more partition
+        movements than --max-partition-movements are skipped, since the
+        genetic algorithm only bounds them by the number of generations.
+        """
+        max_movements = self.balancer.args.max_partition_movements
+        limited = max_movements is not None
+        for state in states:
+            if limited and state.movement_count > max_movements:
+                continue
+            key = (
+                state.movement_count,
+                int(state.movement_size // self.size_bucket)
+                if self.size_bucket else 0,
+            )
+            score = self.balancer._score(state, score_movement=False)
+            best = self._best.get(key)
+            if best is None or score > best[0]:
+                self._best[key] = (score, state)
+
+    def states(self):
+        """Return the states of the archive."""
+        return [state for _, state in six.itervalues(self._best)]
+
+    def front(self):
+        """Return the (score, state) tuples of the archive that no other
+        state improves on, that is, that no other state has a score at least
+        as high with at most as many movements of at most the same size.
+        They are sorted by movement count and movement size.
+        """
+        front = []
+        for score, state in sorted(
+            six.itervalues(self._best),
+            key=lambda entry: (
+                entry[1].movement_count,
+                entry[1].movement_size,
+                -entry[0],
+            ),
+        ):
+            dominated = any(
+                other_score >= score
+                for other_score, other in front
+                if other.movement_size <= state.movement_size
+            )
+            if not dominated:
+                front.append((score, state))
+        return front
+
+
+class _MutationStats(object):
+    """Count the candidates proposed by each mutation during one exploration
+    phase. For each mutation, identified by the name of its method without
+    the leading underscore, the counts are:
+
+    proposed: The number of times the mutation was applied.
+    rejected: The number of times it found no possible movement.
+    duplicate: The number of candidates already explored.
+    kept: The number of its candidates selected for the next population.
+    """
+
+    def __init__(self):
+        self._counts = defaultdict(lambda: {
+            'proposed': 0,
+            'rejected': 0,
+            'duplicate': 0,
+        })
+        # A dict mapping each candidate to the name of the mutation that
+        # proposed it.
+        self._origins = {}
+
+    def wrap(self, mutation):
+        """Return a function that applies mutation and counts its
+        candidates.
+        """
+        name = mutation.__name__.lstrip('_')
+        counts = self._counts[name]
+
+        def counted_mutation(state):
+            counts['proposed'] += 1
+            new_state = mutation(state)
+            if new_state is None:
+                counts['rejected'] += 1
+            else:
+                self._origins[new_state] = name
+            return new_state
+        return counted_mutation
+
+    def add_candidate(self, explored, state):
+        """Count a candidate as duplicate if it was already explored, and
+        add it to the explored states otherwise.
+
+        :param explored: The explored states, as returned by
+            _explored_states.
+        :param state: A candidate proposed by a wrapped mutation.
+        """
+        matches = explored[state.replicas_hash]
+        if any(_same_replicas(state, other) for other in matches):
+            self._counts[self._origins[state]]['duplicate'] += 1
+        else:
+            matches.append(state)
+
+    def origin(self, state):
+        """Return the name of the mutation that proposed state, or None."""
+        return self._origins.get(state)
+
+    def add_origin(self, state, name):
+        """Record that the mutation of the given name proposed state, which
+        was built from a candidate counted by another _MutationStats.
+        """
+        self._origins[state] = name
+
+    def counts(self):
+        """Return a dict mapping the name of every mutation to its proposed,
+        rejected and duplicate counts.
+        """
+        return {
+            name: dict(counts) for name, counts in six.iteritems(self._counts)
+        }
+
+    def add_counts(self, counts):
+        """Add counts returned by the counts method of another
+        _MutationStats.
+        """
+        for name, mutation_counts in six.iteritems(counts):
+            for key, count in six.iteritems(mutation_counts):
+                self._counts[name][key] += count
+
+    def summary(self, pop):
+        """Return the counts of every mutation.
+
+        :param pop: The population selected from the candidates.
+        """
+        summary = {}
+        for name, counts in six.iteritems(self._counts):
+            summary[name] = dict(counts)
+            summary[name]['kept'] = sum(
+                1 for state in pop if self._origins.get(state) == name
+            )
+        return summary
+
+
+class _Telemetry(object):
+    """Write a JSON record per generation to --telemetry-file, one per line.
+
+    :param balancer: The GeneticBalancer running the algorithm.
+    :param path: The path of the file, which is replaced.
+    """
+
+    def __init__(self, balancer, path):
+        self.balancer = balancer
+        self._file = open(path, 'w')
+
+    def write(self, record, pop):
+        """Add the scores of pop, the score components and movements of its
+        best state and the resident memory of the process to record and
+        write it.
+
+        :param record: A dict with the fields specific to the generation.
+        :param pop: The population at the end of the generation.
+        """
+        scores = sorted(self.balancer._score(state) for state in pop)
+        best = max(pop, key=self.balancer._score)
+        record.update({
+            'population': len(pop),
+            'score': {
+                'best': scores[-1],
+                'median': scores[len(scores) // 2],
+                'worst': scores[0],
+            },
+            'best': {
+                'broker_weight_cv': best.broker_weight_cv,
+                'broker_leader_weight_cv': best.broker_leader_weight_cv,
+                'weighted_topic_broker_imbalance':
+                    best.weighted_topic_broker_imbalance,
+                'broker_partition_count_cv': best.broker_partition_count_cv,
+                'broker_leader_count_cv': best.broker_leader_count_cv,
+                'movement_count': best.movement_count,
+                'movement_size': best.movement_size,
+                'leader_movement_count': best.leader_movement_count,
+            },
+            'rss_bytes': _rss_bytes(),
+        })
+        self._file.write(json.dumps(record, sort_keys=True) + '\n')
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def _rss_bytes():
+    """Return the resident memory of the process in bytes, or its peak if
+    the current value isn't available, or None.
+    """
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * \
+                os.sysconf('SC_PAGE_SIZE')
+    except (IOError, OSError, ValueError, IndexError):
+        pass
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere.
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+
+class _IslandPool(object):
+    """Evolve several populations of the genetic algorithm, the islands, in
+    worker processes.
+
+    Every island explores and prunes its own population with its own random
+    seed and score weights. Between calls to evolve, the islands send back
+    their populations, best first, in the compact encoding of _encode_state.
+    The best migrants of every island are sent to the next island, in a
+    ring, with the next call to evolve.
+
+    :param balancer: The GeneticBalancer running the algorithm.
+    :param base: The initial state, which encoded states are relative to.
+    :param pop: The list of states of the initial population of every
+        island.
+    :param deadline: The time.time() value at which islands stop, or None.
+    """
+
+    def __init__(self, balancer, base, pop, deadline):
+        self.balancer = balancer
+        self.base = base
+        self._encoded_pops = [
+            [_encode_state(base, state) for state in pop]
+            for _ in range(balancer.args.islands)
+        ]
+        self._connections = []
+        self._processes = []
+        context = multiprocessing_context()
+        for index in range(balancer.args.islands):
+            parent_conn, child_conn = context.Pipe()
+            process = context.Process(
+                target=_island_worker,
+                args=(
+                    balancer,
+                    base,
+                    pop,
+                    child_conn,
+                    _derive_seed(RANDOM_SEED, index),
+                    _island_score_weights(balancer.args, index),
+                    deadline,
+                ),
+            )
+            process.daemon = True
+            process.start()
+            child_conn.close()
+            self._connections.append(parent_conn)
+            self._processes.append(process)
+
+    def evolve(self, generations):
+        """Migrate the best states between islands and run a number of
+        generations on every island.
+
+        :param generations: The number of generations to run.
+        :returns: The list of the number of generations each island ran.
+        """
+        migrants = self.balancer.args.migrants
+        for index, conn in enumerate(self._connections):
+            conn.send((
+                generations,
+                self._encoded_pops[index - 1][:migrants],
+            ))
+
+        ran = []
+        for index, conn in enumerate(self._connections):
+            status, result = conn.recv()
+            if status == 'error':
+                raise RebalanceError(
+                    "Island worker failed:\n{0}".format(result),
+                )
+            island_ran, self._encoded_pops[index] = result
+            ran.append(island_ran)
+        return ran
+
+    def population(self):
+        """Return the list of the states of all islands."""
+        return [
+            _decode_state(self.base, data)
+            for encoded_pop in self._encoded_pops
+            for data in encoded_pop
+        ]
+
+    def close(self):
+        """Stop the worker processes."""
+        for conn in self._connections:
+            try:
+                conn.send(None)
+            except (IOError, OSError):
+                pass
+            conn.close()
+        for process in self._processes:
+            process.join()
+
+
+def _island_worker(balancer, base, pop, conn, seed, score_weights, deadline):
+    """Body of the processes started by _IslandPool."""
+    random.seed(seed)
+    for arg, weight in six.iteritems(score_weights):
+        setattr(balancer.args, arg, weight)
+
+    # The population is kept in a list ranked by score and replicas hash, so
+    # that exploration visits the states in the same order every run.
+    def ranked(pop):
+        return sorted(
+            pop,
+            key=lambda state: (balancer._score(state), state.replicas_hash),
+            reverse=True,
+        )
+
+    pop = ranked(pop)
+    best_score = balancer._score(pop[0])
+    stale_gens = 0
+    patience = balancer.args.patience
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        try:
+            generations, migrants = message
+            if migrants:
+                pop = ranked(balancer._prune(
+                    pop + [_decode_state(base, data) for data in migrants],
+                ))
+            ran = 0
+            for _ in range(generations):
+                if deadline is not None and time.time() >= deadline:
+                    break
+                if patience is not None and stale_gens >= patience:
+                    break
+                pop = ranked(balancer._prune(balancer._explore(pop, deadline)))
+                ran += 1
+                gen_score = balancer._score(pop[0])
+                if gen_score > best_score:
+                    best_score = gen_score
+                    stale_gens = 0
+                else:
+                    stale_gens += 1
+            conn.send((
+                'ok',
+                (ran, [_encode_state(base, state) for state in pop]),
+            ))
+        except Exception:
+            conn.send(('error', traceback.format_exc()))
+    conn.close()
+
+
+def _island_score_weights(args, index):
+    """Return a dict of the balance score weights of the index-th island. The
+    first island keeps the weights of args.
+    """
+    if index == 0:
+        return {}
+    jitter = random.Random(_derive_seed(RANDOM_SEED, index))
+    return {
+        arg: getattr(args, arg) * jitter.uniform(
+            1 - args.island_weight_jitter,
+            1 + args.island_weight_jitter,
+        )
+        for arg in _BALANCE_SCORE_WEIGHT_ARGS
+    }
+
+
+def _encode_state(base, state):
+    """Return the compact encoding of a state used to send it between
+    processes: a string of 32-bit integers holding, for each partition whose
+    replicas differ from base, the partition index, the replica count and the
+    broker indexes of the replicas.
+
+    :param base: The state that the encoding is relative to.
+    :param state: The state to encode. It must be derived from base.
+    """
+    values = []
+    for partition in state.replicas.diff(base.replicas):
+        replicas = state.replicas[partition]
+        values.append(partition)
+        values.append(len(replicas))
+        values.extend(replicas)
+    return struct.pack('<{0}i'.format(len(values)), *values)
+
+
+def _decode_state(base, data):
+    """Return the state encoded by _encode_state, derived from base with
+    _State.reassign.
+    """
+    values = struct.unpack('<{0}i'.format(len(data) // 4), data)
+    state = base
+    index = 0
+    while index < len(values):
+        partition, count = values[index], values[index + 1]
+        index += 2
+        state = state.reassign(partition, values[index:index + count])
+        index += count
+    return state
+
+
+class _ExplorationPool(object):
+    """Run the exploration and pruning phases of the genetic algorithm in
+    worker processes.
+
+    Every worker keeps its own copy of the population. Each generation, the
+    workers explore an equal share of the mutations of every state, score the
+    candidates and send back only their best candidates as (score, parent
+    index, mutation, replicas hash, origin) tuples, where origin is the name
+    of the mutation when they are counted for telemetry. The best candidates
+    overall, with distinct assignments, become the next population, which is
+    sent back to the workers as (parent index, mutation) tuples.
+
+    With telemetry, the workers also send the counts of the candidates
+    proposed, rejected and duplicated by each mutation. Duplicates are
+    counted within each worker, so a candidate also proposed by another
+    worker isn't counted as a duplicate.
+
+    With --pareto-plans-dir, the workers also send the candidates they would
+    keep in a _ParetoArchive of their own, that is, their best candidate for
+    every movement count and movement size bucket. Adding these to the
+    archive of the balancer has the same effect as adding every candidate.
+
+    :param balancer: The GeneticBalancer running the algorithm.
+    :param pop: The list of states of the initial population.
+    :param workers: The number of worker processes.
+    """
+
+    def __init__(self, balancer, pop, workers):
+        self.balancer = balancer
+        self.pop = pop
+        self._pop_candidates = [
+            (balancer._score(state), index, None, state.replicas_hash, None)
+            for index, state in enumerate(pop)
+        ]
+        self._pop_mutations = [(index, None) for index in range(len(pop))]
+        self._connections = []
+        self._processes = []
+        context = multiprocessing_context()
+        for index in range(workers):
+            parent_conn, child_conn = context.Pipe()
+            process = context.Process(
+                target=_exploration_worker,
+                args=(
+                    balancer,
+                    pop,
+                    child_conn,
+                    _derive_seed(RANDOM_SEED, index),
+                ),
+            )
+            process.daemon = True
+            process.start()
+            child_conn.close()
+            self._connections.append(parent_conn)
+            self._processes.append(process)
+
+    def evolve(self, mutation_stats=None):
+        """Run one generation.
+
+        :param mutation_stats: If given, a _MutationStats to which the counts
+            of the candidates proposed by each mutation in the workers are
+            added.
+        :returns: A 3-tuple of the new population, the number of candidates
+            considered and the time.time() value at which the exploration
+            of the workers ended.
+        """
+        workers = len(self._connections)
+        exploration_per_state = \
+            self.balancer.args.max_exploration // len(self.pop)
+        for index, conn in enumerate(self._connections):
+            share = exploration_per_state // workers
+            if index < exploration_per_state % workers:
+                share += 1
+            conn.send((
+                self._pop_mutations,
+                share,
+                bool(mutation_stats),
+                bool(self.balancer._pareto_archive),
+            ))
+
+        # The current population is kept as candidates for the next one.
+        candidates = [
+            (score, index, None, replicas_hash, None)
+            for index, (score, _, _, replicas_hash, _)
+            in enumerate(self._pop_candidates)
+        ]
+        candidate_count = len(candidates)
+        archived = []
+        for conn in self._connections:
+            status, result = conn.recv()
+            if status == 'error':
+                raise RebalanceError(
+                    "Exploration worker failed:\n{0}".format(result),
+                )
+            explored, best, counts, archive_candidates = result
+            candidate_count += explored
+            candidates.extend(best)
+            if mutation_stats:
+                mutation_stats.add_counts(counts)
+            archived.extend(archive_candidates)
+        explored = time.time()
+        if self.balancer._pareto_archive:
+            self.balancer._pareto_archive.add(
+                _candidate_state(self.pop, candidate) for candidate in archived
+            )
+
+        self._pop_candidates = _select_best(
+            candidates,
+            itemgetter(0),
+            itemgetter(3),
+            _same_candidates(self.pop),
+            self.balancer.args.max_pop,
+        )
+        self._pop_mutations = [
+            (index, mutation)
+            for _, index, mutation, _, _ in self._pop_candidates
+        ]
+        self.pop = _replay_mutations(self.pop, self._pop_mutations)
+        if mutation_stats:
+            for state, candidate in zip(self.pop, self._pop_candidates):
+                if candidate[4] is not None:
+                    mutation_stats.add_origin(state, candidate[4])
+        return set(self.pop), candidate_count, explored
+
+    def close(self):
+        """Stop the worker processes."""
+        for conn in self._connections:
+            try:
+                conn.send(None)
+            except (IOError, OSError):
+                pass
+            conn.close()
+        for process in self._processes:
+            process.join()
+
+
+def _exploration_worker(balancer, pop, conn, seed):
+    """Body of the processes started by _ExplorationPool."""
+    random.seed(seed)
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        try:
+            (
+                pop_mutations,
+                exploration_per_state,
+                count_mutations,
+                archive,
+            ) = message
+            pop = _replay_mutations(pop, pop_mutations)
+            mutation_stats = None
+            if count_mutations:
+                mutation_stats = _MutationStats()
+                explored = _explored_states(pop)
+            pareto_archive = None
+            if archive:
+                pareto_archive = _ParetoArchive(
+                    balancer,
+                    balancer._pareto_archive.size_bucket,
+                )
+                # A dict mapping the candidate states to their candidates.
+                state_candidates = {}
+            mutations = balancer._mutations(mutation_stats)
+            candidates = []
+            for index, parent in enumerate(pop):
+                for _ in range(exploration_per_state):
+                    new_state = random.choice(mutations)(parent)
+                    if new_state:
+                        origin = None
+                        if mutation_stats:
+                            mutation_stats.add_candidate(explored, new_state)
+                            origin = mutation_stats.origin(new_state)
+                        candidate = (
+                            balancer._score(new_state),
+                            index,
+                            new_state.mutation,
+                            new_state.replicas_hash,
+                            origin,
+                        )
+                        candidates.append(candidate)
+                        if pareto_archive:
+                            pareto_archive.add([new_state])
+                            state_candidates[new_state] = candidate
+            best = _select_best(
+                candidates,
+                itemgetter(0),
+                itemgetter(3),
+                _same_candidates(pop),
+                balancer.args.max_pop,
+            )
+            counts = mutation_stats.counts() if mutation_stats else None
+            archive_candidates = []
+            if pareto_archive:
+                archive_candidates = [
+                    state_candidates[state]
+                    for state in pareto_archive.states()
+                ]
+            conn.send((
+                'ok',
+                (len(candidates), best, counts, archive_candidates),
+            ))
+        except Exception:
+            conn.send(('error', traceback.format_exc()))
+    conn.close()
+
+
+def _replay_mutations(pop, pop_mutations):
+    """Return a new population from (parent index, mutation) tuples. A
+    mutation of None keeps the parent state.
+    """
+    return [
+        pop[index] if mutation is None else pop[index].apply(mutation)
+        for index, mutation in pop_mutations
+    ]
+
+
+def _derive_seed(seed, index):
+    """Return the random seed of the index-th worker derived from seed."""
+    return seed * 1000003 + index
+
+
+def _partition_hash(partition, replicas):
+    """Return the contribution of one partition to _State.replicas_hash."""
+    return hash((partition, replicas))
+
+
+def _select_best(candidates, score, fingerprint, same, count):
+    """Return the count highest scoring candidates. Of candidates with the
+    same assignment only the highest scoring one is kept.
+
+    :param candidates: An iterable of candidates.
+    :param score: A function returning the score of a candidate.
+    :param fingerprint: A function returning a hash of the assignment of a
+        candidate.
+    :param same: A function of two candidates with the same fingerprint
+        returning whether they have the same assignment, since different
+        assignments can collide.
+    :param count: The maximum number of candidates to return.
+    """
+    best = []
+    kept = defaultdict(list)
+    for candidate in sorted(candidates, key=score, reverse=True):
+        if len(best) == count:
+            break
+        matches = kept[fingerprint(candidate)]
+        if not any(same(candidate, other) for other in matches):
+            matches.append(candidate)
+            best.append(candidate)
+    return best
+
+
+def _same_replicas(state, other):
+    """Return whether two states have the same assignment."""
+    return state.replicas == other.replicas
+
+
+def _explored_states(pop):
+    """Return a dict mapping the replicas hash of every state of pop to the
+    list of the states with that hash. States are compared by identity, so
+    candidates with the same assignment are recognized by their replicas
+    hash and then their replicas, as in _select_best.
+    """
+    explored = defaultdict(list)
+    for state in pop:
+        explored[state.replicas_hash].append(state)
+    return explored
+
+
+def _candidate_state(pop, candidate):
+    """Return the state of a (score, parent index, mutation, replicas hash,
+    origin) candidate of _ExplorationPool derived from the population pop.
+    """
+    _, index, mutation, _, _ = candidate
+    if mutation is None:
+        return pop[index]
+    return pop[index].apply(mutation)
+
+
+def _same_candidates(pop):
+    """Return a function of two _ExplorationPool candidates derived from the
+    population pop returning whether they have the same assignment.
+    """
+    return lambda candidate, other: _same_replicas(
+        _candidate_state(pop, candidate),
+        _candidate_state(pop, other),
+    )
+
+
+def _count_sums(counts):
+    """Return the (sum, sum of squares) of a sequence of integers."""
+    return sum(counts), sum(count * count for count in counts)
+
+
+def _count_cv(sums, length):
+    """Return the coefficient of variation of a sequence of length integers
+    from its (sum, sum of squares). The sums are integers, so the variance is
+    computed exactly. Behaves like stats.coefficient_of_variation.
+    """
+    total, squares = sums
+    # length ** 2 times the variance.
+    scaled_variance = length * squares - total * total
+    if total == 0:
+        return float("inf") if scaled_variance != 0 else 0
+    return sqrt(scaled_variance) / total
+
+
+def _weight_sums(weights):
+    """Return the (sum, sum of squared deviations from the mean, change count)
+    of a sequence of numbers. The change count is the number of updates made
+    since the sums were computed from the numbers.
+    """
+    total = sum(weights)
+    data_mean = total / len(weights)
+    return total, sum((weight - data_mean) ** 2 for weight in weights), 0
+
+
+def _weight_cv(sums, length):
+    """Return the coefficient of variation of a sequence of length numbers
+    from its _weight_sums. Behaves like stats.coefficient_of_variation.
+    """
+    total, deviations, _ = sums
+    data_mean = total / length
+    # The squared deviations are only updated by differences, so a variance
+    # of zero can be off by a rounding error in either direction.
+    data_variance = max(deviations / length, 0)
+    if data_mean == 0:
+        return float("inf") if data_variance != 0 else 0
+    return sqrt(data_variance) / data_mean
+
+
+class _ChunkedTuple(object):
+    """An immutable sequence stored as a tuple of tuple chunks of about
+    sqrt(n) items each.
+
+    Copies made with alter or replace only rebuild the chunks that contain
+    changed items and share all other chunks with the original, so each copy
+    costs O(sqrt(n)) memory instead of O(n). _ChunkedTuples compare equal to
+    tuples and lists with the same items.
+
+    :param items: The items of the sequence.
+    """
+
+    __slots__ = ('_chunks', '_chunk_size', '_length')
+
+    def __init__(self, items=()):
+        items = tuple(items)
+        self._length = len(items)
+        self._chunk_size = max(int(sqrt(self._length)), 1)
+        self._chunks = tuple(
+            items[start:start + self._chunk_size]
+            for start in range(0, self._length, self._chunk_size)
+        )
+
+    def _derive(self, chunks):
+        """Return a _ChunkedTuple of the same length made of chunks."""
+        derived = object.__new__(_ChunkedTuple)
+        derived._chunks = chunks
+        derived._chunk_size = self._chunk_size
+        derived._length = self._length
+        return derived
+
+    def alter(self, *pairs):
+        """Return a copy with some items altered.
+
+        :param pairs: Any number of (index, func) tuples where index is the
+            index of the item to alter and the new value is func(self[index]).
+        """
+        altered = {}
+        for index, func in pairs:
+            chunk, offset = divmod(index, self._chunk_size)
+            if chunk not in altered:
+                altered[chunk] = list(self._chunks[chunk])
+            altered[chunk][offset] = func(altered[chunk][offset])
+        chunks = list(self._chunks)
+        for chunk, items in six.iteritems(altered):
+            chunks[chunk] = tuple(items)
+        return self._derive(tuple(chunks))
+
+    def replace(self, *pairs):
+        """Return a copy with some items replaced.
+
+        :param pairs: Any number of (index, value) tuples where index is the
+            index of the item to replace and value is its new value.
+        """
+        return self.alter(*(
+            (index, lambda _, value=value: value) for index, value in pairs
+        ))
+
+    def diff(self, other):
+        """Return the indexes of the items that differ from the items of
+        other, a _ChunkedTuple of the same length. Chunks shared with other
+        are skipped without comparing their items.
+        """
+        if self._chunk_size != other._chunk_size:
+            return [
+                index for index, (item, other_item)
+                in enumerate(zip(self, other)) if item != other_item
+            ]
+        indexes = []
+        for chunk_index, (chunk, other_chunk) in enumerate(
+            zip(self._chunks, other._chunks)
+        ):
+            if chunk is other_chunk:
+                continue
+            start = chunk_index * self._chunk_size
+            indexes.extend(
+                start + offset
+                for offset, (item, other_item)
+                in enumerate(zip(chunk, other_chunk)) if item != other_item
+            )
+        return indexes
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("_ChunkedTuple index out of range")
+        chunk, offset = divmod(index, self._chunk_size)
+        return self._chunks[chunk][offset]
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            for item in chunk:
+                yield item
+
+    def __eq__(self, other):
+        if isinstance(other, _ChunkedTuple):
+            # Shared chunks are compared by identity first.
+            return self._length == other._length and (
+                self._chunks == other._chunks
+                if self._chunk_size == other._chunk_size
+                else tuple(self) == tuple(other)
+            )
+        if isinstance(other, (tuple, list)):
+            return tuple(self) == tuple(other)
+        return NotImplemented
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    def __hash__(self):
+        return hash(tuple(self))
+
+    def __reduce__(self):
+        return (_ChunkedTuple, (tuple(self),))
+
+    def __repr__(self):
+        return "_ChunkedTuple({0!r})".format(tuple(self))
 
 
 class _State(object):
@@ -612,8 +2233,11 @@ class _State(object):
     def __init__(self, cluster_topology, brokers=None):
         # Use tuples instead of lists to store all state so that shallow copies
         # can be performed without the danger of accidentally mutating the
-        # original object. Since dict.values() has an arbitrary order, the
-        # lists are sorted so that results are reproducible.
+        # original object. Sequences indexed by partition or topic, which are
+        # large on big clusters, are _ChunkedTuples so that derived states
+        # share all unchanged chunks with their parent. Since dict.values()
+        # has an arbitrary order, the lists are sorted so that results are
+        # reproducible.
         self.partitions = tuple(sorted(
             list(cluster_topology.partitions.values()),
             key=lambda p: p.name,
@@ -627,26 +2251,42 @@ class _State(object):
             key=lambda b: b.id
         ))
 
+        # Replication groups are sorted with the None group (brokers without a
+        # replication group) first since None cannot be compared with ids.
         self.rgs = tuple(sorted(
-            [rg for rg in cluster_topology.rgs.values() if rg.id],
-            key=lambda r: r.id
+            list(cluster_topology.rgs.values()),
+            key=lambda r: (r.id is not None, r.id),
         ))
 
+        # Maps from objects to their index in the tuples above. Brokers that
+        # are not modeled in this state are not in broker_index.
+        topic_index = {topic: index for index, topic in enumerate(self.topics)}
+        broker_index = {
+            broker: index for index, broker in enumerate(self.brokers)
+        }
+        rg_index = {rg: index for index, rg in enumerate(self.rgs)}
+
         # A tuple mapping a partition index to the tuple of replicas for that
         # partition.
-        self.replicas = tuple(
+        self.replicas = _ChunkedTuple(
             tuple(
-                self.brokers.index(broker)
+                broker_index[broker]
                 for broker in partition.replicas
-                if broker in self.brokers
+                if broker in broker_index
             )
             for partition in self.partitions
         )
 
+        # A hash of the replicas of all partitions. States with the same
+        # assignment have the same hash whatever mutations produced them.
+        self.replicas_hash = sum(
+            _partition_hash(partition, replicas)
+            for partition, replicas in enumerate(self.replicas)
+        ) & _HASH_MASK
+
         # A tuple mapping a partition index to the partition's topic index.
         self.partition_topic = tuple(
-            self.topics.index(partition.topic)
-            for partition in self.partitions
+            topic_index[partition.topic] for partition in self.partitions
         )
 
         # A tuple mapping a partition index to the weight of that partition.
@@ -655,36 +2295,71 @@ class _State(object):
         )
 
         # A tuple mapping a topic index to the weight of that topic.
-        self.topic_weights = tuple(
+        self.topic_weights = _ChunkedTuple(
             topic.weight for topic in self.topics
         )
 
-        # A tuple mapping a broker index to the weight of that broker.
-        self.broker_weights = tuple(
-            broker.weight for broker in self.brokers
+        # A tuple mapping a broker index to the index of the replication group
+        # that the broker belongs to.
+        self.broker_rg = tuple(
+            rg_index[broker.replication_group] for broker in self.brokers
         )
 
+        # Per-broker, per-topic and per-replication-group aggregates are
+        # accumulated in a single pass over the replicas of every partition.
+        broker_weights = [0] * len(self.brokers)
+        broker_leader_weights = [0] * len(self.brokers)
+        broker_partition_counts = [0] * len(self.brokers)
+        broker_leader_counts = [0] * len(self.brokers)
+        topic_replica_count = [0] * len(self.topics)
+        topic_broker_count = [
+            [0] * len(self.brokers) for _ in range(len(self.topics))
+        ]
+        rg_replicas = [
+            [0] * len(self.partitions) for _ in range(len(self.rgs))
+        ]
+        for partition, replicas in enumerate(self.replicas):
+            weight = self.partition_weights[partition]
+            topic = self.partition_topic[partition]
+            topic_replica_count[topic] += \
+                self.partitions[partition].replication_factor
+            for broker in replicas:
+                broker_weights[broker] += weight
+                broker_partition_counts[broker] += 1
+                topic_broker_count[topic][broker] += 1
+                rg_replicas[self.broker_rg[broker]][partition] += 1
+            # Partitions that are being re-replicated may have no replicas.
+            leader = next(iter(self.partitions[partition].replicas), None)
+            if leader in broker_index:
+                broker_leader_weights[broker_index[leader]] += weight
+                broker_leader_counts[broker_index[leader]] += 1
+
+        # A tuple mapping a broker index to the weight of that broker.
+        self.broker_weights = tuple(broker_weights)
+
         # A tuple mapping a broker index to the leader weight of that broker.
-        self.broker_leader_weights = tuple(
-            broker.leader_weight for broker in self.brokers
-        )
+        self.broker_leader_weights = tuple(broker_leader_weights)
 
         # A tuple mapping a broker index to the partition count of that broker.
-        self.broker_partition_counts = tuple(
-            len(broker.partitions) for broker in self.brokers
-        )
+        self.broker_partition_counts = tuple(broker_partition_counts)
 
         # A tuple mapping a broker index to the leader count of that broker.
-        self.broker_leader_counts = tuple(
-            broker.count_preferred_replica() for broker in self.brokers
+        self.broker_leader_counts = tuple(broker_leader_counts)
+
+        # Running sums of each per-broker tuple above. They are updated along
+        # with the tuples so that the coefficients of variation used to score
+        # the state take constant time.
+        self._broker_weight_sums = _weight_sums(self.broker_weights)
+        self._broker_leader_weight_sums = _weight_sums(
+            self.broker_leader_weights,
+        )
+        self._broker_partition_count_sums = _count_sums(
+            self.broker_partition_counts,
         )
+        self._broker_leader_count_sums = _count_sums(self.broker_leader_counts)
 
         # The total weight of all partition replicas on the cluster.
-        self.total_weight = sum(
-            partition.weight
-            for broker in self.brokers
-            for partition in broker.partitions
-        )
+        self.total_weight = sum(self.broker_weights)
 
         # A tuple mapping a partition index to the size of that partition.
         self.partition_sizes = tuple(
@@ -693,28 +2368,18 @@ class _State(object):
 
         # A tuple mapping a topic index to the number of replicas of the
         # topic's partitions.
-        self.topic_replica_count = tuple(
-            sum(partition.replication_factor for partition in topic.partitions)
-            for topic in self.topics
-        )
+        self.topic_replica_count = _ChunkedTuple(topic_replica_count)
 
         # A tuple mapping a topic index to a tuple. That tuple is a map from a
         # broker index to the number of partitions of the topic on the broker.
-        self.topic_broker_count = tuple(
-            tuple(
-                sum(
-                    1 for partition in topic.partitions
-                    if broker in partition.replicas and broker in self.brokers
-                )
-                for broker in self.brokers
-            )
-            for topic in self.topics
+        self.topic_broker_count = _ChunkedTuple(
+            tuple(counts) for counts in topic_broker_count
         )
 
         # A tuple mapping a topic index to the number of partition movements
         # required to have all partitions of that topic optimally balanced
         # across all brokers in the cluster.
-        self.topic_broker_imbalance = tuple(
+        self.topic_broker_imbalance = _ChunkedTuple(
             self._calculate_topic_imbalance(topic)
             for topic in range(len(self.topics))
         )
@@ -725,24 +2390,11 @@ class _State(object):
             for topic, imbalance in enumerate(self.topic_broker_imbalance)
         )
 
-        # A tuple mapping a broker index to the index of the replication group
-        # that the broker belongs to.
-        self.broker_rg = tuple(
-            self.rgs.index(broker.replication_group) for broker in self.brokers
-        )
-
         # A tuple mapping a replication group index to a tuple. That tuple is a
         # map from a partition index to the number of replicas of that
         # partition in the replication group.
         self.rg_replicas = tuple(
-            tuple(
-                sum(
-                    1 for broker in rg.brokers
-                    if broker in partition.replicas and broker in self.brokers
-                )
-                for partition in self.partitions
-            )
-            for rg in self.rgs
+            _ChunkedTuple(counts) for counts in rg_replicas
         )
 
         # The total size and count of the partitions that have been moved to
@@ -754,6 +2406,15 @@ class _State(object):
         # this state.
         self.leader_movement_count = 0
 
+        # The (method name, args...) tuple of the change that derived this
+        # state from its parent. It is used to replay the change in another
+        # process without sending the whole state.
+        self.mutation = None
+
+        # The score of this state, cached by GeneticBalancer._score. It is
+        # reset whenever a new state is derived from this one.
+        self.cached_score = None
+
     def move(self, partition, source, dest):
         """Return a new state that is the result of moving a single partition.
 
@@ -762,63 +2423,73 @@ class _State(object):
             from.
         :param dest: The broker index of the broker to move the partition to.
         """
-        new_state = copy(self)
+        new_state = self._derive('move', partition, source, dest)
 
         # Update the partition replica tuple
         source_index = self.replicas[partition].index(source)
-        new_state.replicas = tuple_alter(
-            self.replicas,
-            (partition, lambda replicas: tuple_replace(
-                replicas,
-                (source_index, dest),
-            )),
+        new_state.replicas, new_state.replicas_hash = self._replace_replicas(
+            partition,
+            tuple_replace(self.replicas[partition], (source_index, dest)),
         )
 
         # Update the broker weights
         partition_weight = self.partition_weights[partition]
 
-        new_state.broker_weights = tuple_alter(
+        (
+            new_state.broker_weights,
+            new_state._broker_weight_sums,
+        ) = self._adjust_weights(
             self.broker_weights,
-            (source, lambda broker_weight: broker_weight - partition_weight),
-            (dest, lambda broker_weight: broker_weight + partition_weight),
+            self._broker_weight_sums,
+            (source, -partition_weight),
+            (dest, partition_weight),
         )
 
         # Update the broker partition count
-        new_state.broker_partition_counts = tuple_alter(
+        (
+            new_state.broker_partition_counts,
+            new_state._broker_partition_count_sums,
+        ) = self._adjust_counts(
             self.broker_partition_counts,
-            (source, lambda partition_count: partition_count - 1),
-            (dest, lambda partition_count: partition_count + 1),
+            self._broker_partition_count_sums,
+            (source, -1),
+            (dest, 1),
         )
 
         # Update the broker leader weights
         if source_index == 0:
-            new_state.broker_leader_weights = tuple_alter(
+            (
+                new_state.broker_leader_weights,
+                new_state._broker_leader_weight_sums,
+            ) = self._adjust_weights(
                 self.broker_leader_weights,
-                (source, lambda lw: lw - partition_weight),
-                (dest, lambda lw: lw + partition_weight),
+                self._broker_leader_weight_sums,
+                (source, -partition_weight),
+                (dest, partition_weight),
             )
-            new_state.broker_leader_counts = tuple_alter(
+            (
+                new_state.broker_leader_counts,
+                new_state._broker_leader_count_sums,
+            ) = self._adjust_counts(
                 self.broker_leader_counts,
-                (source, lambda leader_count: leader_count - 1),
-                (dest, lambda leader_count: leader_count + 1),
+                self._broker_leader_count_sums,
+                (source, -1),
+                (dest, 1),
             )
             new_state.leader_movement_count += 1
 
         # Update the topic broker counts
         topic = self.partition_topic[partition]
 
-        new_state.topic_broker_count = tuple_alter(
+        new_state.topic_broker_count = self._adjust_row(
             self.topic_broker_count,
-            (topic, lambda broker_count: tuple_alter(
-                broker_count,
-                (source, lambda count: count - 1),
-                (dest, lambda count: count + 1),
-            )),
+            topic,
+            (source, -1),
+            (dest, 1),
         )
 
         # Update the topic broker imbalance
-        new_state.topic_broker_imbalance = tuple_replace(
-            self.topic_broker_imbalance,
+        new_state.topic_broker_imbalance = self.topic_broker_imbalance.replace(
             (topic, new_state._calculate_topic_imbalance(topic)),
         )
 
@@ -834,16 +2505,11 @@ class _State(object):
         source_rg = self.broker_rg[source]
         dest_rg = self.broker_rg[dest]
         if source_rg != dest_rg:
-            new_state.rg_replicas = tuple_alter(
+            new_state.rg_replicas = self._adjust_column(
                 self.rg_replicas,
-                (source_rg, lambda replica_counts: tuple_alter(
-                    replica_counts,
-                    (partition, lambda replica_count: replica_count - 1),
-                )),
-                (dest_rg, lambda replica_counts: tuple_alter(
-                    replica_counts,
-                    (partition, lambda replica_count: replica_count + 1),
-                )),
+                partition,
+                (source_rg, -1),
+                (dest_rg, 1),
             )
 
         # Update the movement sizes
@@ -860,33 +2526,41 @@ class _State(object):
             leadership of.
         :param new_leader: The broker index of the new leader replica.
         """
-        new_state = copy(self)
+        new_state = self._derive('move_leadership', partition, new_leader)
 
         # Update the partition replica tuple
         source = new_state.replicas[partition][0]
         new_leader_index = self.replicas[partition].index(new_leader)
-        new_state.replicas = tuple_alter(
-            self.replicas,
-            (partition, lambda replicas: tuple_replace(
-                replicas,
-                (0, replicas[new_leader_index]),
-                (new_leader_index, replicas[0]),
-            )),
+        new_state.replicas, new_state.replicas_hash = self._replace_replicas(
+            partition,
+            tuple_replace(
+                self.replicas[partition],
+                (0, new_leader),
+                (new_leader_index, source),
+            ),
         )
 
         # Update the leader count
-        new_state.broker_leader_counts = tuple_alter(
+        (
+            new_state.broker_leader_counts,
+            new_state._broker_leader_count_sums,
+        ) = self._adjust_counts(
             self.broker_leader_counts,
-            (source, lambda leader_count: leader_count - 1),
-            (new_leader, lambda leader_count: leader_count + 1),
+            self._broker_leader_count_sums,
+            (source, -1),
+            (new_leader, 1),
         )
 
         # Update the broker leader weights
         partition_weight = self.partition_weights[partition]
-        new_state.broker_leader_weights = tuple_alter(
+        (
+            new_state.broker_leader_weights,
+            new_state._broker_leader_weight_sums,
+        ) = self._adjust_weights(
             self.broker_leader_weights,
-            (source, lambda leader_weight: leader_weight - partition_weight),
-            (new_leader, lambda leader_weight: leader_weight + partition_weight),
+            self._broker_leader_weight_sums,
+            (source, -partition_weight),
+            (new_leader, partition_weight),
         )
 
         # Update the total leader movement size
@@ -895,31 +2569,38 @@ class _State(object):
         return new_state
 
     def add_replica(self, partition, broker):
-        new_state = copy(self)
+        new_state = self._derive('add_replica', partition, broker)
 
         # Add replica to partition replica tuple
-        new_state.replicas = tuple_alter(
-            self.replicas,
-            (partition, lambda replicas: replicas + (broker, )),
+        new_state.replicas, new_state.replicas_hash = self._replace_replicas(
+            partition,
+            self.replicas[partition] + (broker, ),
         )
 
         # Update the broker partition count
-        new_state.broker_partition_counts = tuple_alter(
+        (
+            new_state.broker_partition_counts,
+            new_state._broker_partition_count_sums,
+        ) = self._adjust_counts(
             self.broker_partition_counts,
-            (broker, lambda partition_count: partition_count + 1),
+            self._broker_partition_count_sums,
+            (broker, 1),
         )
 
         # Update the broker weight
         partition_weight = self.partition_weights[partition]
-        new_state.broker_weights = tuple_alter(
+        (
+            new_state.broker_weights,
+            new_state._broker_weight_sums,
+        ) = self._adjust_weights(
             self.broker_weights,
-            (broker, lambda broker_weight: broker_weight + partition_weight),
+            self._broker_weight_sums,
+            (broker, partition_weight),
         )
 
         # Update the topic weights
         topic = new_state.partition_topic[partition]
-        new_state.topic_weights = tuple_alter(
-            self.topic_weights,
+        new_state.topic_weights = self.topic_weights.alter(
             (topic, lambda topic_weight: topic_weight + partition_weight)
         )
 
@@ -928,23 +2609,19 @@ class _State(object):
 
         # Update the topic broker counts
         topic = self.partition_topic[partition]
-        new_state.topic_broker_count = tuple_alter(
+        new_state.topic_broker_count = self._adjust_row(
             self.topic_broker_count,
-            (topic, lambda broker_counts: tuple_alter(
-                broker_counts,
-                (broker, lambda count: count + 1),
-            )),
+            topic,
+            (broker, 1),
         )
 
         # Update topic replica count
-        new_state.topic_replica_count = tuple_alter(
-            self.topic_replica_count,
+        new_state.topic_replica_count = self.topic_replica_count.alter(
             (topic, lambda replica_count: replica_count + 1),
         )
 
         # Update the topic broker imbalance
-        new_state.topic_broker_imbalance = tuple_replace(
-            self.topic_broker_imbalance,
+        new_state.topic_broker_imbalance = self.topic_broker_imbalance.replace(
             (topic, new_state._calculate_topic_imbalance(topic)),
         )
 
@@ -956,42 +2633,47 @@ class _State(object):
 
         # Update the replication group replica counts
         rg = self.broker_rg[broker]
-        new_state.rg_replicas = tuple_alter(
+        new_state.rg_replicas = self._adjust_column(
             self.rg_replicas,
-            (rg, lambda replica_counts: tuple_alter(
-                replica_counts,
-                (partition, lambda count: count + 1),
-            )),
+            partition,
+            (rg, 1),
         )
 
         return new_state
 
     def remove_replica(self, partition, broker):
-        new_state = copy(self)
+        new_state = self._derive('remove_replica', partition, broker)
 
         # Add replica to partition replica tuple
-        new_state.replicas = tuple_alter(
-            self.replicas,
-            (partition, lambda replicas: tuple_remove(replicas, broker)),
+        new_state.replicas, new_state.replicas_hash = self._replace_replicas(
+            partition,
+            tuple_remove(self.replicas[partition], broker),
         )
 
         # Update the broker partition count
-        new_state.broker_partition_counts = tuple_alter(
+        (
+            new_state.broker_partition_counts,
+            new_state._broker_partition_count_sums,
+        ) = self._adjust_counts(
             self.broker_partition_counts,
-            (broker, lambda partition_count: partition_count - 1),
+            self._broker_partition_count_sums,
+            (broker, -1),
         )
 
         # Update the broker weight
         partition_weight = self.partition_weights[partition]
-        new_state.broker_weights = tuple_alter(
+        (
+            new_state.broker_weights,
+            new_state._broker_weight_sums,
+        ) = self._adjust_weights(
             self.broker_weights,
-            (broker, lambda broker_weight: broker_weight - partition_weight),
+            self._broker_weight_sums,
+            (broker, -partition_weight),
         )
 
         # Update the topic weights
         topic = self.partition_topic[partition]
-        new_state.topic_weights = tuple_alter(
-            self.topic_weights,
+        new_state.topic_weights = self.topic_weights.alter(
             (topic, lambda topic_weight: topic_weight - partition_weight)
         )
 
@@ -1000,23 +2682,19 @@ class _State(object):
 
         # Update the topic broker counts
         topic = self.partition_topic[partition]
-        new_state.topic_broker_count = tuple_alter(
+        new_state.topic_broker_count = self._adjust_row(
             self.topic_broker_count,
-            (topic, lambda broker_count: tuple_alter(
-                broker_count,
-                (broker, lambda count: count - 1),
-            )),
+            topic,
+            (broker, -1),
         )
 
         # Update topic replica count
-        new_state.topic_replica_count = tuple_alter(
-            self.topic_replica_count,
+        new_state.topic_replica_count = self.topic_replica_count.alter(
             (topic, lambda replica_count: replica_count - 1),
         )
 
         # Update the topic broker imbalance
-        new_state.topic_broker_imbalance = tuple_replace(
-            self.topic_broker_imbalance,
+        new_state.topic_broker_imbalance = self.topic_broker_imbalance.replace(
             (topic, new_state._calculate_topic_imbalance(topic)),
         )
 
@@ -1028,16 +2706,152 @@ class _State(object):
 
         # Update the replication group replica counts
         rg = self.broker_rg[broker]
-        new_state.rg_replicas = tuple_alter(
+        new_state.rg_replicas = self._adjust_column(
             self.rg_replicas,
-            (rg, lambda replicas: tuple_alter(
-                replicas,
-                (partition, lambda replica_count: replica_count - 1),
-            )),
+            partition,
+            (rg, -1),
         )
 
         return new_state
 
+    def _derive(self, *mutation):
+        """Return a shallow copy of this state to be changed by mutation.
+
+        :param mutation: The (method name, args...) of the change.
+        """
+        new_state = copy(self)
+        new_state.mutation = mutation
+        new_state.cached_score = None
+        return new_state
+
+    def _replace_replicas(self, partition, replicas):
+        """Return a copy of the replicas of all partitions with the replicas
+        of one partition replaced, along with its updated replicas_hash.
+
+        :param partition: The partition index of the partition.
+        :param replicas: The new tuple of replicas of the partition.
+        """
+        old_hash = _partition_hash(partition, self.replicas[partition])
+        new_hash = _partition_hash(partition, replicas)
+        replicas_hash = (self.replicas_hash - old_hash + new_hash) & _HASH_MASK
+        return self.replicas.replace((partition, replicas)), replicas_hash
+
+    def reassign(self, partition, replicas):
+        """Return a new state in which a partition has the given replicas,
+        reached by moving replicas, adding or removing replicas if the
+        replication factor differs, and changing the leader. The order of the
+        followers may differ from the order of replicas.
+
+        :param partition: The partition index of the partition.
+        :param replicas: The tuple of broker indexes of the new replicas. The
+            first one is the leader.
+        """
+        state = self
+        removed = [b for b in self.replicas[partition] if b not in replicas]
+        added = [b for b in replicas if b not in self.replicas[partition]]
+        for source, dest in zip(removed, added):
+            state = state.move(partition, source, dest)
+        for dest in added[len(removed):]:
+            state = state.add_replica(partition, dest)
+        # Change the leader before removing replicas, since remove_replica
+        # does not account for the leadership of the removed replica.
+        if replicas and state.replicas[partition][0] != replicas[0]:
+            state = state.move_leadership(partition, replicas[0])
+        for source in removed[len(added):]:
+            state = state.remove_replica(partition, source)
+        return state
+
+    def apply(self, mutation):
+        """Return a new state that is the result of replaying a mutation
+        recorded in the mutation attribute of another state.
+        """
+        method = mutation[0]
+        if method not in _MUTATION_METHODS:
+            raise ValueError("Unknown mutation {0}".format(method))
+        return getattr(self, method)(*mutation[1:])
+
+    def _adjust(self, values, *pairs):
+        """Return a copy of a per-broker sequence with some elements adjusted.
+
+        :param values: The sequence to be copied.
+        :param pairs: Any number of (index, delta) tuples where delta is added
+            to the item at index.
+        """
+        adjusted = list(values)
+        for index, delta in pairs:
+            adjusted[index] += delta
+        return tuple(adjusted)
+
+    def _adjust_counts(self, values, sums, *pairs):
+        """Return a copy of a per-broker sequence of integers with some
+        elements adjusted, along with its updated _count_sums.
+
+        :param values: The sequence to be copied.
+        :param sums: The _count_sums of values.
+        :param pairs: Any number of (index, delta) tuples where delta is added
+            to the item at index.
+        """
+        total, squares = sums
+        for index, delta in pairs:
+            total += delta
+            squares += delta * (2 * values[index] + delta)
+        return self._adjust(values, *pairs), (total, squares)
+
+    def _adjust_weights(self, values, sums, *pairs):
+        """Return a copy of a per-broker sequence of weights with some
+        elements adjusted, along with its updated _weight_sums. The sums are
+        computed again from the weights every _WEIGHT_SUMS_REFRESH_INTERVAL
+        updates.
+
+        :param values: The sequence to be copied.
+        :param sums: The _weight_sums of values.
+        :param pairs: Any number of (index, delta) tuples where delta is added
+            to the item at index.
+        """
+        adjusted = self._adjust(values, *pairs)
+        total, deviations, changes = sums
+        if changes + 1 >= _WEIGHT_SUMS_REFRESH_INTERVAL:
+            return adjusted, _weight_sums(adjusted)
+        length = len(values)
+        for index, delta in pairs:
+            old_mean = total / length
+            total += delta
+            # Welford's update of the squared deviations when values[index]
+            # changes and the mean moves from old_mean to total / length.
+            deviations += delta * (
+                2 * values[index] + delta - old_mean - total / length
+            )
+        return adjusted, (total, deviations, changes + 1)
+
+    def _adjust_row(self, table, row, *pairs):
+        """Return a copy of a table with some elements of one row adjusted.
+
+        :param table: The table (_ChunkedTuple of per-broker rows) to be
+            copied.
+        :param row: The index of the row to adjust.
+        :param pairs: Any number of (index, delta) tuples for the row.
+        """
+        return table.alter(
+            (row, lambda values: self._adjust(values, *pairs)),
+        )
+
+    def _adjust_column(self, table, column, *pairs):
+        """Return a copy of a table with one column adjusted in some rows.
+
+        :param table: The table (tuple of _ChunkedTuple rows) to be copied.
+        :param column: The index of the column to adjust.
+        :param pairs: Any number of (row, delta) tuples.
+        """
+        return tuple_alter(
+            table,
+            *(
+                (row, lambda values, delta=delta: values.alter(
+                    (column, lambda count: count + delta),
+                ))
+                for row, delta in pairs
+            )
+        )
+
     @property
     def assignment(self):
         """Return the partition assignment that this state represents."""
@@ -1051,19 +2865,19 @@ class _State(object):
     @property
     def broker_weight_cv(self):
         """Return the coefficient of variation of the weight of the brokers."""
-        return coefficient_of_variation(self.broker_weights)
+        return _weight_cv(self._broker_weight_sums, len(self.brokers))
 
     @property
     def broker_partition_count_cv(self):
-        return coefficient_of_variation(self.broker_partition_counts)
+        return _count_cv(self._broker_partition_count_sums, len(self.brokers))
 
     @property
     def broker_leader_count_cv(self):
-        return coefficient_of_variation(self.broker_leader_counts)
+        return _count_cv(self._broker_leader_count_sums, len(self.brokers))
 
     @property
     def broker_leader_weight_cv(self):
-        return coefficient_of_variation(self.broker_leader_weights)
+        return _weight_cv(self._broker_leader_weight_sums, len(self.brokers))
 
     @property
     def weighted_topic_broker_imbalance(self):
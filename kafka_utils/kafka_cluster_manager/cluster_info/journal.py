@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import
+
+from .error import TransactionError
+
+
+class UndoJournal(object):
+    """Record how to undo the changes made to the brokers and partitions of a
+    cluster topology, so that a transaction can be rolled back at a cost
+    proportional to the number of changes made.
+
+    Each entry is a function and the arguments that undo one change. Changes
+    are only recorded within a transaction. Transactions can be nested: a
+    rollback undoes the changes made since the matching begin.
+    """
+
+    def __init__(self):
+        self._entries = []
+        self._savepoints = []
+
+    @property
+    def active(self):
+        """True within a transaction."""
+        return bool(self._savepoints)
+
+    def record(self, undo, *args):
+        """Record that calling undo with args undoes a change."""
+        if self._savepoints:
+            self._entries.append((undo, args))
+
+    def begin(self):
+        """Begin a transaction."""
+        self._savepoints.append(len(self._entries))
+
+    def commit(self):
+        """Keep the changes of the innermost transaction. They are rolled back
+        with the enclosing transaction, if any.
+
+        :raises: TransactionError, when no transaction has begun.
+        """
+        self._pop_savepoint()
+        if not self._savepoints:
+            del self._entries[:]
+
+    def rollback(self):
+        """Undo the changes of the innermost transaction.
+
+        :raises: TransactionError, when no transaction has begun.
+        """
+        savepoint = self._pop_savepoint()
+        entries = self._entries[savepoint:]
+        del self._entries[savepoint:]
+        # The undo functions make changes themselves, which must not be
+        # recorded.
+        savepoints, self._savepoints = self._savepoints, []
+        try:
+            for undo, args in reversed(entries):
+                undo(*args)
+        finally:
+            self._savepoints = savepoints
+
+    def _pop_savepoint(self):
+        if not self._savepoints:
+            raise TransactionError("No transaction has begun.")
+        return self._savepoints.pop()
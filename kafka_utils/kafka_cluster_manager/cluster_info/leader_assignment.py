@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import
+
+from .min_cost_flow import MinCostFlow
+from .util import compute_optimum
+
+
+def assign_leaders(partitions, brokers, max_changes=None):
+    """Return a dict mapping partitions to their new preferred leader, for
+    the partitions whose preferred leader should change to balance the
+    number of leaders across brokers.
+
+    The assignment is a min-cost flow from partitions to the brokers holding
+    their replicas, in which every broker should lead between opt and opt + 1
+    partitions. In order of priority, it:
+
+    1. keeps brokers marked for leadership revocation from leading,
+    2. gives every other broker at least opt partitions to lead and none
+       more than opt + 1,
+    3. changes as few preferred leaders as possible.
+
+    Unlike requesting and donating leadership between brokers, the flow
+    finds an assignment that is optimal by these criteria in one solve.
+
+    :param partitions: The partitions to assign leaders to.
+    :param brokers: The brokers that may lead. Replicas on other brokers are
+        never made leaders, and partitions without replicas on any of the
+        brokers are left unchanged.
+    :param max_changes: The maximum number of preferred leaders to change,
+        or None for no limit.
+    """
+    brokers = sorted(brokers, key=lambda broker: broker.id)
+    broker_nodes = {broker: 2 + index for index, broker in enumerate(brokers)}
+    partitions = [
+        partition for partition in partitions
+        if any(broker in broker_nodes for broker in partition.replicas)
+    ]
+    # Brokers without replicas of the partitions can't lead any of them.
+    replica_brokers = set(
+        broker for partition in partitions for broker in partition.replicas
+    )
+    eligible_brokers = [
+        broker for broker in brokers
+        if broker in replica_brokers and not broker.revoked_leadership
+    ]
+    if not partitions or not eligible_brokers:
+        return {}
+    opt, _ = compute_optimum(len(eligible_brokers), len(partitions))
+
+    # Every leader change costs 1, so a unit of imbalance costs more than
+    # all the changes together.
+    imbalance_cost = len(partitions) + 1
+    source, sink = 0, 1
+    first_partition_node = 2 + len(brokers)
+    flow = MinCostFlow(first_partition_node + len(partitions))
+    for broker in brokers:
+        node = broker_nodes[broker]
+        if broker.revoked_leadership:
+            flow.add_edge(node, sink, len(partitions), 2 * imbalance_cost)
+        else:
+            flow.add_edge(node, sink, opt, -imbalance_cost)
+            flow.add_edge(node, sink, 1, 0)
+            flow.add_edge(node, sink, len(partitions), imbalance_cost)
+
+    # A dict mapping the edges from partitions to brokers to the partition
+    # and the broker, and the set of those edges that change the leader.
+    leader_edges = {}
+    change_edges = set()
+    for index, partition in enumerate(partitions):
+        node = first_partition_node + index
+        # Every partition must be assigned a leader, whatever it costs.
+        flow.add_edge(source, node, 1, -3 * imbalance_cost)
+        for broker in partition.replicas:
+            if broker not in broker_nodes:
+                continue
+            is_leader = broker is partition.leader
+            edge = flow.add_edge(
+                node,
+                broker_nodes[broker],
+                1,
+                0 if is_leader else 1,
+            )
+            leader_edges[edge] = (partition, broker)
+            if not is_leader:
+                change_edges.add(edge)
+
+    changes = [0]
+
+    def accept(path, units):
+        count = 0
+        change = None
+        for edge in path:
+            if edge in change_edges:
+                count += 1
+                change = edge
+            elif edge ^ 1 in change_edges:
+                count -= 1
+        if max_changes is not None and count > 0:
+            if changes[0] >= max_changes:
+                return None
+            units = min(units, (max_changes - changes[0]) // count)
+            if not units:
+                flow.block_edge(change)
+                return 0
+        changes[0] += count * units
+        return units
+
+    flow.augment(source, sink, accept)
+    return {
+        partition: broker
+        for edge, (partition, broker) in leader_edges.items()
+        if edge in change_edges and flow.edge_flow(edge)
+    }
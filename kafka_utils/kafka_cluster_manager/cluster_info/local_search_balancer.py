@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import
+from __future__ import division
+
+import random
+import time
+from math import exp
+
+from six.moves import range
+
+# The genetic_balancer module is imported rather than GeneticBalancer itself
+# so that --cluster-balancer finds LocalSearchBalancer as the only
+# ClusterBalancer of this module.
+from . import genetic_balancer
+from kafka_utils.util import positive_float
+from kafka_utils.util import positive_int
+from kafka_utils.util import positive_nonzero_int
+
+DEFAULT_MAX_ITERATIONS = 1000
+DEFAULT_NEIGHBORHOOD_SIZE = 100
+DEFAULT_INITIAL_TEMPERATURE = 0.0
+DEFAULT_COOLING_RATE = 0.9999
+
+
+class LocalSearchBalancer(genetic_balancer.GeneticBalancer):
+    """An implementation of cluster rebalancing that improves a single
+    assignment by local search, using the scoring function of the
+    GeneticBalancer.
+
+    Each iteration proposes a number of random partition or leader movements,
+    scores the resulting states and accepts the best one if it improves the
+    score. Since states keep running sums, scoring a movement takes constant
+    time. With a non-zero initial temperature, the search is simulated
+    annealing: a movement that lowers the score by delta is also accepted with
+    probability exp(-delta / temperature), and the temperature decreases every
+    iteration. The best state found is kept.
+
+    :param cluster_topology: The ClusterTopology object that should be acted
+        on.
+    :param args: The program arguments.
+    """
+
+    _description = 'Perform cluster rebalancing using local search.'
+
+    tracks_pareto_assignments = False
+
+    def _add_search_arguments(self, parser):
+        parser.add_argument(
+            '--max-iterations',
+            type=positive_int,
+            default=DEFAULT_MAX_ITERATIONS,
+            help='Number of movements to accept or reject.'
+            ' Default: %(default)s',
+        )
+        parser.add_argument(
+            '--neighborhood-size',
+            type=positive_nonzero_int,
+            default=DEFAULT_NEIGHBORHOOD_SIZE,
+            help='Number of random movements proposed each iteration. The'
+            ' best of them is considered for acceptance. Larger values make'
+            ' better use of a limited number of movements.'
+            ' Default: %(default)s',
+        )
+        parser.add_argument(
+            '--initial-temperature',
+            type=positive_float,
+            default=DEFAULT_INITIAL_TEMPERATURE,
+            help='Initial temperature of simulated annealing. 0 only accepts'
+            ' movements that improve the score (hill climbing). Scores range'
+            ' from 0 to 1, so useful values are small, e.g. 0.0001.'
+            ' Default: %(default)s',
+        )
+        parser.add_argument(
+            '--cooling-rate',
+            type=positive_float,
+            default=DEFAULT_COOLING_RATE,
+            help='Factor the temperature is multiplied by after every'
+            ' iteration. Must be at most 1. Default: %(default)s',
+        )
+
+    def _check_search_args(self, parser):
+        if self.args.cooling_rate > 1:
+            parser.error('--cooling-rate must be at most 1.')
+
+    def rebalance(self):
+        state = self._initial_state()
+        if self._should_rebalance(state):
+            self.log.info("Rebalancing with local search.")
+            state = self._local_search(state)
+        self._update_cluster_topology(state)
+
+    def _local_search(self, state):
+        """Return the best state found by local search from state.
+
+        :param state: The starting state.
+        """
+        mutations = self._mutations()
+        score = self._score(state)
+        best_state, best_score = state, score
+        temperature = self.args.initial_temperature
+        accepted = 0
+
+        start = time.time()
+        for _ in range(self.args.max_iterations):
+            new_state, new_score = None, None
+            for _ in range(self.args.neighborhood_size):
+                candidate = random.choice(mutations)(state)
+                if candidate is not None:
+                    candidate_score = self._score(candidate)
+                    if new_state is None or candidate_score > new_score:
+                        new_state, new_score = candidate, candidate_score
+            if new_state is not None:
+                delta = new_score - score
+                if delta <= 0 and temperature > 0:
+                    accept = random.random() < exp(delta / temperature)
+                else:
+                    accept = delta > 0
+                if accept:
+                    state, score = new_state, new_score
+                    accepted += 1
+                    if score > best_score:
+                        best_state, best_score = state, score
+            temperature *= self.args.cooling_rate
+
+        self.log.debug(
+            "Accepted %d of %d movement(s) in %f seconds. Best score: %f",
+            accepted,
+            self.args.max_iterations,
+            time.time() - start,
+            best_score,
+        )
+        return best_state
+
+    def _can_move(self, state, partition, source, dest):
+        # Unlike the genetic algorithm, which moves at most one partition per
+        # generation, local search can make any number of movements.
+        max_movements = self.args.max_partition_movements
+        if max_movements is not None and state.movement_count >= max_movements:
+            return False
+        return super(LocalSearchBalancer, self)._can_move(
+            state,
+            partition,
+            source,
+            dest,
+        )
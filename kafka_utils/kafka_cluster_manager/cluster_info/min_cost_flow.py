@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import
+
+import heapq
+from collections import deque
+
+from six.moves import range
+
+_INFINITY = float('inf')
+
+
+class MinCostFlow(object):
+    """A min-cost flow solver using successive shortest paths with Dijkstra's
+    algorithm and node potentials.
+
+    Edges are stored in flat lists. Edge i ^ 1 is the residual edge of edge i.
+
+    :param node_count: The number of nodes the network starts with. More can
+        be added with add_node.
+    """
+
+    def __init__(self, node_count=0):
+        self._node_edges = [[] for _ in range(node_count)]
+        self._head = []
+        self._capacity = []
+        self._cost = []
+
+    def add_node(self):
+        """Add a node and return its index."""
+        self._node_edges.append([])
+        return len(self._node_edges) - 1
+
+    def add_edge(self, tail, head, capacity, cost):
+        """Add an edge and return its index."""
+        edge = len(self._head)
+        self._head.extend((head, tail))
+        self._capacity.extend((capacity, 0))
+        self._cost.extend((cost, -cost))
+        self._node_edges[tail].append(edge)
+        self._node_edges[head].append(edge + 1)
+        return edge
+
+    def block_edge(self, edge):
+        """Prevent any more flow from being sent through an edge. Flow already
+        sent through it can still be sent back.
+        """
+        self._capacity[edge] = 0
+
+    def edge_head(self, edge):
+        """Return the node an edge points to."""
+        return self._head[edge]
+
+    def edge_flow(self, edge):
+        """Return the flow through an edge."""
+        return self._capacity[edge ^ 1]
+
+    def augment(self, source, sink, accept):
+        """Augment the flow from source to sink along the cheapest paths,
+        while they have a negative cost. Return the number of units of flow
+        augmented.
+
+        Each phase computes the node potentials with Dijkstra's algorithm and
+        then augments along every path of edges whose reduced cost is zero,
+        all of which are cheapest paths, until none is left. Each path
+        carries as many units as all its edges have capacity for, as long as
+        accept allows them.
+
+        accept(path, units) is called with the list of the edges of each path
+        and the number of units the path can carry. It returns the number of
+        units to send along the path, or None to stop augmenting. A path that
+        accept returns 0 for is skipped, and accept must first block one of
+        its edges with block_edge so that the path is not found again.
+
+        The network must not contain negative cycles.
+        """
+        capacity = self._capacity
+        potentials = self._initial_potentials(source)
+        augmented = 0
+        while True:
+            distances = self._distances(source, sink, potentials)
+            if distances[sink] == _INFINITY:
+                break
+            for node, distance in enumerate(distances):
+                potentials[node] += min(distance, distances[sink])
+            if potentials[sink] - potentials[source] >= 0:
+                break
+
+            next_edges = [0] * len(self._node_edges)
+            while True:
+                path = self._admissible_path(
+                    source,
+                    sink,
+                    potentials,
+                    next_edges,
+                )
+                if path is None:
+                    break
+                units = accept(path, min(capacity[edge] for edge in path))
+                if units is None:
+                    return augmented
+                if not units:
+                    if all(capacity[edge] > 0 for edge in path):
+                        raise ValueError(
+                            "accept rejected a path without blocking any of"
+                            " its edges."
+                        )
+                    continue
+                for edge in path:
+                    capacity[edge] -= units
+                    capacity[edge ^ 1] += units
+                augmented += units
+        return augmented
+
+    def _initial_potentials(self, source):
+        """Return the costs of the cheapest paths from source, which may use
+        negative costs, with the Bellman-Ford algorithm. Unreachable nodes get
+        a potential of 0.
+        """
+        node_edges = self._node_edges
+        head_of = self._head
+        capacity = self._capacity
+        cost = self._cost
+        distances = [_INFINITY] * len(node_edges)
+        distances[source] = 0
+        queue = deque([source])
+        queued = [False] * len(node_edges)
+        queued[source] = True
+        while queue:
+            node = queue.popleft()
+            queued[node] = False
+            for edge in node_edges[node]:
+                if capacity[edge] > 0:
+                    head = head_of[edge]
+                    distance = distances[node] + cost[edge]
+                    if distance < distances[head]:
+                        distances[head] = distance
+                        if not queued[head]:
+                            queued[head] = True
+                            queue.append(head)
+        return [
+            0 if distance == _INFINITY else distance
+            for distance in distances
+        ]
+
+    def _distances(self, source, sink, potentials):
+        """Return the reduced costs of the cheapest paths from source. The
+        search stops once sink is reached, so only nodes closer than sink have
+        exact distances.
+        """
+        node_edges = self._node_edges
+        head_of = self._head
+        capacity = self._capacity
+        cost = self._cost
+        heappush = heapq.heappush
+        heappop = heapq.heappop
+        distances = [_INFINITY] * len(node_edges)
+        distances[source] = 0
+        heap = [(0, source)]
+        while heap:
+            distance, node = heappop(heap)
+            if distance > distances[node]:
+                continue
+            if node == sink:
+                break
+            node_distance = distance + potentials[node]
+            for edge in node_edges[node]:
+                if capacity[edge] > 0:
+                    head = head_of[edge]
+                    head_distance = \
+                        node_distance + cost[edge] - potentials[head]
+                    if head_distance < distances[head]:
+                        distances[head] = head_distance
+                        heappush(heap, (head_distance, head))
+        return distances
+
+    def _admissible_path(self, source, sink, potentials, next_edges):
+        """Return the list of edges of a path from source to sink made of
+        edges with capacity and a reduced cost of zero, or None if there is
+        none. Edges that lead to dead ends are skipped by advancing
+        next_edges, a list mapping each node to the position of the next edge
+        to try, which is kept between calls of the same phase.
+        """
+        node_edges = self._node_edges
+        head_of = self._head
+        capacity = self._capacity
+        cost = self._cost
+        stack = [source]
+        on_stack = {source}
+        path = []
+        while stack:
+            node = stack[-1]
+            if node == sink:
+                return path
+            edges = node_edges[node]
+            potential = potentials[node]
+            while next_edges[node] < len(edges):
+                edge = edges[next_edges[node]]
+                head = head_of[edge]
+                admissible = capacity[edge] > 0 and head not in on_stack
+                if admissible and cost[edge] + potential == potentials[head]:
+                    stack.append(head)
+                    on_stack.add(head)
+                    path.append(edge)
+                    break
+                next_edges[node] += 1
+            else:
+                # Dead end: backtrack and skip the edge that led here.
+                stack.pop()
+                on_stack.discard(node)
+                if path:
+                    path.pop()
+                    next_edges[stack[-1]] += 1
+        return None
@@ -0,0 +1,543 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import
+
+from collections import defaultdict
+
+import six
+from six.moves import range
+
+# The genetic_balancer module is imported rather than GeneticBalancer itself
+# so that --cluster-balancer finds MinCostFlowBalancer as the only
+# ClusterBalancer of this module.
+from . import genetic_balancer
+from .leader_assignment import assign_leaders
+from .min_cost_flow import MinCostFlow
+from .util import compute_optimum
+from kafka_utils.util import positive_nonzero_int
+
+DEFAULT_BROKER_IMBALANCE_COST = 10
+DEFAULT_REPLICATION_GROUP_IMBALANCE_COST = 100
+DEFAULT_TOPIC_IMBALANCE_COST = 1
+
+
+class MinCostFlowBalancer(genetic_balancer.GeneticBalancer):
+    """An implementation of cluster rebalancing that places replicas by
+    solving a min-cost flow problem.
+
+    Every unit of flow moves a replica from a broker with too many replicas
+    to a broker with too few. The flow network has a node for the replicas
+    leaving each such broker and for the replicas entering it, a node for the
+    replicas of each topic leaving each broker that holds the topic, a node
+    for the replicas of each topic entering each replication group, a node
+    per replication group for each partition that has a replica that may
+    leave its broker and a node per partition joining them:
+
+        source -> broker -> (topic, broker) -> (partition, rg) -> [partition]
+            -> (partition, rg) -> (topic, rg) -> broker -> sink
+
+    An edge from a (topic, broker) node to a (partition, rg) node removes a
+    replica of the partition from the broker and costs one movement. An edge
+    from a (partition, rg) node to a (topic, rg) node adds replicas of the
+    partition to the rg, up to the number of brokers that may receive them.
+    The source and sink edges of each broker reward, with a negative cost,
+    every replica that brings the broker closer to its optimal replica
+    count. The further the broker is from its optimum, rounded down to a
+    power of two, the larger the reward, so replicas move from the most
+    loaded brokers to the least loaded ones first. The edges of the
+    (topic, broker) and (topic, rg) nodes reward the replicas that spread the
+    topic more evenly across brokers and penalize those that stack it on a
+    broker. The edges between the (partition, rg) nodes of a partition
+    penalize movements that make the replicas of the partition less balanced
+    across replication groups.
+
+    Flow is augmented along the cheapest paths, as long as they have a
+    negative cost, that is, as long as they improve the balance by more than
+    the movements they cost, and fit in the movement limits. A path whose
+    movements don't fit in --max-movement-size is skipped and the largest
+    partition it moves is not moved. The replicas added to a replication
+    group are then given to the brokers that the flow adds replicas of the
+    topic to, among those that don't hold the partition yet. A moved leader
+    is replaced by the replica that takes its place. With --leaders,
+    preferred leaders are then balanced by assign_leaders, within what is
+    left of --max-leader-changes after the leaders changed by the moves.
+
+    The scoring, decommissioning and replica changes of the GeneticBalancer
+    are used unchanged.
+
+    :param cluster_topology: The ClusterTopology object that should be acted
+        on.
+    :param args: The program arguments.
+    """
+
+    _description = 'Perform cluster rebalancing using min-cost flow.'
+
+    tracks_pareto_assignments = False
+
+    def _add_search_arguments(self, parser):
+        parser.add_argument(
+            '--broker-imbalance-cost',
+            type=positive_nonzero_int,
+            default=DEFAULT_BROKER_IMBALANCE_COST,
+            help='Cost of a replica above or below the optimal replica count'
+            ' of a broker, relative to the cost of one replica movement.'
+            ' Default: %(default)s',
+        )
+        parser.add_argument(
+            '--replication-group-imbalance-cost',
+            type=positive_nonzero_int,
+            default=DEFAULT_REPLICATION_GROUP_IMBALANCE_COST,
+            help='Cost of a replica of a partition above or below the optimal'
+            ' replica count of the partition in a replication group, relative'
+            ' to the cost of one replica movement. Default: %(default)s',
+        )
+
+        parser.add_argument(
+            '--topic-imbalance-cost',
+            type=positive_nonzero_int,
+            default=DEFAULT_TOPIC_IMBALANCE_COST,
+            help='Cost of a replica of a topic above or below the optimal'
+            ' replica count of the topic on a broker, relative to the cost of'
+            ' one replica movement. Default: %(default)s',
+        )
+
+    def _check_search_args(self, parser):
+        pass
+
+    def rebalance(self):
+        state = self._initial_state()
+        if self.args.brokers:
+            self.log.info("Rebalancing with min-cost flow.")
+            state = self._place_replicas(state)
+        self._update_cluster_topology(state)
+        if self.args.leaders:
+            self.log.info("Rebalancing leaders with min-cost flow.")
+            # Moving the replica of a leader changes the leader, so those
+            # changes count against --max-leader-changes.
+            max_changes = self.args.max_leader_changes
+            if max_changes is not None:
+                max_changes = max(max_changes - state.leader_movement_count, 0)
+            new_leaders = assign_leaders(
+                sorted(
+                    six.itervalues(self.cluster_topology.partitions),
+                    key=lambda partition: partition.name,
+                ),
+                self.cluster_topology.active_brokers,
+                max_changes,
+            )
+            for partition in sorted(new_leaders, key=lambda p: p.name):
+                partition.swap_leader(new_leaders[partition])
+            self.log.info("%d preferred leader(s) changed.", len(new_leaders))
+
+    def _place_replicas(self, state):
+        """Return the state reached from state by moving the replicas chosen
+        by the min-cost flow.
+
+        :param state: The starting state. Its brokers must be the active
+            brokers of the cluster.
+        """
+        network = _FlowNetwork(self, state)
+        sizes = state.partition_sizes
+        max_count = self.args.max_partition_movements
+        max_size = self.args.max_movement_size
+        movement = {
+            'count': state.movement_count,
+            'size': state.movement_size,
+        }
+
+        def accept(path, units):
+            # Every movement removes one replica, so movements are counted by
+            # removal edges. A removal edge traversed backwards cancels an
+            # earlier movement.
+            count = 0
+            size = 0
+            # The removal edge of the path that moves the largest partition.
+            largest = None
+            for edge in path:
+                if edge in network.removals:
+                    partition, _ = network.removals[edge]
+                    count += 1
+                    size += sizes[partition]
+                    if largest is None or sizes[partition] > largest[0]:
+                        largest = (sizes[partition], edge)
+                elif edge ^ 1 in network.removals:
+                    partition, _ = network.removals[edge ^ 1]
+                    count -= 1
+                    size -= sizes[partition]
+            if max_count is not None and count > 0:
+                if movement['count'] >= max_count:
+                    return None
+                units = min(units, (max_count - movement['count']) // count)
+            if max_size is not None and size > 0:
+                units = min(units, int((max_size - movement['size']) // size))
+            if units <= 0:
+                # The movements of the path don't fit in the limits. Cheaper
+                # movements may still fit, so only the largest one is ruled
+                # out.
+                network.flow.block_edge(largest[1])
+                return 0
+            movement['count'] += count * units
+            movement['size'] += size * units
+            return units
+
+        augmented = network.flow.augment(network.source, network.sink, accept)
+        self.log.debug("Augmented %d unit(s) of flow.", augmented)
+        return network.apply(state)
+
+
+class _FlowNetwork(object):
+    """The flow network of the replica placement of a state.
+
+    :param balancer: The MinCostFlowBalancer whose arguments set the costs.
+    :param state: The state to build the network of.
+    """
+
+    def __init__(self, balancer, state):
+        args = balancer.args
+        broker_count = len(state.brokers)
+        topic_cost = args.topic_imbalance_cost
+
+        # Without --replication-groups, all brokers are treated as a single
+        # replication group.
+        if args.replication_groups:
+            rg_brokers = [[] for _ in state.rgs]
+            for broker, rg in enumerate(state.broker_rg):
+                rg_brokers[rg].append(broker)
+        else:
+            rg_brokers = [list(range(broker_count))]
+        self._broker_rg = [None] * broker_count
+        for rg, brokers in enumerate(rg_brokers):
+            for broker in brokers:
+                self._broker_rg[broker] = rg
+        rgs = [rg for rg, brokers in enumerate(rg_brokers) if brokers]
+
+        self.flow = MinCostFlow()
+        self.source = self.flow.add_node()
+        self.sink = self.flow.add_node()
+
+        # The optimal replica count of a broker is computed within its
+        # replication group, since the replicas of each partition are kept
+        # balanced across replication groups. A broker above the lower bound
+        # of its optimum may give replicas away and a broker below the upper
+        # bound may receive them, never both. Each gets a node for the
+        # replicas leaving or entering it.
+        leave_nodes = {}
+        enter_nodes = {}
+        # A dict mapping a broker index to the number of replicas that may
+        # leave or enter it.
+        broker_units = {}
+        for brokers in rg_brokers:
+            rg_total = sum(
+                state.broker_partition_counts[broker] for broker in brokers
+            )
+            lo, extra = compute_optimum(len(brokers), rg_total)
+            hi = lo + (1 if extra else 0)
+            for broker in brokers:
+                count = state.broker_partition_counts[broker]
+                if count > lo:
+                    leave_nodes[broker] = self.flow.add_node()
+                    broker_units[broker] = count - lo
+                    for capacity, cost in _broker_leave_costs(count, lo, hi):
+                        self.flow.add_edge(
+                            self.source,
+                            leave_nodes[broker],
+                            capacity,
+                            cost * args.broker_imbalance_cost,
+                        )
+                elif count < hi:
+                    enter_nodes[broker] = self.flow.add_node()
+                    broker_units[broker] = hi - count
+                    for capacity, cost in _broker_enter_costs(count, lo, hi):
+                        self.flow.add_edge(
+                            enter_nodes[broker],
+                            self.sink,
+                            capacity,
+                            cost * args.broker_imbalance_cost,
+                        )
+
+        # The replicas of each topic are spread over all brokers, as scored
+        # by the GeneticBalancer. Moving a replica of a topic off a broker
+        # holding more than its share of the topic, or onto a broker holding
+        # less, is rewarded and moving it the other way is penalized.
+        topic_count = len(state.topics)
+        topic_partition_count = [0] * topic_count
+        for topic in state.partition_topic:
+            topic_partition_count[topic] += 1
+        topic_bounds = []
+        for topic in range(topic_count):
+            lo, extra = compute_optimum(
+                broker_count,
+                state.topic_replica_count[topic],
+            )
+            topic_bounds.append((lo, lo + (1 if extra else 0)))
+
+        # The replicas of a topic leaving a broker go through a node of the
+        # topic and the broker, created for the brokers holding the topic
+        # only. The replicas of a topic entering the brokers of a replication
+        # group go through a single node of the topic and the replication
+        # group, with an edge to each broker that may receive them.
+        topic_leave_nodes = {}
+        topic_enter_nodes = {}
+
+        def topic_leave_node(topic, broker):
+            node = topic_leave_nodes.get((topic, broker))
+            if node is None:
+                node = topic_leave_nodes[(topic, broker)] = \
+                    self.flow.add_node()
+                lo, hi = topic_bounds[topic]
+                count = state.topic_broker_count[topic][broker]
+                for capacity, cost in _leave_costs(
+                    count, lo, hi, min(count, broker_units[broker]),
+                    -topic_cost, topic_cost,
+                ):
+                    self.flow.add_edge(
+                        leave_nodes[broker],
+                        node,
+                        capacity,
+                        cost,
+                    )
+            return node
+
+        def topic_enter_node(topic, rg):
+            node = topic_enter_nodes.get((topic, rg))
+            if node is None:
+                node = topic_enter_nodes[(topic, rg)] = self.flow.add_node()
+                lo, hi = topic_bounds[topic]
+                for broker in rg_brokers[rg]:
+                    if broker not in enter_nodes:
+                        continue
+                    count = state.topic_broker_count[topic][broker]
+                    for capacity, cost in _enter_costs(
+                        count, lo, hi,
+                        min(
+                            topic_partition_count[topic] - count,
+                            broker_units[broker],
+                        ),
+                        -topic_cost, topic_cost,
+                    ):
+                        edge = self.flow.add_edge(
+                            node,
+                            enter_nodes[broker],
+                            capacity,
+                            cost,
+                        )
+                        self._placements[edge] = (topic, rg, broker)
+            return node
+
+        # A dict mapping the index of each edge that removes a replica to
+        # the (partition index, broker index) of the replica.
+        self.removals = {}
+        # A dict mapping the index of each edge that adds replicas of a
+        # partition to a replication group to the (partition index,
+        # replication group index).
+        self._additions = {}
+        # A dict mapping the index of each edge that adds replicas of a topic
+        # to a broker to the (topic index, replication group index, broker
+        # index).
+        self._placements = {}
+
+        # Every partition with a replica that may leave its broker gets a
+        # node per replication group, joined by another node if there are
+        # several replication groups. Other partitions cannot move.
+        rg_cost = args.replication_group_imbalance_cost
+        for partition, replicas in enumerate(state.replicas):
+            if not any(broker in leave_nodes for broker in replicas):
+                continue
+            topic = state.partition_topic[partition]
+            join = self.flow.add_node() if len(rgs) > 1 else None
+            rg_lo, rg_extra = compute_optimum(len(rgs), len(replicas))
+            rg_hi = rg_lo + (1 if rg_extra else 0)
+            for rg in rgs:
+                node = self.flow.add_node()
+                count = 0
+                free = 0
+                for broker in rg_brokers[rg]:
+                    if broker in replicas:
+                        count += 1
+                        if broker in leave_nodes:
+                            edge = self.flow.add_edge(
+                                topic_leave_node(topic, broker),
+                                node,
+                                1,
+                                1,
+                            )
+                            self.removals[edge] = (partition, broker)
+                    elif broker in enter_nodes:
+                        free += 1
+                if free:
+                    edge = self.flow.add_edge(
+                        node,
+                        topic_enter_node(topic, rg),
+                        free,
+                        0,
+                    )
+                    self._additions[edge] = (partition, rg)
+                # Movements between replication groups are free unless they
+                # make the replicas of the partition less balanced across
+                # replication groups. Rewarding movements that improve that
+                # balance would create negative cycles through the join node,
+                # which successive shortest paths cannot handle.
+                if join is not None:
+                    for capacity, cost in _leave_costs(
+                        count, rg_lo, rg_hi, count, 0, rg_cost,
+                    ):
+                        self.flow.add_edge(node, join, capacity, cost)
+                    for capacity, cost in _enter_costs(
+                        count, rg_lo, rg_hi, len(rg_brokers[rg]) - count,
+                        0, rg_cost,
+                    ):
+                        self.flow.add_edge(join, node, capacity, cost)
+
+    def apply(self, state):
+        """Return the state reached from state by making the movements of the
+        current flow.
+
+        The flow tells which replicas are removed, how many replicas of each
+        partition are added to each replication group and how many replicas
+        of each topic are added to each broker. The added replicas of a
+        partition are given to the brokers of the replication group that
+        receive the most replicas of the topic and don't hold the partition
+        yet. A replica that no such broker is left for is not moved.
+        """
+        removed = defaultdict(list)
+        for edge in sorted(self.removals):
+            if self.flow.edge_flow(edge):
+                partition, broker = self.removals[edge]
+                removed[partition].append(broker)
+
+        # A dict mapping (topic index, replication group index) to a dict
+        # mapping each broker index to the number of replicas of the topic it
+        # receives.
+        placements = defaultdict(lambda: defaultdict(int))
+        for edge, (topic, rg, broker) in six.iteritems(self._placements):
+            units = self.flow.edge_flow(edge)
+            if units:
+                placements[(topic, rg)][broker] += units
+
+        added = defaultdict(list)
+        unplaced = defaultdict(list)
+        for edge in sorted(self._additions):
+            partition, rg = self._additions[edge]
+            brokers = placements[(state.partition_topic[partition], rg)]
+            for _ in range(self.flow.edge_flow(edge)):
+                taken = set(state.replicas[partition]).union(added[partition])
+                candidates = [
+                    broker for broker, units in six.iteritems(brokers)
+                    if units > 0 and broker not in taken
+                ]
+                if not candidates:
+                    unplaced[partition].append(rg)
+                    continue
+                dest = max(
+                    candidates,
+                    key=lambda broker: (brokers[broker], -broker),
+                )
+                brokers[dest] -= 1
+                added[partition].append(dest)
+
+        for partition in sorted(removed):
+            sources = removed[partition]
+            # Keep a replica in place for each replica that could not be
+            # added, preferably in the same replication group.
+            for rg in unplaced[partition]:
+                same_rg = [
+                    source for source in sources
+                    if self._broker_rg[source] == rg
+                ]
+                sources.remove(same_rg[-1] if same_rg else sources[-1])
+            for source, dest in zip(sources, added[partition]):
+                state = state.move(partition, source, dest)
+        return state
+
+
+def _distance_bands(distance):
+    """Return the (count, band) pairs that group the distances from distance
+    down to 1 into bands of powers of two: each band is the largest power of
+    two not above its distances, and count is the number of distances in it.
+    """
+    bands = []
+    while distance > 0:
+        band = 1 << (distance.bit_length() - 1)
+        bands.append((distance - band + 1, band))
+        distance = band - 1
+    return bands
+
+
+def _broker_leave_costs(count, lo, hi):
+    """Return the (capacity, cost) pairs of the edges used to remove one
+    replica after another from a broker with count replicas, down to lo,
+    whose optimal replica count is between lo and hi.
+
+    Removing a replica from a broker holding d replicas more than hi reduces
+    its imbalance, the sum of the squared distances of the brokers from their
+    optimum, by about 2 * d. The reward of a replica is d rounded down to a
+    power of two, so that the replicas of brokers at similar distances share
+    a cost and are moved in the same augmentation phase.
+    """
+    return [
+        (capacity, -band) for capacity, band
+        in _distance_bands(max(count - hi, 0))
+    ] + [
+        (capacity, 0) for capacity in (min(count, hi) - lo,) if capacity > 0
+    ]
+
+
+def _broker_enter_costs(count, lo, hi):
+    """Return the (capacity, cost) pairs of the edges used to add one replica
+    after another to a broker with count replicas, up to hi, as
+    _broker_leave_costs does.
+    """
+    return [
+        (capacity, -band) for capacity, band
+        in _distance_bands(max(lo - count, 0))
+    ] + [
+        (capacity, 0) for capacity in (hi - max(count, lo),) if capacity > 0
+    ]
+
+
+def _leave_costs(count, lo, hi, units, reward, penalty):
+    """Return the (capacity, cost) pairs of the edges used to remove up to
+    units elements from a group holding count elements, whose optimal count
+    is between lo and hi. Removing elements above hi costs reward, removing
+    elements below lo costs penalty and removing other elements is free.
+    """
+    above = max(min(count - hi, units), 0)
+    within = max(min(count - above - lo, units - above), 0)
+    below = units - above - within
+    return [
+        (cap, cost) for cap, cost in (
+            (above, reward),
+            (within, 0),
+            (below, penalty),
+        ) if cap > 0
+    ]
+
+
+def _enter_costs(count, lo, hi, units, reward, penalty):
+    """Return the (capacity, cost) pairs of the edges used to add up to units
+    elements to a group holding count elements, whose optimal count is
+    between lo and hi. Adding elements below lo costs reward, adding elements
+    above hi costs penalty and adding other elements is free.
+    """
+    below = max(min(lo - count, units), 0)
+    within = max(min(hi - count - below, units - below), 0)
+    above = units - below - within
+    return [
+        (cap, cost) for cap, cost in (
+            (below, reward),
+            (within, 0),
+            (above, penalty),
+        ) if cap > 0
+    ]
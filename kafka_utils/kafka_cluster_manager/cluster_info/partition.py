@@ -19,9 +19,23 @@ class Partition(object):
     """Class representing the partition object.
     It contains topic-partition_id tuple as name, topic and replicas
     (list of brokers).
+
+    Changes of the replicas are reported to the topic, and changes of the
+    preferred leader to the brokers involved, which keep running totals.
+    When a journal is given, swap_leader records how to undo its change in it.
     """
 
-    def __init__(self, topic, id, replicas=None, weight=0, size=0):
+    __slots__ = ('_name', '_replicas', '_topic', '_weight', '_size', '_journal')
+
+    def __init__(
+            self,
+            topic,
+            id,
+            replicas=None,
+            weight=0,
+            size=0,
+            journal=None,
+    ):
         # Every partition name has (topic, partition) tuple
         self._name = (topic.id, id)
         self._replicas = replicas or []
@@ -44,6 +58,7 @@ class Partition(object):
             )
         self._weight = weight
         self._size = size
+        self._journal = journal
 
     @property
     def name(self):
@@ -97,9 +112,38 @@ class Partition(object):
         """
         return self._size
 
-    def add_replica(self, broker):
-        """Add broker to existing set of replicas."""
-        self._replicas.append(broker)
+    def add_replica(self, broker, index=None):
+        """Add broker to existing set of replicas.
+
+        :param index: The position of broker in the replicas. By default
+            broker is appended.
+        """
+        if index is None:
+            self._replicas.append(broker)
+            index = len(self._replicas) - 1
+        else:
+            if index == 0 and self._replicas:
+                self._replicas[0].remove_leadership(self)
+            self._replicas.insert(index, broker)
+        self._topic.add_replica(self)
+        if index == 0:
+            broker.add_leadership(self)
+
+    def remove_replica(self, broker):
+        """Remove broker from the replicas. If broker is the preferred leader,
+        the next replica becomes the preferred leader.
+
+        :returns: The position broker had in the replicas.
+        :raises: ValueError, when broker is not a replica.
+        """
+        index = self._replicas.index(broker)
+        del self._replicas[index]
+        self._topic.remove_replica(self)
+        if index == 0:
+            broker.remove_leadership(self)
+            if self._replicas:
+                self._replicas[0].add_leadership(self)
+        return index
 
     def swap_leader(self, new_leader):
         """Change the preferred leader with one of
@@ -109,11 +153,16 @@ class Partition(object):
         partition needs to be changed.
         """
         # Replica set cannot be changed
-        assert(new_leader in self._replicas)
+        assert new_leader in self._replicas
         curr_leader = self.leader
         idx = self._replicas.index(new_leader)
         self._replicas[0], self._replicas[idx] = \
             self._replicas[idx], self._replicas[0]
+        if idx != 0:
+            curr_leader.remove_leadership(self)
+            new_leader.add_leadership(self)
+            if self._journal is not None:
+                self._journal.record(self.swap_leader, curr_leader)
         return curr_leader
 
     def replace(self, source, dest):
@@ -121,6 +170,9 @@ class Partition(object):
         for i, broker in enumerate(self.replicas):
             if broker == source:
                 self.replicas[i] = dest
+                if i == 0:
+                    source.remove_leadership(self)
+                    dest.add_leadership(self)
                 return
 
     def count_siblings(self, partitions):
@@ -30,8 +30,17 @@ from .error import InvalidPartitionError
 from .error import InvalidReplicationFactorError
 from .error import NotEligibleGroupError
 from .error import RebalanceError
+from .broker import Broker
+from .leader_assignment import assign_leaders
+from .partition import Partition
+from .rg import ReplicationGroup
+from .topic import Topic
 from .util import compute_optimum
+from .util import multiprocessing_context
 from .util import separate_groups
+from kafka_utils.util import positive_nonzero_int
+
+DEFAULT_WORKERS = 1
 
 
 class PartitionCountBalancer(ClusterBalancer):
@@ -43,6 +52,10 @@ class PartitionCountBalancer(ClusterBalancer):
     :param args: The program arguments.
     """
 
+    # Only leaders are changed without moving single replicas between
+    # brokers.
+    columnar_topology_methods = frozenset(['revoke_leadership', 'score'])
+
     def __init__(self, cluster_topology, args):
         super(PartitionCountBalancer, self).__init__(cluster_topology, args)
         self.log = logging.getLogger(self.__class__.__name__)
@@ -63,6 +76,14 @@ class PartitionCountBalancer(ClusterBalancer):
             description='Balance the cluster based on the number of partitions'
             ' per broker and replication-group.',
         )
+        parser.add_argument(
+            '--workers',
+            type=positive_nonzero_int,
+            default=DEFAULT_WORKERS,
+            help='Number of worker processes used to rebalance the brokers of'
+            ' different replication groups concurrently. The result does not'
+            ' depend on the number of workers. Default: %(default)s',
+        )
         parser.parse_args(balancer_args, self.args)
 
     def decommission_brokers(self, broker_ids):
@@ -202,9 +223,39 @@ class PartitionCountBalancer(ClusterBalancer):
 
     # Re-balancing partition count across brokers
     def rebalance_brokers(self):
-        """Rebalance partition-count across brokers within each replication-group."""
-        for rg in six.itervalues(self.cluster_topology.rgs):
-            rg.rebalance_brokers()
+        """Rebalance partition-count across brokers within each replication-group.
+
+        Rebalancing the brokers of a replication-group only moves partitions
+        between brokers of that group, so with --workers the groups are
+        rebalanced concurrently. Each worker process receives a copy of the
+        brokers and partitions of one group and sends back the movements it
+        made, which are then replayed on the cluster topology in the order of
+        the groups. The result is the same as rebalancing the groups one after
+        another.
+        """
+        rgs = list(six.itervalues(self.cluster_topology.rgs))
+        if self.args.workers == 1 or len(rgs) == 1:
+            for rg in rgs:
+                rg.rebalance_brokers()
+            return
+
+        pool = multiprocessing_context().Pool(min(self.args.workers, len(rgs)))
+        try:
+            group_moves = pool.map(
+                _rebalance_group_brokers,
+                [_serialize_group(rg) for rg in rgs],
+            )
+        finally:
+            pool.terminate()
+            pool.join()
+        brokers = self.cluster_topology.brokers
+        partitions = self.cluster_topology.partitions
+        for moves in group_moves:
+            for partition_name, source_id, dest_id in moves:
+                brokers[source_id].move_partition(
+                    partitions[partition_name],
+                    brokers[dest_id],
+                )
 
     def revoke_leadership(self, broker_ids):
         """Revoke leadership for given brokers.
@@ -221,13 +272,9 @@ class PartitionCountBalancer(ClusterBalancer):
                 )
             broker.mark_revoked_leadership()
 
-        assert(len(self.cluster_topology.brokers) - len(broker_ids) > 0), "Not " \
-            "all brokers can be revoked for leadership"
-        opt_leader_cnt = len(self.cluster_topology.partitions) // (
-            len(self.cluster_topology.brokers) - len(broker_ids)
-        )
-        # Balanced brokers transfer leadership to their under-balanced followers
-        self.rebalancing_non_followers(opt_leader_cnt)
+        assert len(self.cluster_topology.brokers) - len(broker_ids) > 0, \
+            "Not all brokers can be revoked for leadership"
+        self._assign_leaders()
 
         # If the broker-ids to be revoked from leadership are still leaders for any
         # partitions, try to forcefully move their leadership to followers if possible
@@ -285,52 +332,27 @@ class PartitionCountBalancer(ClusterBalancer):
         """Re-order brokers in replicas such that, every broker is assigned as
         preferred leader evenly.
         """
-        opt_leader_cnt = len(self.cluster_topology.partitions) // len(self.cluster_topology.brokers)
-        # Balanced brokers transfer leadership to their under-balanced followers
-        self.rebalancing_non_followers(opt_leader_cnt)
-
-    def rebalancing_non_followers(self, opt_cnt):
-        """Transfer leadership to any under-balanced followers on the pretext
-        that they remain leader-balanced or can be recursively balanced through
-        non-followers (followers of other leaders).
-
-        Context:
-        Consider a graph G:
-        Nodes: Brokers (e.g. b1, b2, b3)
-        Edges: From b1 to b2 s.t. b1 is a leader and b2 is its follower
-        State of nodes:
-            1. Over-balanced/Optimally-balanced: (OB)
-                if leadership-count(broker) >= opt-count
-            2. Under-balanced (UB) if leadership-count(broker) < opt-count
-            leader-balanced: leadership-count(broker) is in [opt-count, opt-count+1]
+        self._assign_leaders(self.args.max_leader_changes)
 
-        Algorithm:
-            1. Use Depth-first-search algorithm to find path between
-            between some UB-broker to some OB-broker.
-            2. If path found, update UB-broker and delete path-edges (skip-partitions).
-            3. Continue with step-1 until all possible paths explored.
+    def _assign_leaders(self, max_changes=None):
+        """Swap the preferred leaders chosen by assign_leaders, which keeps
+        brokers marked for leadership revocation from leading wherever
+        possible and balances the leader-count across the other brokers.
+
+        :param max_changes: The maximum number of preferred leaders to
+            change, or None for no limit.
         """
-        # Don't include leaders if they are marked for leadership removal
-        under_brokers = list(filter(
-            lambda b: b.count_preferred_replica() < opt_cnt and not b.revoked_leadership,
+        new_leaders = assign_leaders(
+            sorted(
+                six.itervalues(self.cluster_topology.partitions),
+                key=lambda partition: partition.name,
+            ),
             six.itervalues(self.cluster_topology.brokers),
-        ))
-        if under_brokers:
-            skip_brokers, skip_partitions = [], []
-            for broker in under_brokers:
-                skip_brokers.append(broker)
-                broker.request_leadership(opt_cnt, skip_brokers, skip_partitions)
-
-        over_brokers = list(filter(
-            lambda b: b.count_preferred_replica() > opt_cnt + 1,
-            six.itervalues(self.cluster_topology.brokers),
-        ))
-        # Any over-balanced brokers tries to donate their leadership to followers
-        if over_brokers:
-            skip_brokers, used_edges = [], []
-            for broker in over_brokers:
-                skip_brokers.append(broker)
-                broker.donate_leadership(opt_cnt, skip_brokers, used_edges)
+            max_changes,
+        )
+        for partition in sorted(new_leaders, key=lambda p: p.name):
+            partition.swap_leader(new_leaders[partition])
+        self.log.info("%d preferred leader(s) changed.", len(new_leaders))
 
     # Re-balancing partition count across brokers
     def _rebalance_groups_partition_cnt(self):
@@ -354,10 +376,10 @@ class PartitionCountBalancer(ClusterBalancer):
         6) Repeat steps 1) to 5) until groups are balanced or cannot be balanced further.
         """
         # Segregate replication-groups based on partition-count
-        total_elements = sum(len(rg.partitions) for rg in six.itervalues(self.cluster_topology.rgs))
+        total_elements = sum(rg.partition_count for rg in six.itervalues(self.cluster_topology.rgs))
         over_loaded_rgs, under_loaded_rgs = separate_groups(
             list(self.cluster_topology.rgs.values()),
-            lambda rg: len(rg.partitions),
+            lambda rg: rg.partition_count,
             total_elements,
         )
         if over_loaded_rgs and under_loaded_rgs:
@@ -395,7 +417,7 @@ class PartitionCountBalancer(ClusterBalancer):
                 for eligible_partition in eligible_partitions:
                     # The difference of partition-count b/w the over-loaded and under-loaded
                     # replication-groups should be greater than 1 for convergence
-                    if len(over_loaded_rg.partitions) - len(under_loaded_rg.partitions) > 1:
+                    if over_loaded_rg.partition_count - under_loaded_rg.partition_count > 1:
                         over_loaded_rg.move_partition_replica(
                             under_loaded_rg,
                             eligible_partition,
@@ -404,10 +426,10 @@ class PartitionCountBalancer(ClusterBalancer):
                         break
                     # Move to next replication-group if either of the groups got
                     # balanced, otherwise try with next eligible partition
-                    if (len(under_loaded_rg.partitions) == opt_partition_cnt or
-                            len(over_loaded_rg.partitions) == opt_partition_cnt):
+                    if (under_loaded_rg.partition_count == opt_partition_cnt or
+                            over_loaded_rg.partition_count == opt_partition_cnt):
                         break
-                if len(over_loaded_rg.partitions) == opt_partition_cnt:
+                if over_loaded_rg.partition_count == opt_partition_cnt:
                     # Move to next over-loaded replication-group if balanced
                     break
 
@@ -463,7 +485,7 @@ class PartitionCountBalancer(ClusterBalancer):
                 if rg.count_replica(partition) < opt_replicas
             ]
             candidate_rgs = under_replicated_rgs or non_full_rgs
-            rg = min(candidate_rgs, key=lambda rg: len(rg.partitions))
+            rg = min(candidate_rgs, key=lambda rg: rg.partition_count)
 
             rg.add_replica(partition)
 
@@ -542,7 +564,7 @@ class PartitionCountBalancer(ClusterBalancer):
                 if rg.count_replica(partition) > opt_replica_cnt
             ]
             candidate_rgs = over_replicated_rgs or candidate_rgs
-            rg = max(candidate_rgs, key=lambda rg: len(rg.partitions))
+            rg = max(candidate_rgs, key=lambda rg: rg.partition_count)
 
             osr_in_rg = [b for b in rg.brokers if b in osr]
             rg.remove_replica(partition, osr_in_rg)
@@ -558,3 +580,70 @@ class PartitionCountBalancer(ClusterBalancer):
             key=lambda broker: broker.count_preferred_replica(),
         )
         partition.swap_leader(new_leader)
+
+
+def _serialize_group(rg):
+    """Return the brokers and partitions of a replication-group as a tuple of
+    the group id, a list of (broker id, inactive, decommissioned) tuples and a
+    dict mapping the name of every partition of the group to a tuple of its
+    weight, its size and the ids of its replicas in the group.
+
+    The replicas outside the group are left out. Rebalancing the brokers of a
+    group only counts the partitions of each topic on each of its brokers and
+    only moves replicas between them, so the other replicas can't change the
+    movements made. The preferred leaders, which do depend on them, are
+    changed by replaying the movements on the cluster topology. Rebalancing
+    the brokers doesn't use the weights and sizes either, but they are sent so
+    that the partitions the worker builds measure the same as those of the
+    cluster topology.
+    """
+    return (
+        rg.id,
+        [
+            (broker.id, broker.inactive, broker.decommissioned)
+            for broker in rg.brokers
+        ],
+        {
+            partition.name: (
+                partition.weight,
+                partition.size,
+                [
+                    broker.id for broker in partition.replicas
+                    if broker in rg.brokers
+                ],
+            )
+            for partition in set(rg.partitions)
+        },
+    )
+
+
+def _rebalance_group_brokers(group):
+    """Rebalance the brokers of a replication-group serialized by
+    _serialize_group and return the movements made as (partition name,
+    source broker id, destination broker id) tuples. Run by the worker
+    processes of PartitionCountBalancer.rebalance_brokers.
+    """
+    rg_id, broker_states, assignment = group
+    rg = ReplicationGroup(rg_id)
+    brokers = {}
+    for broker_id, inactive, decommissioned in broker_states:
+        broker = Broker(broker_id)
+        if inactive:
+            broker.mark_inactive()
+        if decommissioned:
+            broker.mark_decommissioned()
+        broker.replication_group = rg
+        rg.add_broker(broker)
+        brokers[broker_id] = broker
+    topics = {}
+    for partition_name, partition_state in six.iteritems(assignment):
+        weight, size, replica_ids = partition_state
+        topic = topics.setdefault(partition_name[0], Topic(partition_name[0]))
+        partition = Partition(topic, partition_name[1], weight=weight, size=size)
+        topic.add_partition(partition)
+        for broker_id in replica_ids:
+            brokers[broker_id].add_partition(partition)
+    return [
+        (partition.name, source.id, dest.id)
+        for partition, source, dest in rg.rebalance_brokers()
+    ]
@@ -71,6 +71,23 @@ class PartitionMeasurer(object):
         """
         raise NotImplementedError("Implement in subclass.")
 
+    def get_metrics(self, partition_names):
+        """Return a dict mapping each partition name to a (weight, size)
+        tuple. Measurers that can gather the metrics of many partitions at
+        once, for example with a single query, should override this method.
+        The default implementation calls get_weight and get_size for each
+        partition.
+
+        :param partition_names: A list of partition names, each a tuple with the topic id and partition id as the first and second elements respectively.
+        """
+        return {
+            partition_name: (
+                self.get_weight(partition_name),
+                self.get_size(partition_name),
+            )
+            for partition_name in partition_names
+        }
+
 
 class UniformPartitionMeasurer(PartitionMeasurer):
     """An implementation of PartitionMeasurer that provides identital metrics
@@ -82,3 +99,6 @@ class UniformPartitionMeasurer(PartitionMeasurer):
 
     def get_size(self, _):
         return 1.0
+
+    def get_metrics(self, partition_names):
+        return dict.fromkeys(partition_names, (1.0, 1.0))
@@ -14,12 +14,15 @@
 # limitations under the License.
 from __future__ import absolute_import
 
+import heapq
 import logging
 import sys
+from array import array
 from collections import defaultdict
 
 import six
 from six.moves import filter
+from six.moves import range
 
 from .error import EmptyReplicationGroupError
 from .error import NotEligibleGroupError
@@ -29,8 +32,15 @@ from .util import separate_groups
 class ReplicationGroup(object):
     """Represent attributes and functions specific to replication-groups
     abbreviated as rg.
+
+    The replica count of each partition in the replication-group is computed
+    on first access and then kept up to date by the partition changes its
+    brokers report. Only the brokers whose replication_group is this group
+    report to it, so the counts are cached only when all its brokers do.
     """
 
+    __slots__ = ('_id', '_brokers', '_sibling_distance', '_replica_counts')
+
     log = logging.getLogger(__name__)
 
     def __init__(self, id, brokers=None):
@@ -41,6 +51,9 @@ class ReplicationGroup(object):
             )
         self._brokers = brokers or set()
         self._sibling_distance = None
+        # A dict mapping partitions to their replica count in the group, None
+        # until first computed.
+        self._replica_counts = None
 
     @property
     def id(self):
@@ -65,6 +78,7 @@ class ReplicationGroup(object):
         """Add broker to current broker-list."""
         if broker not in self._brokers:
             self._brokers.add(broker)
+            self._replica_counts = None
         else:
             self.log.warning(
                 'Broker {broker_id} already present in '
@@ -74,20 +88,69 @@ class ReplicationGroup(object):
                 )
             )
 
+    def _get_replica_counts(self):
+        """Return a dict mapping each partition with replicas in the
+        replication-group to its replica count, or None if the counts can't
+        be kept up to date.
+        """
+        if self._replica_counts is None:
+            if any(
+                    broker.replication_group is not self
+                    for broker in self._brokers
+            ):
+                return None
+            self._replica_counts = defaultdict(int)
+            for broker in self._brokers:
+                for partition in broker.partitions:
+                    self._replica_counts[partition] += 1
+        return self._replica_counts
+
+    def update_aggregates(self, broker, partition, sign):
+        """Update the replica counts for partition being added to (sign 1) or
+        removed from (sign -1) broker. Called by Broker.
+        """
+        if self._replica_counts is not None and broker in self._brokers:
+            self._replica_counts[partition] += sign
+            if not self._replica_counts[partition]:
+                del self._replica_counts[partition]
+
+    def reset_aggregates(self):
+        """Drop the replica counts, to be computed again on next access.
+        Called by Broker when it joins or leaves the group.
+        """
+        self._replica_counts = None
+
     @property
     def partitions(self):
         """Evaluate and return set of all partitions in replication-group.
         rtype: list, replicas of partitions can reside in this group
         """
+        replica_counts = self._get_replica_counts()
+        if replica_counts is None:
+            return [
+                partition
+                for broker in self._brokers
+                for partition in broker.partitions
+            ]
         return [
             partition
-            for broker in self._brokers
-            for partition in broker.partitions
+            for partition, count in six.iteritems(replica_counts)
+            for _ in range(count)
         ]
 
+    @property
+    def partition_count(self):
+        """Return the number of replicas in the replication-group, that is
+        len(self.partitions), without building the list of partitions.
+        """
+        return sum(len(broker.partitions) for broker in self._brokers)
+
     def count_replica(self, partition):
         """Return count of replicas of given partition."""
-        return sum(1 for b in partition.replicas if b in self.brokers)
+        replica_counts = self._get_replica_counts()
+        if replica_counts is None:
+            return sum(1 for b in partition.replicas if b in self._brokers)
+        return replica_counts.get(partition, 0)
 
     def acquire_partition(self, partition, source_broker):
         """Move a partition from a broker to any of the eligible brokers
@@ -210,7 +273,11 @@ class ReplicationGroup(object):
 
     # Re-balancing brokers
     def rebalance_brokers(self):
-        """Rebalance partition-count across brokers."""
+        """Rebalance partition-count across brokers.
+
+        :returns: The list of (partition, source broker, destination broker)
+            movements made, in order.
+        """
         total_partitions = sum(len(b.partitions) for b in self.brokers)
         blacklist = set(b for b in self.brokers if b.decommissioned)
         active_brokers = self.get_active_brokers() - blacklist
@@ -231,8 +298,9 @@ class ReplicationGroup(object):
                 'partition-count.',
                 self._id,
             )
-            return
+            return []
 
+        moves = []
         sibling_distance = self.generate_sibling_distance()
         while under_loaded_brokers and over_loaded_brokers:
             # Get best-fit source-broker, destination-broker and partition
@@ -255,10 +323,13 @@ class ReplicationGroup(object):
                     ),
                 )
                 broker_source.move_partition(victim_partition, broker_destination)
-                sibling_distance = self.update_sibling_distance(
-                    sibling_distance,
-                    broker_destination,
+                moves.append(
+                    (victim_partition, broker_source, broker_destination),
+                )
+                sibling_distance.move(
                     victim_partition.topic,
+                    broker_source,
+                    broker_destination,
                 )
             else:
                 # Brokers are balanced or could not be balanced further
@@ -271,43 +342,59 @@ class ReplicationGroup(object):
             )
             # As before add brokers to decommission.
             over_loaded_brokers += [b for b in blacklist if not b.empty()]
+        return moves
 
     def _get_target_brokers(self, over_loaded_brokers, under_loaded_brokers, sibling_distance):
         """Pick best-suitable source-broker, destination-broker and partition to
         balance partition-count over brokers in given replication-group.
+
+        Source brokers are visited from the most to the least loaded and
+        destination brokers from the least to the most loaded, both popped from
+        heaps as needed, with the broker id breaking ties to ensure
+        determinism.
         """
-        # Sort given brokers to ensure determinism
-        over_loaded_brokers = sorted(
-            over_loaded_brokers,
-            key=lambda b: len(b.partitions),
-            reverse=True,
-        )
-        under_loaded_brokers = sorted(
-            under_loaded_brokers,
-            key=lambda b: len(b.partitions),
-        )
+        sources = [
+            (-len(broker.partitions), broker.id, broker)
+            for broker in over_loaded_brokers
+        ]
+        heapq.heapify(sources)
+        dests = [
+            (len(broker.partitions), broker.id, broker)
+            for broker in under_loaded_brokers
+        ]
+        heapq.heapify(dests)
+        # Destination brokers popped from the heap so far, in order.
+        sorted_dests = []
+
         # pick pair of brokers from source and destination brokers with
         # minimum same-partition-count
         # Set result in format: (source, dest, preferred-partition)
         target = (None, None, None)
         min_distance = sys.maxsize
-        best_partition = None
-        for source in over_loaded_brokers:
-            for dest in under_loaded_brokers:
+        while sources:
+            _, _, source = heapq.heappop(sources)
+            # No partition of source can improve on min_distance.
+            if sibling_distance.min_distance(source) >= min_distance:
+                continue
+            index = 0
+            while True:
+                if index == len(sorted_dests):
+                    if not dests:
+                        break
+                    sorted_dests.append(heapq.heappop(dests)[2])
+                dest = sorted_dests[index]
+                index += 1
                 # A decommissioned broker can have less partitions than
                 # destination. We consider it a valid source because we want to
                 # move all the partitions out from it.
                 if (len(source.partitions) - len(dest.partitions) > 1 or
                         source.decommissioned):
-                    best_partition = source.get_preferred_partition(
+                    distance, best_partition = sibling_distance.best_partition(
+                        source,
                         dest,
-                        sibling_distance[dest][source],
+                        min_distance,
                     )
-                    # If no eligible partition continue with next broker.
-                    if best_partition is None:
-                        continue
-                    distance = sibling_distance[dest][source][best_partition.topic]
-                    if distance < min_distance:
+                    if best_partition is not None:
                         min_distance = distance
                         target = (source, dest, best_partition)
                 else:
@@ -317,33 +404,10 @@ class ReplicationGroup(object):
         return target
 
     def generate_sibling_distance(self):
-        """Generate a dict containing the distance computed as difference in
-        in number of partitions of each topic from under_loaded_brokers
-        to over_loaded_brokers.
-
-        Negative distance means that the destination broker has got less
-        partitions of a certain topic than the source broker.
-
-        returns: dict {dest: {source: {topic: distance}}}
+        """Return a _SiblingDistance holding the number of partitions of each
+        topic on each broker of the replication-group.
         """
-        sibling_distance = defaultdict(lambda: defaultdict(dict))
-        topics = {p.topic for p in self.partitions}
-        for source in self.brokers:
-            for dest in self.brokers:
-                if source != dest:
-                    for topic in topics:
-                        sibling_distance[dest][source][topic] = \
-                            dest.count_partitions(topic) - \
-                            source.count_partitions(topic)
-        return sibling_distance
-
-    def update_sibling_distance(self, sibling_distance, dest, topic):
-        """Update the sibling distance for topic and destination broker."""
-        for source in six.iterkeys(sibling_distance[dest]):
-            sibling_distance[dest][source][topic] = \
-                dest.count_partitions(topic) - \
-                source.count_partitions(topic)
-        return sibling_distance
+        return _SiblingDistance(self.brokers)
 
     def move_partition_replica(self, under_loaded_rg, eligible_partition):
         """Move partition to under-loaded replication-group if possible."""
@@ -427,3 +491,118 @@ class ReplicationGroup(object):
 
     def __repr__(self):
         return "{0}".format(self)
+
+
+class _SiblingDistance(object):
+    """The number of partitions of each topic on each broker of a
+    replication-group, from which the sibling distance between brokers is
+    derived on demand.
+
+    The distance of a topic from a source broker to a destination broker is
+    the number of partitions of the topic in the destination broker minus the
+    number in the source broker. Negative distance means that the destination
+    broker has got less partitions of the topic than the source broker.
+
+    The counts of each broker are stored as an array indexed by topic. The
+    topics of each broker are also grouped by count, so that the partitions
+    with the smallest distances are found without visiting every topic.
+
+    :param brokers: The brokers of the replication-group.
+    """
+
+    def __init__(self, brokers):
+        topics = set(
+            partition.topic
+            for broker in brokers
+            for partition in broker.partitions
+        )
+        self._topics = sorted(topics, key=lambda topic: topic.id)
+        self._topic_index = {
+            topic: index for index, topic in enumerate(self._topics)
+        }
+        self._counts = {}
+        # A dict mapping each broker to a dict mapping counts to the set of
+        # the indexes of the topics with that many partitions on the broker.
+        self._topics_by_count = {}
+        for broker in brokers:
+            counts = array('i', [0]) * len(self._topics)
+            for partition in broker.partitions:
+                counts[self._topic_index[partition.topic]] += 1
+            self._counts[broker] = counts
+            topics_by_count = defaultdict(set)
+            for index, count in enumerate(counts):
+                if count:
+                    topics_by_count[count].add(index)
+            self._topics_by_count[broker] = topics_by_count
+
+    def distance(self, dest, source, topic):
+        """Return the distance of topic from source to dest."""
+        index = self._topic_index[topic]
+        return self._counts[dest][index] - self._counts[source][index]
+
+    def min_distance(self, source):
+        """Return a lower bound of the distance of the partitions of source
+        to any broker.
+        """
+        topics_by_count = self._topics_by_count[source]
+        return -max(topics_by_count) if topics_by_count else 0
+
+    def move(self, topic, source, dest):
+        """Account for a partition of topic moved from source to dest."""
+        index = self._topic_index[topic]
+        self._update(source, index, -1)
+        self._update(dest, index, 1)
+
+    def _update(self, broker, index, delta):
+        counts = self._counts[broker]
+        topics_by_count = self._topics_by_count[broker]
+        count = counts[index]
+        if count:
+            topics_by_count[count].discard(index)
+            if not topics_by_count[count]:
+                del topics_by_count[count]
+        count += delta
+        counts[index] = count
+        if count:
+            topics_by_count[count].add(index)
+
+    def best_partition(self, source, dest, max_distance):
+        """Return the distance and the partition of source not in dest with
+        the smallest distance to dest, if that distance is smaller than
+        max_distance, or (None, None) otherwise.
+        """
+        dest_counts = self._counts[dest]
+        best_distance, best_topic = max_distance, None
+        topics_by_count = self._topics_by_count[source]
+        for count in sorted(topics_by_count, reverse=True):
+            # Topics with fewer partitions in source have larger distances.
+            if -count >= best_distance:
+                break
+            for index in sorted(topics_by_count[count]):
+                distance = dest_counts[index] - count
+                if distance >= best_distance:
+                    continue
+                # Destination has got less partitions of the topic, so it
+                # can't have all of those of source.
+                if distance < 0 or self._find_partition(
+                    self._topics[index],
+                    source,
+                    dest,
+                ):
+                    best_distance, best_topic = distance, self._topics[index]
+                    if distance == -count:
+                        break
+        if best_topic is None:
+            return None, None
+        return best_distance, self._find_partition(best_topic, source, dest)
+
+    def _find_partition(self, topic, source, dest):
+        """Return the partition of topic in source and not in dest with the
+        smallest name, or None.
+        """
+        candidates = [
+            partition for partition in topic.partitions
+            if partition in source.partitions
+            if partition not in dest.partitions
+        ]
+        return min(candidates, key=lambda p: p.name) if candidates else None
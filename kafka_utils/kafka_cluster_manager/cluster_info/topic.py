@@ -25,16 +25,22 @@ import logging
 class Topic(object):
     """Information of a topic object.
 
+    The weight of the topic is computed on first access and then kept up to
+    date as partitions and replicas are added and removed.
+
     :params
         id:                 Name of the given topic
         replication_factor: replication factor of a given topic
         partitions:         List of Partition objects
     """
 
+    __slots__ = ('_id', '_replication_factor', '_partitions', '_weight', 'log')
+
     def __init__(self, id, replication_factor=0, partitions=None):
         self._id = id
         self._replication_factor = replication_factor
         self._partitions = partitions or set([])
+        self._weight = None
         self.log = logging.getLogger(self.__class__.__name__)
 
     @property
@@ -51,13 +57,29 @@ class Topic(object):
 
     @property
     def weight(self):
-        return sum(
-            partition.weight * partition.replication_factor
-            for partition in self._partitions
-        )
+        if self._weight is None:
+            self._weight = sum(
+                partition.weight * partition.replication_factor
+                for partition in self._partitions
+            )
+        return self._weight
 
     def add_partition(self, partition):
         self._partitions.add(partition)
+        if self._weight is not None:
+            self._weight += partition.weight * partition.replication_factor
+
+    def add_replica(self, partition):
+        """Account for a replica added to partition. Called by Partition."""
+        if self._weight is not None:
+            self._weight += partition.weight
+
+    def remove_replica(self, partition):
+        """Account for a replica removed from partition. Called by
+        Partition.
+        """
+        if self._weight is not None:
+            self._weight -= partition.weight
 
     def __str__(self):
         return "{0}".format(self._id)
@@ -12,6 +12,7 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import multiprocessing
 
 
 def compute_optimum(groups, elements):
@@ -95,3 +96,14 @@ def separate_groups(groups, key, total):
         sorted(revised_over_loaded, key=key, reverse=True),
         sorted(revised_under_loaded, key=key),
     )
+
+
+def multiprocessing_context():
+    """Return a multiprocessing context that forks worker processes, so that
+    the cluster topology doesn't have to be pickled, if the platform allows
+    it.
+    """
+    try:
+        return multiprocessing.get_context('fork')
+    except (AttributeError, ValueError):
+        return multiprocessing
@@ -24,6 +24,9 @@ from six.moves import input
 
 from kafka_utils.kafka_cluster_manager. \
     cluster_info.cluster_topology import ClusterTopology
+from kafka_utils.kafka_cluster_manager. \
+    cluster_info.columnar_topology import ColumnarClusterTopology
+from kafka_utils.util.cluster_snapshot import ClusterSnapshotCache
 from kafka_utils.util.validation import assignment_to_plan
 from kafka_utils.util.zookeeper import ZK
 
@@ -35,6 +38,9 @@ class ClusterManagerCmd(object):
 
     log = logging.getLogger("ClusterManager")
 
+    # The names of the ClusterBalancer methods that the command calls.
+    balancer_methods = ()
+
     def __init__(self):
         self.cluster_config = None
         self.args = None
@@ -73,15 +79,25 @@ class ClusterManagerCmd(object):
                 self.cluster_config.name,
                 self.cluster_config.zookeeper,
             )
-            brokers = self.zk.get_brokers()
-            assignment = self.zk.get_cluster_assignment()
+            if args.snapshot_cache:
+                brokers, assignment = ClusterSnapshotCache(
+                    args.snapshot_cache,
+                    self.cluster_config.zookeeper,
+                ).get_brokers_and_assignment(self.zk)
+            else:
+                brokers = self.zk.get_brokers()
+                assignment = self.zk.get_cluster_assignment()
             pm = partition_measurer(
                 self.cluster_config,
                 brokers,
                 assignment,
                 args,
             )
-            ct = ClusterTopology(
+            if args.columnar_topology:
+                topology_class = ColumnarClusterTopology
+            else:
+                topology_class = ClusterTopology
+            ct = topology_class(
                 assignment,
                 brokers,
                 pm,
@@ -99,7 +115,10 @@ class ClusterManagerCmd(object):
             self.run_command(ct, cluster_balancer(ct, args))
 
     def add_subparser(self, subparsers):
-        self.build_subparser(subparsers).set_defaults(command=self.run)
+        self.build_subparser(subparsers).set_defaults(
+            command=self.run,
+            balancer_methods=self.balancer_methods,
+        )
 
     def execute_plan(self, plan, allow_rf_change=False):
         """Save proposed-plan and execute the same if requested."""
@@ -30,6 +30,8 @@ DEFAULT_MAX_LEADER_CHANGES = 5
 
 class DecommissionCmd(ClusterManagerCmd):
 
+    balancer_methods = ('decommission_brokers',)
+
     def __init__(self):
         super(DecommissionCmd, self).__init__()
         self.log = logging.getLogger(self.__class__.__name__)
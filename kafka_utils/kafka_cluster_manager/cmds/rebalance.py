@@ -16,6 +16,7 @@ from __future__ import absolute_import
 from __future__ import print_function
 
 import logging
+import os
 import sys
 
 import six
@@ -27,16 +28,21 @@ from kafka_utils.kafka_cluster_manager.cluster_info.stats \
     import get_replication_group_imbalance_stats
 from kafka_utils.util import positive_float
 from kafka_utils.util import positive_int
+from kafka_utils.util import positive_nonzero_int
 from kafka_utils.util.validation import assignment_to_plan
 from kafka_utils.util.validation import validate_plan
 
 
 DEFAULT_MAX_PARTITION_MOVEMENTS = 1
 DEFAULT_MAX_LEADER_CHANGES = 5
+DEFAULT_PARETO_SIZE_BUCKETS = 10
+PARETO_INDEX_FILE = 'pareto.json'
 
 
 class RebalanceCmd(ClusterManagerCmd):
 
+    balancer_methods = ('rebalance', 'score')
+
     def __init__(self):
         super(RebalanceCmd, self).__init__()
         self.log = logging.getLogger('ClusterRebalance')
@@ -114,10 +120,36 @@ class RebalanceCmd(ClusterManagerCmd):
             help='The minimum required improvement in cluster topology score'
             ' for an assignment to be applied. Default: None',
         )
+        subparser.add_argument(
+            '--pareto-plans-dir',
+            metavar='DIR',
+            help='Also write to this directory the plans of the best'
+            ' assignments found at every number and size of partition'
+            ' movements within the limits, keeping only those that no plan'
+            ' with fewer or smaller movements scores as well, and an index'
+            ' of their scores and movements in {index}. Only supported by'
+            ' the genetic balancer.'.format(index=PARETO_INDEX_FILE),
+        )
+        subparser.add_argument(
+            '--pareto-size-buckets',
+            type=positive_nonzero_int,
+            default=DEFAULT_PARETO_SIZE_BUCKETS,
+            help='Number of ranges --max-movement-size is split into for'
+            ' --pareto-plans-dir. Within a range, only the best assignment'
+            ' for each number of movements is kept. DEFAULT: %(default)s',
+        )
         return subparser
 
     def run_command(self, cluster_topology, cluster_balancer):
         """Get executable proposed plan(if any) for display or execution."""
+        pareto = self.args.pareto_plans_dir
+        if pareto and not cluster_balancer.tracks_pareto_assignments:
+            self.log.error(
+                '%s cannot track assignments at several movement budgets so'
+                ' --pareto-plans-dir cannot be used.',
+                cluster_balancer.__class__.__name__,
+            )
+            sys.exit(1)
 
         # The ideal weight of each broker is total_weight / broker_count.
         # It should be possible to remove partitions from each broker until
@@ -210,6 +242,9 @@ class RebalanceCmd(ClusterManagerCmd):
             self.log.error('Invalid latest-cluster assignment. Exiting.')
             sys.exit(1)
 
+        if self.args.pareto_plans_dir:
+            self.write_pareto_plans(cluster_balancer, base_assignment)
+
         if self.args.score_improvement_threshold:
             if base_score is None or score is None:
                 self.log.error(
@@ -256,3 +291,63 @@ class RebalanceCmd(ClusterManagerCmd):
             self.process_assignment(reduced_assignment)
         else:
             self.log.info("Cluster already balanced. No actions to perform.")
+
+    def write_pareto_plans(self, cluster_balancer, base_assignment):
+        """Write the plans of the assignments returned by
+        cluster_balancer.pareto_assignments to --pareto-plans-dir, along
+        with an index of their scores and movements.
+        """
+        pareto_assignments = cluster_balancer.pareto_assignments()
+        if pareto_assignments is None:
+            self.log.error(
+                '%s cannot track assignments at several movement budgets so'
+                ' --pareto-plans-dir cannot be used.',
+                cluster_balancer.__class__.__name__,
+            )
+            sys.exit(1)
+        if not os.path.isdir(self.args.pareto_plans_dir):
+            os.makedirs(self.args.pareto_plans_dir)
+
+        base_plan = assignment_to_plan(base_assignment)
+        index = []
+        for pareto_assignment in pareto_assignments:
+            assignment = pareto_assignment['assignment']
+            changes = {
+                partition: replicas
+                for partition, replicas in six.iteritems(assignment)
+                if replicas != base_assignment[partition]
+            }
+            if not changes:
+                continue
+            if not validate_plan(assignment_to_plan(assignment), base_plan):
+                self.log.error(
+                    'Invalid assignment with %d partition movement(s).'
+                    ' Skipping.',
+                    pareto_assignment['movement_count'],
+                )
+                continue
+            plan_file = 'plan-{index}-{count}-movements.json'.format(
+                index=len(index),
+                count=pareto_assignment['movement_count'],
+            )
+            self.write_json_plan(
+                assignment_to_plan(changes),
+                os.path.join(self.args.pareto_plans_dir, plan_file),
+            )
+            index.append({
+                'plan_file': plan_file,
+                'score': pareto_assignment['score'],
+                'movement_count': pareto_assignment['movement_count'],
+                'movement_size': pareto_assignment['movement_size'],
+                'leader_change_count':
+                    pareto_assignment['leader_change_count'],
+            })
+        self.write_json_plan(
+            index,
+            os.path.join(self.args.pareto_plans_dir, PARETO_INDEX_FILE),
+        )
+        self.log.info(
+            'Stored %d plan(s) at different movement budgets in %s.',
+            len(index),
+            self.args.pareto_plans_dir,
+        )
@@ -29,6 +29,8 @@ DEFAULT_MAX_LEADER_CHANGES = 5
 
 class RevokeLeadershipCmd(ClusterManagerCmd):
 
+    balancer_methods = ('revoke_leadership',)
+
     def __init__(self):
         super(RevokeLeadershipCmd, self).__init__()
         self.log = logging.getLogger(self.__class__.__name__)
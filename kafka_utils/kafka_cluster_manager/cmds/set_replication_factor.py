@@ -15,7 +15,11 @@
 from __future__ import absolute_import
 
 import logging
+import re
 import sys
+from collections import defaultdict
+
+import six
 
 from .command import ClusterManagerCmd
 from kafka_utils.util import positive_nonzero_int
@@ -23,6 +27,8 @@ from kafka_utils.util import positive_nonzero_int
 
 class SetReplicationFactorCmd(ClusterManagerCmd):
 
+    balancer_methods = ('add_replicas', 'remove_replicas')
+
     def __init__(self):
         super(SetReplicationFactorCmd, self).__init__()
         self.log = logging.getLogger(self.__class__.__name__)
@@ -37,10 +43,15 @@ class SetReplicationFactorCmd(ClusterManagerCmd):
             ' the cluster. The only exception is that out-of-sync replicas are'
             ' always removed before in-sync replicas.',
         )
-        subparser.add_argument(
+        topic_group = subparser.add_mutually_exclusive_group(required=True)
+        topic_group.add_argument(
             '--topic',
             help='Kafka topic whose replication factor will be modified.',
-            required=True,
+        )
+        topic_group.add_argument(
+            '--topic-regex',
+            help='Regular expression matching the beginning of the names of'
+            ' the Kafka topics whose replication factor will be modified.',
         )
         subparser.add_argument(
             'replication_factor',
@@ -51,8 +62,20 @@ class SetReplicationFactorCmd(ClusterManagerCmd):
 
     def run_command(self, ct, cluster_balancer):
         """Get executable proposed plan(if any) for display or execution."""
-        if self.args.topic in ct.topics:
-            topic = ct.topics[self.args.topic]
+        if self.args.topic_regex:
+            topic_regex = re.compile(self.args.topic_regex)
+            topics = [
+                topic for topic_id, topic in sorted(six.iteritems(ct.topics))
+                if topic_regex.match(topic_id)
+            ]
+            if not topics:
+                self.log.error(
+                    "No topic matches {regex}. Exiting."
+                    .format(regex=self.args.topic_regex),
+                )
+                sys.exit(1)
+        elif self.args.topic in ct.topics:
+            topics = [ct.topics[self.args.topic]]
         else:
             self.log.error(
                 "Topic {topic} not found. Exiting."
@@ -60,14 +83,6 @@ class SetReplicationFactorCmd(ClusterManagerCmd):
             )
             sys.exit(1)
 
-        if topic.replication_factor == self.args.replication_factor:
-            self.log.info(
-                "Topic {topic} already has replication factor {rf}. "
-                "No action to perform."
-                .format(topic=topic.id, rf=self.args.replication_factor),
-            )
-            return
-
         if self.args.replication_factor > len(ct.brokers):
             self.log.error(
                 "Replication factor {rf} is greater than the total number of "
@@ -81,57 +96,76 @@ class SetReplicationFactorCmd(ClusterManagerCmd):
 
         base_assignment = ct.assignment
 
-        changes_per_partition = abs(
-            self.args.replication_factor - topic.replication_factor
-        )
+        # The partitions to change are grouped by the number of replicas to
+        # add or remove, so that each group is handled in a single call to
+        # the cluster balancer.
+        add_partitions = defaultdict(list)
+        remove_partitions = defaultdict(dict)
+        partition_movement_count = 0
 
-        if topic.replication_factor < self.args.replication_factor:
-            self.log.info(
-                "Increasing topic {topic} replication factor from {old_rf} to "
-                "{new_rf}."
-                .format(
-                    topic=topic.id,
-                    old_rf=topic.replication_factor,
-                    new_rf=self.args.replication_factor,
-                ),
-            )
-            for partition in topic.partitions:
-                cluster_balancer.add_replica(
-                    partition.name,
-                    changes_per_partition,
+        for topic in topics:
+            if topic.replication_factor == self.args.replication_factor:
+                self.log.info(
+                    "Topic {topic} already has replication factor {rf}. "
+                    "No action to perform."
+                    .format(topic=topic.id, rf=self.args.replication_factor),
                 )
-        else:
-            self.log.info(
-                "Decreasing topic {topic} replication factor from {old_rf} to "
-                "{new_rf}."
-                .format(
-                    topic=topic.id,
-                    old_rf=topic.replication_factor,
-                    new_rf=self.args.replication_factor,
-                ),
+                continue
+
+            changes_per_partition = abs(
+                self.args.replication_factor - topic.replication_factor
             )
-            topic_data = self.zk.get_topics(topic.id)[topic.id]
-            for partition in topic.partitions:
-                partition_data = topic_data['partitions'][str(partition.partition_id)]
-                isr = partition_data['isr']
-                osr_broker_ids = [b.id for b in partition.replicas if b.id not in isr]
-                if osr_broker_ids:
-                    self.log.info(
-                        "The out of sync replica(s) {osr_broker_ids} will be "
-                        "prioritized for removal."
-                        .format(osr_broker_ids=osr_broker_ids)
-                    )
-                cluster_balancer.remove_replica(
-                    partition.name,
-                    osr_broker_ids,
-                    changes_per_partition,
+            # Each replica addition/removal for each partition counts for one
+            # partition movement
+            partition_movement_count += \
+                len(topic.partitions) * changes_per_partition
+
+            if topic.replication_factor < self.args.replication_factor:
+                self.log.info(
+                    "Increasing topic {topic} replication factor from {old_rf} to "
+                    "{new_rf}."
+                    .format(
+                        topic=topic.id,
+                        old_rf=topic.replication_factor,
+                        new_rf=self.args.replication_factor,
+                    ),
+                )
+                add_partitions[changes_per_partition].extend(
+                    sorted(partition.name for partition in topic.partitions)
                 )
+            else:
+                self.log.info(
+                    "Decreasing topic {topic} replication factor from {old_rf} to "
+                    "{new_rf}."
+                    .format(
+                        topic=topic.id,
+                        old_rf=topic.replication_factor,
+                        new_rf=self.args.replication_factor,
+                    ),
+                )
+                topic_data = self.zk.get_topics(topic.id)[topic.id]
+                for partition in sorted(topic.partitions, key=lambda p: p.name):
+                    partition_data = topic_data['partitions'][str(partition.partition_id)]
+                    isr = partition_data['isr']
+                    osr_broker_ids = [b.id for b in partition.replicas if b.id not in isr]
+                    if osr_broker_ids:
+                        self.log.info(
+                            "The out of sync replica(s) {osr_broker_ids} will be "
+                            "prioritized for removal."
+                            .format(osr_broker_ids=osr_broker_ids)
+                        )
+                    remove_partitions[changes_per_partition][partition.name] = \
+                        osr_broker_ids
 
-        assignment = ct.assignment
+        if not partition_movement_count:
+            return
 
-        # Each replica addition/removal for each partition counts for one
-        # partition movement
-        partition_movement_count = len(topic.partitions) * changes_per_partition
+        for count, partition_names in six.iteritems(add_partitions):
+            cluster_balancer.add_replicas(partition_names, count)
+        for count, osr_broker_ids in six.iteritems(remove_partitions):
+            cluster_balancer.remove_replicas(osr_broker_ids, count)
+
+        assignment = ct.assignment
 
         reduced_assignment = self.get_reduced_assignment(
             base_assignment,
@@ -26,6 +26,8 @@ from kafka_utils.util.validation import plan_to_assignment
 
 class StatsCmd(ClusterManagerCmd):
 
+    balancer_methods = ('score',)
+
     def __init__(self):
         super(StatsCmd, self).__init__()
         self.log = logging.getLogger(self.__class__.__name__)
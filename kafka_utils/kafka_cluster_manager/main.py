@@ -50,11 +50,15 @@ _log = logging.getLogger()
 
 GENETIC_BALANCER_MODULE = \
     "kafka_utils.kafka_cluster_manager.cluster_info.genetic_balancer"
+LOCAL_SEARCH_BALANCER_MODULE = \
+    "kafka_utils.kafka_cluster_manager.cluster_info.local_search_balancer"
+MIN_COST_FLOW_BALANCER_MODULE = \
+    "kafka_utils.kafka_cluster_manager.cluster_info.min_cost_flow_balancer"
 PARTITION_COUNT_BALANCER_MODULE = \
     "kafka_utils.kafka_cluster_manager.cluster_info.partition_count_balancer"
 
 
-def parse_args():
+def parse_args(argv=None):
     """Parse the arguments."""
     parser = argparse.ArgumentParser(
         description='Manage and describe partition layout over brokers of'
@@ -161,6 +165,40 @@ def parse_args():
         help='Use partition metrics and a genetic algorithm to balance the '
         'cluster.',
     )
+    parser.add_argument(
+        '--local-search-balancer',
+        action='store_const',
+        const=LOCAL_SEARCH_BALANCER_MODULE,
+        dest='cluster_balancer',
+        help='Use partition metrics and local search to balance the cluster.',
+    )
+    parser.add_argument(
+        '--min-cost-flow-balancer',
+        action='store_const',
+        const=MIN_COST_FLOW_BALANCER_MODULE,
+        dest='cluster_balancer',
+        help='Use a min-cost flow to balance the number of replicas across'
+        ' brokers and replication groups with as few movements as possible.',
+    )
+    parser.add_argument(
+        '--columnar-topology',
+        action='store_true',
+        help='Store the cluster topology in flat arrays instead of one object'
+        ' per partition, which uses much less memory on large clusters.'
+        ' Supported by the stats, store_assignments and replace-broker'
+        ' commands, by rebalance and set_replication_factor with the'
+        ' genetic, local search and min-cost flow balancers, and by'
+        ' revoke-leadership with the partition count balancer.',
+    )
+    parser.add_argument(
+        '--snapshot-cache',
+        type=str,
+        metavar='<file>',
+        default=None,
+        help='Keep a compressed snapshot of the brokers and the partition'
+        ' assignment of the cluster in this file, so that later runs only'
+        ' read the brokers and topics that changed from Zookeeper.',
+    )
 
     subparsers = parser.add_subparsers()
     RebalanceCmd().add_subparser(subparsers)
@@ -171,7 +209,29 @@ def parse_args():
     ReplaceBrokerCmd().add_subparser(subparsers)
     SetReplicationFactorCmd().add_subparser(subparsers)
 
-    return parser.parse_args()
+    args = parser.parse_args(argv)
+    if args.columnar_topology:
+        cluster_balancer = get_cluster_balancer(args)
+        unsupported = [
+            method for method in getattr(args, 'balancer_methods', ())
+            if method not in cluster_balancer.columnar_topology_methods
+        ]
+        if unsupported:
+            parser.error(
+                '--columnar-topology does not support {methods} of {balancer},'
+                ' which this command needs.'.format(
+                    methods=', '.join(unsupported),
+                    balancer=cluster_balancer.__name__,
+                ),
+            )
+    return args
+
+
+def get_cluster_balancer(args):
+    """Return the ClusterBalancer class chosen by the arguments."""
+    if args.cluster_balancer:
+        return dynamic_import(args.cluster_balancer, ClusterBalancer)
+    return PartitionCountBalancer
 
 
 def exception_logger(exc_type, exc_value, exc_traceback):
@@ -224,13 +284,7 @@ def run():
     else:
         partition_measurer = UniformPartitionMeasurer
 
-    if args.cluster_balancer:
-        cluster_balancer = dynamic_import(
-            args.cluster_balancer,
-            ClusterBalancer
-        )
-    else:
-        cluster_balancer = PartitionCountBalancer
+    cluster_balancer = get_cluster_balancer(args)
 
     args.command(
         cluster_config,
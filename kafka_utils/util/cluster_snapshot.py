@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""An on-disk cache of the brokers and the partition assignment of a
+cluster, so that repeated runs only read from ZooKeeper what has changed.
+"""
+from __future__ import absolute_import
+
+import gzip
+import logging
+import os
+
+import six
+
+from kafka_utils.util.serialization import dump_json
+from kafka_utils.util.serialization import load_json
+
+
+SNAPSHOT_VERSION = 1
+BROKERS_PATH = '/brokers/ids'
+TOPICS_PATH = '/brokers/topics'
+_log = logging.getLogger('kafka-zookeeper-manager')
+
+
+class ClusterSnapshotCache(object):
+    """Read the brokers and the assignment of a cluster from ZooKeeper,
+    reusing what a previous run stored in a gzip-compressed JSON file.
+
+    The broker metadata is reused when the cversion and pzxid of
+    /brokers/ids are unchanged, that is when no broker has registered or gone
+    away since the snapshot. The topic znodes are modified in place when
+    partitions are reassigned or added, which does not change the cversion
+    or pzxid of /brokers/topics, so the stats of all topic znodes are read
+    with pipelined requests and only the topics whose mzxid has changed, or
+    that are new, are read again.
+
+    :param path: The path of the snapshot file.
+    :param zookeeper: The zookeeper connection string of the cluster. A
+        snapshot of another cluster is ignored.
+    """
+
+    def __init__(self, path, zookeeper):
+        self.path = path
+        self.zookeeper = zookeeper
+
+    def get_brokers_and_assignment(self, zk):
+        """Return the brokers of the cluster, as ZK.get_brokers, and the
+        assignment of the cluster, as ZK.get_cluster_assignment, and update
+        the snapshot file.
+
+        :param zk: An open ZK connection to the cluster.
+        """
+        snapshot = self._load()
+        brokers = self._fetch_brokers(zk, snapshot.get('brokers'))
+        topics = self._fetch_topics(zk, snapshot.get('topics'))
+        self._save({
+            'version': SNAPSHOT_VERSION,
+            'zookeeper': self.zookeeper,
+            'brokers': brokers,
+            'topics': topics,
+        })
+        assignment = {
+            (topic_id, int(p_id)): replicas
+            for topic_id, (_, partitions) in six.iteritems(topics['topics'])
+            for p_id, replicas in six.iteritems(partitions)
+        }
+        return (
+            {
+                broker_id: metadata
+                for broker_id, metadata in brokers['brokers']
+            },
+            assignment,
+        )
+
+    def _fetch_brokers(self, zk, cached):
+        """Return the brokers section of the snapshot.
+
+        :param cached: The brokers section of the previous snapshot or None.
+        """
+        broker_ids, stat = zk.get_children_with_stat(BROKERS_PATH)
+        if cached and [cached['cversion'], cached['pzxid']] == \
+                [stat.cversion, stat.pzxid]:
+            _log.debug("Using the cached metadata of the brokers.")
+            return cached
+        _log.info("Fetching the metadata of the brokers from Zookeeper...")
+        results = zk.get_many([
+            '{path}/{b_id}'.format(path=BROKERS_PATH, b_id=b_id)
+            for b_id in broker_ids
+        ])
+        return {
+            'cversion': stat.cversion,
+            'pzxid': stat.pzxid,
+            'brokers': [
+                [int(b_id), load_json(result[0])]
+                for b_id, result in zip(broker_ids, results)
+                # The broker went away after its id was listed.
+                if result is not None
+            ],
+        }
+
+    def _fetch_topics(self, zk, cached):
+        """Return the topics section of the snapshot, which maps each topic
+        to the mzxid of its znode and its partitions.
+
+        :param cached: The topics section of the previous snapshot or None.
+        """
+        topic_ids, stat = zk.get_children_with_stat(TOPICS_PATH)
+        cached_topics = cached['topics'] if cached else {}
+        paths = [
+            '{path}/{topic_id}'.format(path=TOPICS_PATH, topic_id=topic_id)
+            for topic_id in topic_ids
+        ]
+        topics = {}
+        changed = []
+        for topic_id, path, topic_stat in zip(
+                topic_ids,
+                paths,
+                zk.get_stats(paths),
+        ):
+            if topic_stat is None:
+                # The topic was deleted after it was listed.
+                continue
+            cached_topic = cached_topics.get(topic_id)
+            if cached_topic and cached_topic[0] == topic_stat.mzxid:
+                topics[topic_id] = cached_topic
+            else:
+                changed.append((topic_id, path))
+        _log.info(
+            'Fetching %d of %d topic(s) from Zookeeper...',
+            len(changed),
+            len(topic_ids),
+        )
+        for (topic_id, _), result in zip(
+                changed,
+                zk.get_many([path for _, path in changed]),
+        ):
+            if result is not None:
+                data, topic_stat = result
+                topics[topic_id] = [
+                    topic_stat.mzxid,
+                    load_json(data)['partitions'],
+                ]
+        return {
+            'cversion': stat.cversion,
+            'pzxid': stat.pzxid,
+            'topics': topics,
+        }
+
+    def _load(self):
+        """Return the snapshot stored in the file, or an empty dict if there
+        is no usable snapshot.
+        """
+        try:
+            with gzip.open(self.path, 'rb') as snapshot_file:
+                snapshot = load_json(snapshot_file.read())
+        except (EOFError, IOError, OSError, ValueError) as e:
+            _log.info("Not using snapshot {path}: {error}".format(
+                path=self.path,
+                error=e,
+            ))
+            return {}
+        origin = (snapshot.get('version'), snapshot.get('zookeeper'))
+        if origin != (SNAPSHOT_VERSION, self.zookeeper):
+            _log.info("Ignoring snapshot {path} of another cluster or"
+                      " version.".format(path=self.path))
+            return {}
+        return snapshot
+
+    def _save(self, snapshot):
+        """Write the snapshot to the file. The file is replaced atomically."""
+        temp_path = self.path + '.tmp'
+        with gzip.open(temp_path, 'wb') as snapshot_file:
+            snapshot_file.write(dump_json(snapshot))
+        os.rename(temp_path, self.path)
@@ -72,6 +72,39 @@ class ZK:
         )
         return self.zk.get(path, watch)
 
+    def get_children_with_stat(self, path):
+        """Returns the children and the stat of the specified node."""
+        _log.debug(
+            "ZK: Getting children and stat of {path}".format(path=path),
+        )
+        return self.zk.get_children(path, include_data=True)
+
+    def get_stats(self, paths):
+        """Returns the stat of each of the specified nodes, or None for the
+        nodes that do not exist. The requests are sent at once rather than
+        one after another.
+        """
+        _log.debug("ZK: Getting the stat of {count} nodes".format(
+            count=len(paths),
+        ))
+        results = [self.zk.exists_async(path) for path in paths]
+        return [result.get() for result in results]
+
+    def get_many(self, paths):
+        """Returns the data and stat of each of the specified nodes, or None
+        for the nodes that do not exist. The requests are sent at once rather
+        than one after another.
+        """
+        _log.debug("ZK: Getting {count} nodes".format(count=len(paths)))
+        results = [self.zk.get_async(path) for path in paths]
+        values = []
+        for result in results:
+            try:
+                values.append(result.get())
+            except NoNodeError:
+                values.append(None)
+        return values
+
     def set(self, path, value):
         """Sets and returns new data for the specified node."""
         _log.debug(
@@ -132,6 +132,52 @@ class TestBroker(object):
 
         assert b1.count_preferred_replica() == 1
 
+    def test_counters_follow_changes(self, create_partition):
+        p10 = create_partition('t1', 0)
+        p11 = create_partition('t1', 1)
+        p20 = create_partition('t2', 0)
+        b1 = create_broker('b1', [p10, p11])
+        b2 = create_broker('b2', [p20])
+        t1, t2 = p10.topic, p20.topic
+
+        # Compute the counters before changing the partitions.
+        assert b1.topics == set([t1])
+        assert b1.count_partitions(t1) == 2
+        assert b1.count_preferred_replica() == 2
+        assert b2.count_preferred_replica() == 1
+
+        b1.add_partition(p20)
+        b2.remove_partition(p20)
+
+        assert b1.topics == set([t1, t2])
+        assert b1.count_partitions(t2) == 1
+        assert b1.count_preferred_replica() == 3
+        assert b2.count_preferred_replica() == 0
+        assert b2.topics == set()
+
+        b2.add_partition(p10)
+        p10.swap_leader(b2)
+
+        assert b1.count_preferred_replica() == 2
+        assert b2.count_preferred_replica() == 1
+
+    def test_move_partition_keep_position(self, create_partition):
+        p10 = create_partition('t1', 0)
+        b1 = Broker('b1')
+        b2 = Broker('b2')
+        b3 = Broker('b3')
+        b1.add_partition(p10)
+        b2.add_partition(p10)
+        assert b1.count_preferred_replica() == 1
+
+        b1.move_partition(p10, b3, keep_position=True)
+
+        assert p10.replicas == [b3, b2]
+        assert p10 not in b1.partitions
+        assert p10 in b3.partitions
+        assert b1.count_preferred_replica() == 0
+        assert b3.count_preferred_replica() == 1
+
     def test_get_preferred_partition(self):
         t1 = Topic('t1', 1)
         t2 = Topic('t2', 1)
@@ -25,13 +25,22 @@ from kafka_utils.kafka_cluster_manager.cluster_info \
     .error import BrokerDecommissionError
 from kafka_utils.kafka_cluster_manager.cluster_info \
     .genetic_balancer import GeneticBalancer
+from kafka_utils.kafka_cluster_manager.cluster_info \
+    .local_search_balancer import LocalSearchBalancer
+from kafka_utils.kafka_cluster_manager.cluster_info \
+    .min_cost_flow_balancer import MinCostFlowBalancer
 from kafka_utils.kafka_cluster_manager.cluster_info \
     .partition_count_balancer import PartitionCountBalancer
 
 
 class TestClusterBalancer(object):
 
-    @pytest.fixture(params=[PartitionCountBalancer, GeneticBalancer])
+    @pytest.fixture(params=[
+        PartitionCountBalancer,
+        GeneticBalancer,
+        LocalSearchBalancer,
+        MinCostFlowBalancer,
+    ])
     def create_balancer(self, request):
         def build_balancer(cluster_topology, **kwargs):
             args = mock.Mock(spec=Namespace)
@@ -388,3 +397,40 @@ class TestClusterBalancer(object):
         cb.remove_replica(partition.name, osr_broker_ids, count=2)
 
         assert set(b.id for b in partition.replicas) == set(['0', '3', '5'])
+
+    def test_add_replicas(
+            self,
+            create_balancer,
+            create_cluster_topology,
+    ):
+        assignment = {
+            (u'T1', 0): ['1', '3'],
+            (u'T1', 1): ['0', '2'],
+            (u'T2', 0): ['4', '5'],
+        }
+        ct = create_cluster_topology(assignment, broker_range(6))
+
+        cb = create_balancer(ct)
+        cb.add_replicas([(u'T1', 0), (u'T1', 1)], count=2)
+
+        assert ct.partitions[(u'T1', 0)].replication_factor == 4
+        assert ct.partitions[(u'T1', 1)].replication_factor == 4
+        assert ct.partitions[(u'T2', 0)].replication_factor == 2
+
+    def test_remove_replicas(
+            self,
+            create_balancer,
+            create_cluster_topology,
+    ):
+        assignment = {
+            (u'T1', 0): ['0', '1', '2', '3', '5'],
+            (u'T1', 1): ['0', '1', '2', '4', '5'],
+        }
+        ct = create_cluster_topology(assignment, broker_range(6))
+
+        cb = create_balancer(ct)
+        cb.remove_replicas({(u'T1', 0): ['1', '2'], (u'T1', 1): []}, count=2)
+
+        assert set(b.id for b in ct.partitions[(u'T1', 0)].replicas) == \
+            set(['0', '3', '5'])
+        assert ct.partitions[(u'T1', 1)].replication_factor == 3
@@ -14,6 +14,7 @@
 # limitations under the License.
 from __future__ import absolute_import
 
+import mock
 import pytest
 import six
 
@@ -22,6 +23,8 @@ from kafka_utils.kafka_cluster_manager.cluster_info \
     .error import InvalidBrokerIdError
 from kafka_utils.kafka_cluster_manager.cluster_info \
     .error import InvalidPartitionError
+from kafka_utils.kafka_cluster_manager.cluster_info \
+    .error import TransactionError
 
 
 class TestClusterTopology(object):
@@ -152,6 +155,43 @@ class TestClusterTopology(object):
         for name, size in six.iteritems(default_partition_size):
             assert ct.partitions[name].size == size
 
+    def test_cluster_topology_partition_metrics_in_bulk(
+            self,
+            create_cluster_topology,
+            default_assignment,
+            default_partition_measurer,
+    ):
+        partition_measurer = mock.Mock(wraps=default_partition_measurer)
+        partition_measurer.get_metrics.return_value = {
+            name: (2, 3) for name in default_assignment
+        }
+
+        ct = create_cluster_topology(partition_measurer=partition_measurer)
+
+        assert partition_measurer.get_metrics.call_count == 1
+        assert sorted(partition_measurer.get_metrics.call_args[0][0]) == \
+            sorted(default_assignment)
+        assert not partition_measurer.get_weight.called
+        assert not partition_measurer.get_size.called
+        for partition in six.itervalues(ct.partitions):
+            assert partition.weight == 2
+            assert partition.size == 3
+
+    def test_partition_measurer_get_metrics(
+            self,
+            default_partition_measurer,
+            default_partition_weight,
+            default_partition_size,
+    ):
+        names = [(u'T0', 0), (u'T3', 1)]
+
+        metrics = default_partition_measurer.get_metrics(names)
+
+        assert metrics == {
+            name: (default_partition_weight[name], default_partition_size[name])
+            for name in names
+        }
+
     def test_update_cluster_topology_invalid_broker(
             self,
             create_cluster_topology,
@@ -218,3 +258,93 @@ class TestClusterTopology(object):
             ct.partitions[(u'T0', 1)],
             ct.partitions[(u'T1', 0)],
         ])
+
+    def aggregates(self, ct):
+        """Return the cached aggregates of the brokers and topics of ct."""
+        return (
+            {
+                broker_id: (
+                    broker.weight,
+                    broker.size,
+                    broker.leader_weight,
+                    broker.count_preferred_replica(),
+                    {
+                        topic_id: broker.count_partitions(topic)
+                        for topic_id, topic in six.iteritems(ct.topics)
+                    },
+                )
+                for broker_id, broker in six.iteritems(ct.brokers)
+            },
+            {
+                topic_id: topic.weight
+                for topic_id, topic in six.iteritems(ct.topics)
+            },
+        )
+
+    def test_rollback(self, create_cluster_topology):
+        ct = create_cluster_topology()
+        assignment = ct.assignment
+        # Compute the aggregates first, so that the changes update them.
+        aggregates = self.aggregates(ct)
+
+        ct.begin()
+        ct.update_cluster_topology({
+            (u'T0', 0): ['4', '1'],
+            (u'T3', 1): ['2', '0', '1'],
+        })
+        ct.replace_broker('3', '4')
+        ct.partitions[(u'T1', 0)].swap_leader(ct.brokers['2'])
+        ct.brokers['0'].move_partition(
+            ct.partitions[(u'T3', 0)],
+            ct.brokers['3'],
+        )
+        assert ct.assignment != assignment
+        ct.rollback()
+
+        assert ct.assignment == assignment
+        assert self.aggregates(ct) == aggregates
+        for broker in six.itervalues(ct.brokers):
+            assert broker.partitions == set(
+                partition for partition in six.itervalues(ct.partitions)
+                if broker in partition.replicas
+            )
+
+    def test_commit(self, create_cluster_topology):
+        ct = create_cluster_topology()
+
+        ct.begin()
+        ct.replace_broker('3', '4')
+        ct.commit()
+        assignment = ct.assignment
+
+        assert '3' not in [b for replicas in assignment.values() for b in replicas]
+        with pytest.raises(TransactionError):
+            ct.rollback()
+        assert ct.assignment == assignment
+
+    def test_nested_transactions(self, create_cluster_topology):
+        ct = create_cluster_topology()
+        original = ct.assignment
+
+        ct.begin()
+        ct.replace_broker('3', '4')
+        after_replace = ct.assignment
+        ct.begin()
+        ct.partitions[(u'T1', 0)].swap_leader(ct.brokers['2'])
+        ct.rollback()
+        assert ct.assignment == after_replace
+
+        ct.begin()
+        ct.partitions[(u'T1', 0)].swap_leader(ct.brokers['2'])
+        ct.commit()
+        assert ct.assignment != after_replace
+        ct.rollback()
+        assert ct.assignment == original
+
+    def test_rollback_without_begin(self, create_cluster_topology):
+        ct = create_cluster_topology()
+
+        with pytest.raises(TransactionError):
+            ct.rollback()
+        with pytest.raises(TransactionError):
+            ct.commit()
@@ -284,7 +284,7 @@ class TestClusterManagerCmd(object):
     @mock.patch('kafka_utils.kafka_cluster_manager.cmds.command.ZK')
     def test_runs_command_with_preconditions(self, mock_zk, cmd):
         cluster_config = mock.MagicMock()
-        args = mock.MagicMock()
+        args = mock.MagicMock(snapshot_cache=None)
         mock_zk.return_value.__enter__.return_value = mock.MagicMock(
             get_brokers=lambda: {
                 1: {'host': 'host1'},
@@ -313,7 +313,7 @@ class TestClusterManagerCmd(object):
     @mock.patch('kafka_utils.kafka_cluster_manager.cmds.command.ZK')
     def test_empty_cluster(self, mock_zk, cmd):
         cluster_config = mock.MagicMock()
-        args = mock.MagicMock()
+        args = mock.MagicMock(snapshot_cache=None)
         mock_zk.return_value.__enter__.return_value = mock.MagicMock(
             get_brokers=lambda: {
                 1: {'host': 'host1'},
@@ -341,7 +341,7 @@ class TestClusterManagerCmd(object):
     @mock.patch('kafka_utils.kafka_cluster_manager.cmds.command.ZK')
     def test_exit_on_pending_assignment(self, mock_zk, cmd):
         cluster_config = mock.MagicMock()
-        args = mock.MagicMock()
+        args = mock.MagicMock(snapshot_cache=None)
         mock_zk.return_value.__enter__.return_value = mock.MagicMock(
             get_brokers=lambda: {
                 1: {'host': 'host1'},
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import
+
+import json
+from argparse import Namespace
+
+import mock
+import pytest
+
+from kafka_utils.kafka_cluster_manager.cluster_info.cluster_balancer \
+    import ClusterBalancer
+from kafka_utils.kafka_cluster_manager.cmds.rebalance import RebalanceCmd
+
+
+class TestRebalanceCmd(object):
+
+    base_assignment = {
+        (u'T0', 0): [0, 1],
+        (u'T0', 1): [1, 2],
+    }
+
+    def create_cmd(self, pareto_plans_dir):
+        cmd = RebalanceCmd()
+        cmd.args = mock.Mock(spec=Namespace)
+        cmd.args.pareto_plans_dir = pareto_plans_dir
+        return cmd
+
+    def test_write_pareto_plans(self, tmpdir):
+        plans_dir = tmpdir.join('plans')
+        cmd = self.create_cmd(str(plans_dir))
+        cluster_balancer = mock.Mock(spec=ClusterBalancer)
+        cluster_balancer.pareto_assignments.return_value = [
+            {
+                'assignment': self.base_assignment,
+                'score': 0.5,
+                'movement_count': 0,
+                'movement_size': 0,
+                'leader_change_count': 0,
+            },
+            {
+                'assignment': {(u'T0', 0): [0, 1], (u'T0', 1): [1, 3]},
+                'score': 0.7,
+                'movement_count': 1,
+                'movement_size': 2.0,
+                'leader_change_count': 0,
+            },
+            {
+                'assignment': {(u'T0', 0): [2, 1], (u'T0', 1): [3, 1]},
+                'score': 0.9,
+                'movement_count': 2,
+                'movement_size': 3.0,
+                'leader_change_count': 1,
+            },
+        ]
+
+        cmd.write_pareto_plans(cluster_balancer, self.base_assignment)
+
+        with open(str(plans_dir.join('pareto.json'))) as f:
+            index = json.load(f)
+        # The assignment without changes is skipped.
+        assert [entry['movement_count'] for entry in index] == [1, 2]
+        assert [entry['score'] for entry in index] == [0.7, 0.9]
+        with open(str(plans_dir.join(index[0]['plan_file']))) as f:
+            plan = json.load(f)
+        assert plan == {
+            'version': 1,
+            'partitions': [
+                {'topic': u'T0', 'partition': 1, 'replicas': [1, 3]},
+            ],
+        }
+        with open(str(plans_dir.join(index[1]['plan_file']))) as f:
+            plan = json.load(f)
+        assert len(plan['partitions']) == 2
+
+    def test_write_pareto_plans_not_supported(self, tmpdir):
+        cmd = self.create_cmd(str(tmpdir))
+        cluster_balancer = mock.Mock(spec=ClusterBalancer)
+        cluster_balancer.pareto_assignments.return_value = None
+
+        with pytest.raises(SystemExit):
+            cmd.write_pareto_plans(cluster_balancer, self.base_assignment)
+
+    def test_run_command_pareto_plans_not_supported(self, tmpdir):
+        cmd = self.create_cmd(str(tmpdir))
+        cluster_balancer = mock.Mock(spec=ClusterBalancer)
+        cluster_balancer.tracks_pareto_assignments = False
+
+        with pytest.raises(SystemExit):
+            cmd.run_command(mock.Mock(), cluster_balancer)
+        # The error is raised before the cluster is rebalanced.
+        assert not cluster_balancer.rebalance.called
@@ -42,6 +42,7 @@ class TestSetReplicationFactorCmd(object):
             cmd = SetReplicationFactorCmd()
             cmd.args = mock.Mock(spec=Namespace)
             cmd.args.topic = u'T0'
+            cmd.args.topic_regex = None
             cmd.args.replication_factor = 5
             ct = create_cluster_topology(assignment, brokers)
             cb = PartitionCountBalancer(ct, cmd.args)
@@ -73,6 +74,7 @@ class TestSetReplicationFactorCmd(object):
             cmd = SetReplicationFactorCmd()
             cmd.args = mock.Mock(spec=Namespace)
             cmd.args.topic = u'T0'
+            cmd.args.topic_regex = None
             cmd.args.replication_factor = 2
             cmd.zk = mock.Mock()
             cmd.zk.get_topics.side_effect = (lambda topic_id: {
@@ -97,3 +99,39 @@ class TestSetReplicationFactorCmd(object):
             assert set(assignment[(u'T0', 1)]) == set(['1', '2'])
 
             assert kwargs['allow_rf_change']
+
+    def test_run_command_topic_regex(self, create_cluster_topology):
+        assignment = {
+            (u'T0', 0): ['0', '1'],
+            (u'T0', 1): ['1', '2'],
+            (u'T1', 0): ['2', '3'],
+            (u'T2', 0): ['3', '4', '0'],
+            (u'X0', 0): ['0', '4'],
+        }
+        brokers = {
+            '0': {'host': 'host2'},
+            '1': {'host': 'host2'},
+            '2': {'host': 'host3'},
+            '3': {'host': 'host4'},
+            '4': {'host': 'host5'},
+        }
+        with mock.patch.object(SetReplicationFactorCmd, 'process_assignment'):
+            cmd = SetReplicationFactorCmd()
+            cmd.args = mock.Mock(spec=Namespace)
+            cmd.args.topic = None
+            cmd.args.topic_regex = u'T'
+            cmd.args.replication_factor = 3
+            ct = create_cluster_topology(assignment, brokers)
+            cb = PartitionCountBalancer(ct, cmd.args)
+            with mock.patch.object(cb, 'add_replicas', wraps=cb.add_replicas):
+                cmd.run_command(ct, cb)
+
+                cb.add_replicas.assert_called_once_with(
+                    [(u'T0', 0), (u'T0', 1), (u'T1', 0)],
+                    1,
+                )
+
+            args, kwargs = cmd.process_assignment.call_args_list[0]
+            assignment = args[0]
+            assert sorted(assignment) == [(u'T0', 0), (u'T0', 1), (u'T1', 0)]
+            assert all(len(replicas) == 3 for replicas in assignment.values())
@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import
+
+from argparse import Namespace
+
+import pytest
+import six
+
+from kafka_utils.kafka_cluster_manager.cluster_info import stats
+from kafka_utils.kafka_cluster_manager.cluster_info.cluster_topology \
+    import ClusterTopology
+from kafka_utils.kafka_cluster_manager.cluster_info.columnar_topology \
+    import ColumnarClusterTopology
+from kafka_utils.kafka_cluster_manager.cluster_info.error \
+    import InvalidBrokerIdError
+from kafka_utils.kafka_cluster_manager.cluster_info.error \
+    import InvalidPartitionError
+from kafka_utils.kafka_cluster_manager.cluster_info.min_cost_flow_balancer \
+    import MinCostFlowBalancer
+
+
+class TestColumnarClusterTopology(object):
+
+    @pytest.fixture
+    def create_topologies(
+            self,
+            default_assignment,
+            default_brokers,
+            default_get_replication_group_id,
+            default_partition_measurer,
+    ):
+        """Return a function creating a ClusterTopology and a
+        ColumnarClusterTopology of the same cluster.
+        """
+        def create(assignment=None):
+            return tuple(
+                topology_class(
+                    assignment or default_assignment,
+                    default_brokers,
+                    default_partition_measurer,
+                    default_get_replication_group_id,
+                )
+                for topology_class in (ClusterTopology, ColumnarClusterTopology)
+            )
+        return create
+
+    def aggregates(self, ct):
+        """Return the statistics of the brokers and topics of ct."""
+        broker_ids = sorted(ct.brokers)
+        brokers = [ct.brokers[broker_id] for broker_id in broker_ids]
+        topics = [ct.topics[topic_id] for topic_id in sorted(ct.topics)]
+        return {
+            'partition_counts': stats.get_broker_partition_counts(brokers),
+            'weights': stats.get_broker_weights(brokers),
+            'sizes': [broker.size for broker in brokers],
+            'leader_counts': stats.get_broker_leader_counts(brokers),
+            'leader_weights': stats.get_broker_leader_weights(brokers),
+            'topic_weights': [topic.weight for topic in topics],
+            'topic_imbalance': stats.get_topic_imbalance_stats(
+                brokers,
+                topics,
+            ),
+            'weighted_topic_imbalance':
+                stats.get_weighted_topic_imbalance_stats(brokers, topics),
+            'rg_imbalance': stats.get_replication_group_imbalance_stats(
+                list(ct.rgs.values()),
+                list(ct.partitions.values()),
+            ),
+            'topic_partitions': {
+                topic.id: sorted(p.name for p in topic.partitions)
+                for topic in topics
+            },
+            'broker_partitions': {
+                broker.id: sorted(p.name for p in broker.partitions)
+                for broker in brokers
+            },
+        }
+
+    def test_build(self, create_topologies):
+        ct, columnar = create_topologies()
+
+        assert columnar.assignment == ct.assignment
+        assert self.aggregates(columnar) == self.aggregates(ct)
+        assert set(columnar.rgs) == set(ct.rgs)
+        assert {broker.id for broker in columnar.active_brokers} == \
+            {broker.id for broker in ct.active_brokers}
+
+    def test_partitions(self, create_topologies, default_partition_size):
+        ct, columnar = create_topologies()
+
+        assert len(columnar.partitions) == len(ct.partitions)
+        assert sorted(columnar.partitions) == sorted(ct.partitions)
+        assert (u'T0', 0) in columnar.partitions
+        assert (u'T9', 0) not in columnar.partitions
+        with pytest.raises(KeyError):
+            columnar.partitions[(u'T9', 0)]
+        partition = columnar.partitions[(u'T3', 1)]
+        assert partition == columnar.partitions[(u'T3', 1)]
+        assert partition.topic is columnar.topics[u'T3']
+        assert partition.size == default_partition_size[(u'T3', 1)]
+        assert [b.id for b in partition.replicas] == ['0', '1', '4']
+        assert partition.leader is columnar.brokers['0']
+        assert partition.replication_factor == 3
+
+    def test_inactive_brokers(self, create_topologies, default_assignment):
+        assignment = dict(default_assignment)
+        assignment[(u'T4', 0)] = ['8', '1']
+
+        ct, columnar = create_topologies(assignment)
+
+        assert columnar.brokers['8'].inactive
+        assert columnar.assignment == ct.assignment
+        assert self.aggregates(columnar) == self.aggregates(ct)
+
+    def test_update_cluster_topology(self, create_topologies):
+        new_assignment = {
+            (u'T0', 0): ['4', '1'],
+            (u'T1', 1): ['3', '2', '1', '0'],
+            (u'T3', 1): ['2', '0', '1'],
+        }
+        ct, columnar = create_topologies()
+        # Compute the per-topic counts first, so that the update changes them.
+        self.aggregates(columnar)
+
+        ct.update_cluster_topology(new_assignment)
+        columnar.update_cluster_topology(new_assignment)
+
+        assert columnar.assignment == ct.assignment
+        assert self.aggregates(columnar) == self.aggregates(ct)
+
+    def test_update_cluster_topology_replication_factor(
+            self,
+            create_topologies,
+    ):
+        new_assignment = {
+            (u'T0', 0): ['4', '1', '3'],
+            (u'T2', 0): ['2', '0'],
+            (u'T3', 1): ['4'],
+        }
+        ct, columnar = create_topologies()
+        self.aggregates(columnar)
+
+        ct.update_cluster_topology(new_assignment)
+        columnar.update_cluster_topology(new_assignment)
+
+        assert columnar.assignment == ct.assignment
+        assert self.aggregates(columnar) == self.aggregates(ct)
+
+    @pytest.mark.parametrize('new_assignment, error', [
+        ({(u'T0', 0): ['4', '1'], (u'T0', 1): ['9', '1']}, InvalidBrokerIdError),
+        ({(u'T0', 0): ['4', '1'], (u'T9', 0): ['0', '1']}, InvalidPartitionError),
+    ])
+    def test_update_cluster_topology_invalid(
+            self,
+            create_topologies,
+            new_assignment,
+            error,
+    ):
+        _, columnar = create_topologies()
+        assignment = columnar.assignment
+
+        with pytest.raises(error):
+            columnar.update_cluster_topology(new_assignment)
+        # The assignment is validated before any partition is changed.
+        assert columnar.assignment == assignment
+
+    def test_replace_broker(self, create_topologies):
+        ct, columnar = create_topologies()
+
+        ct.replace_broker('3', '4')
+        columnar.replace_broker('3', '4')
+
+        assert columnar.assignment == ct.assignment
+        assert self.aggregates(columnar) == self.aggregates(ct)
+
+    def test_broker_partitions_updated(self, create_topologies):
+        ct, columnar = create_topologies()
+        # Index the partitions of the brokers first, so that the moves update
+        # the index.
+        broker_partitions = columnar.brokers['3'].partitions
+
+        for topology in (ct, columnar):
+            topology.update_cluster_topology({(u'T0', 0): ['4', '1']})
+            topology.replace_broker('3', '4')
+            topology.partitions[(u'T1', 0)].swap_leader(topology.brokers['2'])
+
+        assert columnar.brokers['3'].partitions != broker_partitions
+        assert columnar._broker_partitions is not None
+        assert self.aggregates(columnar) == self.aggregates(ct)
+
+    def test_replace_broker_invalid_broker(self, create_topologies):
+        _, columnar = create_topologies()
+
+        with pytest.raises(InvalidBrokerIdError):
+            columnar.replace_broker('0', '9')
+
+    def test_swap_leader(self, create_topologies):
+        ct, columnar = create_topologies()
+
+        for topology in (ct, columnar):
+            old_leader = topology.partitions[(u'T1', 0)].swap_leader(
+                topology.brokers['2'],
+            )
+            assert old_leader.id == '0'
+
+        assert columnar.assignment == ct.assignment
+        assert self.aggregates(columnar) == self.aggregates(ct)
+
+    def test_rebalance_replicas(self, create_topologies):
+        _, columnar = create_topologies()
+        balancer = MinCostFlowBalancer(columnar, Namespace(
+            replication_groups=True,
+            brokers=False,
+            leaders=False,
+            max_partition_movements=None,
+            max_movement_size=None,
+            max_leader_changes=None,
+            balancer_args=[],
+        ))
+
+        balancer.rebalance_replicas()
+
+        net_imbalance, _ = stats.get_replication_group_imbalance_stats(
+            list(columnar.rgs.values()),
+            list(columnar.partitions.values()),
+        )
+        assert net_imbalance == 0
+        # The aggregates are kept up to date by the moves.
+        rebuilt = ColumnarClusterTopology(
+            columnar.assignment,
+            {b.id: b.metadata for b in six.itervalues(columnar.brokers)},
+            columnar.partition_measurer,
+            columnar.extract_group,
+        )
+        assert self.aggregates(columnar) == self.aggregates(rebuilt)
+
+    def test_min_cost_flow_rebalance(self, create_topologies):
+        results = []
+        for topology in create_topologies():
+            balancer = MinCostFlowBalancer(topology, Namespace(
+                replication_groups=False,
+                brokers=True,
+                leaders=True,
+                max_partition_movements=None,
+                max_movement_size=None,
+                max_leader_changes=None,
+                balancer_args=[],
+            ))
+            balancer.rebalance()
+            results.append((topology.assignment, balancer.score()))
+
+        assert results[0] == results[1]
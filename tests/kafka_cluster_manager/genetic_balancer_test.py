@@ -15,15 +15,30 @@
 from __future__ import absolute_import
 from __future__ import division
 
+import json
+import random
 from argparse import Namespace
 
 import mock
 import pytest
+import six
 
+from kafka_utils.kafka_cluster_manager.cluster_info.genetic_balancer \
+    import _ChunkedTuple
+from kafka_utils.kafka_cluster_manager.cluster_info.genetic_balancer \
+    import _decode_state
+from kafka_utils.kafka_cluster_manager.cluster_info.genetic_balancer \
+    import _encode_state
+from kafka_utils.kafka_cluster_manager.cluster_info.genetic_balancer \
+    import _island_score_weights
+from kafka_utils.kafka_cluster_manager.cluster_info.genetic_balancer \
+    import _MutationStats
 from kafka_utils.kafka_cluster_manager.cluster_info.genetic_balancer \
     import _State
 from kafka_utils.kafka_cluster_manager.cluster_info.genetic_balancer \
     import GeneticBalancer
+from kafka_utils.kafka_cluster_manager.cluster_info.stats \
+    import coefficient_of_variation
 
 
 class TestGeneticBalancer(object):
@@ -211,6 +226,85 @@ class TestGeneticBalancer(object):
         """
         assert not self.move_leadership_valid(4, 1, max_leader_changes=0)
 
+    def test_move_heavy_partition(self):
+        """Test that _move_heavy_partition moves a partition from the heaviest
+        broker to the lightest broker the partition can be moved to.
+        """
+        balancer = self.create_balancer()
+        state = _State(balancer.cluster_topology)
+        heaviest = max(
+            range(len(state.brokers)),
+            key=lambda broker: state.broker_weights[broker],
+        )
+
+        new_state = balancer._move_heavy_partition(state)
+
+        _, partition, source, dest = new_state.mutation
+        assert source == heaviest
+        assert state.broker_weights[dest] == min(
+            state.broker_weights[broker]
+            for broker in range(len(state.brokers))
+            if balancer._can_move(state, partition, source, broker)
+        )
+
+    def test_move_heavy_leadership(self):
+        """Test that _move_heavy_leadership moves leadership from the broker
+        with the heaviest leader weight to its lightest follower.
+        """
+        balancer = self.create_balancer()
+        state = _State(balancer.cluster_topology)
+        heaviest = max(
+            range(len(state.brokers)),
+            key=lambda broker: state.broker_leader_weights[broker],
+        )
+
+        new_state = balancer._move_heavy_leadership(state)
+
+        _, partition, dest = new_state.mutation
+        assert state.replicas[partition][0] == heaviest
+        assert state.broker_leader_weights[dest] == min(
+            state.broker_leader_weights[broker]
+            for broker in state.replicas[partition][1:]
+        )
+
+    def test_move_heavy_leadership_too_many_leader_changes(self):
+        balancer = self.create_balancer(max_leader_changes=0)
+        state = _State(balancer.cluster_topology)
+
+        assert balancer._move_heavy_leadership(state) is None
+
+    def test_mutations_heuristic_mutation_ratio(self):
+        """Test that heuristic mutations are only mixed in when
+        --heuristic-mutation-ratio is set.
+        """
+        balancer = self.create_balancer()
+        assert balancer._mutations() == [
+            balancer._move_partition,
+            balancer._move_leadership,
+        ]
+
+        balancer = self.create_balancer(
+            balancer_args=['--heuristic-mutation-ratio', '1'],
+        )
+        state = _State(balancer.cluster_topology)
+        with mock.patch.object(
+            balancer,
+            '_move_partition',
+            side_effect=AssertionError,
+        ), mock.patch.object(
+            balancer,
+            '_move_leadership',
+            side_effect=AssertionError,
+        ):
+            for mutation in balancer._mutations():
+                assert mutation(state) is not None
+
+    def test_heuristic_mutation_ratio_too_large(self):
+        with pytest.raises(SystemExit):
+            self.create_balancer(
+                balancer_args=['--heuristic-mutation-ratio', '1.5'],
+            )
+
     def test_score_broker_weight(self):
         """Test that _score gives a higher score to assignments where the
         partition weight is more balanced across brokers.
@@ -267,6 +361,480 @@ class TestGeneticBalancer(object):
             (u'T1', 1): ['1', '0'],
         })
 
+    def rebalance_assignment(self, balancer_args):
+        ct = self.create_cluster_topology()
+        balancer = self.create_balancer(
+            ct,
+            balancer_args=balancer_args,
+            max_partition_movements=10,
+        )
+        balancer.rebalance()
+        return ct.assignment, balancer.score()
+
+    def test_rebalance_workers_reproducible(self):
+        """Test that rebalancing with multiple workers gives the same result
+        every time and improves the score.
+        """
+        balancer_args = [
+            '--workers', '2',
+            '--num-gens', '5',
+            '--max-exploration', '200',
+        ]
+        assignment, score = self.rebalance_assignment(balancer_args)
+
+        assert self.rebalance_assignment(balancer_args) == (assignment, score)
+        assert score > self.create_balancer().score()
+
+    def test_rebalance_islands_reproducible(self):
+        """Test that rebalancing with islands gives the same result every time
+        and improves the score.
+        """
+        balancer_args = [
+            '--islands', '3',
+            '--migration-interval', '2',
+            '--num-gens', '5',
+            '--max-exploration', '100',
+        ]
+        assignment, score = self.rebalance_assignment(balancer_args)
+
+        assert self.rebalance_assignment(balancer_args) == (assignment, score)
+        assert score > self.create_balancer().score()
+
+    def test_island_score_weights(self):
+        balancer = self.create_balancer(balancer_args=[
+            '--islands', '2',
+            '--island-weight-jitter', '0.5',
+        ])
+
+        assert _island_score_weights(balancer.args, 0) == {}
+        weights = _island_score_weights(balancer.args, 1)
+        assert weights == _island_score_weights(balancer.args, 1)
+        default = balancer.args.partition_weight_cv_score_weight
+        assert 0.5 * default <= weights['partition_weight_cv_score_weight'] <= 1.5 * default
+
+    def test_islands_with_workers(self):
+        with pytest.raises(SystemExit):
+            self.create_balancer(balancer_args=['--islands', '2', '--workers', '2'])
+
+    def count_generations(self, balancer_args):
+        """Rebalance the default cluster topology and return the number of
+        generations that were run.
+        """
+        balancer = self.create_balancer(
+            balancer_args=balancer_args,
+            max_partition_movements=10,
+        )
+        with mock.patch.object(
+            balancer,
+            '_prune',
+            wraps=balancer._prune,
+        ) as prune:
+            balancer.rebalance()
+        return prune.call_count
+
+    def test_rebalance_patience(self):
+        balancer_args = ['--num-gens', '100', '--max-exploration', '100']
+        assert self.count_generations(balancer_args) == 100
+        assert self.count_generations(balancer_args + ['--patience', '3']) < 100
+
+    def test_rebalance_time_budget(self):
+        """Test that rebalancing stops after one generation when the time
+        budget is exhausted and still improves the score.
+        """
+        balancer_args = [
+            '--num-gens', '100',
+            '--max-exploration', '100',
+            '--time-budget', '0',
+        ]
+        assert self.count_generations(balancer_args) == 1
+
+        _, score = self.rebalance_assignment(balancer_args)
+        assert score > self.create_balancer().score()
+
+    def test_explore_deadline(self):
+        """Test that _explore stops after the first state when the deadline
+        has passed.
+        """
+        balancer = self.create_balancer(balancer_args=['--max-exploration', '10'])
+        state = _State(balancer.cluster_topology)
+        pop = {state, state.move(0, 1, 4)}
+
+        with mock.patch.object(
+            balancer,
+            '_mutations',
+            return_value=[lambda state: state.move_leadership(2, 3)],
+        ):
+            candidates = balancer._explore(pop, deadline=0)
+
+        assert len(candidates) == len(pop) + 5
+
+    def test_apply_mutation(self):
+        """Test that a recorded mutation can be replayed on another state."""
+        state = _State(self.create_cluster_topology())
+        new_state = state.move(1, 2, 4).move_leadership(3, 2)
+
+        replayed = _State(self.create_cluster_topology()) \
+            .apply(state.move(1, 2, 4).mutation) \
+            .apply(new_state.mutation)
+
+        assert replayed.assignment == new_state.assignment
+        assert replayed.movement_count == new_state.movement_count
+        assert replayed.leader_movement_count == \
+            new_state.leader_movement_count
+
+    def test_score_cached(self):
+        """Test that _score caches the score on the state and that derived
+        states are scored again.
+        """
+        balancer = self.create_balancer()
+        state = _State(balancer.cluster_topology)
+        score = balancer._score(state)
+
+        assert state.cached_score == score
+        state.cached_score = -1
+        assert balancer._score(state) == -1
+        assert balancer._score(state, score_movement=False) == score
+        assert state.move(0, 1, 4).cached_score is None
+
+    def test_prune_dedupes_assignments(self):
+        """Test that _prune keeps only one of the states with the same
+        assignment, preferring the highest scoring one.
+        """
+        balancer = self.create_balancer(max_pop=10, max_movement_size=10)
+        state = _State(balancer.cluster_topology)
+        round_trip = state.move(0, 1, 4).move(0, 4, 1)
+        other = state.move(0, 1, 4)
+
+        pop = balancer._prune({state, round_trip, other})
+
+        assert pop == {state, other}
+
+    def test_prune_keeps_colliding_assignments(self):
+        """Test that _prune keeps states with different assignments whose
+        replicas hashes collide.
+        """
+        balancer = self.create_balancer(max_pop=10, max_movement_size=10)
+        state = _State(balancer.cluster_topology)
+        other = state.move(0, 1, 4)
+        other.replicas_hash = state.replicas_hash
+
+        pop = balancer._prune({state, other})
+
+        assert pop == {state, other}
+
+    def test_explore_counts_colliding_assignments(self):
+        """Test that _explore counts a candidate as a duplicate only if an
+        explored state has the same assignment, not just the same replicas
+        hash.
+        """
+        balancer = self.create_balancer(
+            max_pop=10,
+            balancer_args=['--max-exploration', '2'],
+        )
+        state = _State(balancer.cluster_topology)
+        other = state.move(0, 1, 4)
+        other.replicas_hash = state.replicas_hash
+
+        def move_partition(_):
+            return other
+
+        mutation_stats = _MutationStats()
+        with mock.patch.object(balancer, '_move_partition', move_partition), \
+                mock.patch.object(balancer, '_move_leadership', move_partition):
+            balancer._explore({state}, mutation_stats=mutation_stats)
+
+        summary = mutation_stats.summary({state})
+        assert summary['move_partition']['proposed'] == 2
+        assert summary['move_partition']['duplicate'] == 1
+
+    def test_checkpoint_warm_start(self, tmpdir):
+        """Test that the population written by _write_checkpoint is read back
+        by _warm_start.
+        """
+        checkpoint_file = str(tmpdir.join('checkpoint.json'))
+        balancer = self.create_balancer(
+            balancer_args=['--checkpoint-file', checkpoint_file],
+        )
+        state = _State(balancer.cluster_topology)
+        pop = {state, state.move(0, 1, 4), state.move(3, 0, 4).move_leadership(2, 3)}
+
+        balancer._write_checkpoint(state, pop)
+        with open(checkpoint_file) as f:
+            checkpoint = json.load(f)
+        assert sorted(len(changes) for changes in checkpoint['population']) == [0, 1, 2]
+
+        balancer = self.create_balancer(
+            balancer_args=['--warm-start', checkpoint_file],
+        )
+        warm_pop = balancer._warm_start(_State(balancer.cluster_topology))
+        assert sorted(tuple(s.replicas) for s in warm_pop) == \
+            sorted(tuple(s.replicas) for s in pop)
+
+    def test_warm_start_from_plan(self, tmpdir):
+        """Test that a reassignment plan can be used to warm-start, ignoring
+        partitions and brokers that are not in the cluster.
+        """
+        plan_file = str(tmpdir.join('plan.json'))
+        with open(plan_file, 'w') as f:
+            json.dump({
+                'version': 1,
+                'partitions': [
+                    {'topic': u'T0', 'partition': 0, 'replicas': ['4', '2']},
+                    {'topic': u'T1', 'partition': 0, 'replicas': ['5', '1']},
+                    {'topic': u'T9', 'partition': 0, 'replicas': ['0']},
+                ],
+            }, f)
+        balancer = self.create_balancer(balancer_args=['--warm-start', plan_file])
+
+        warm_pop = balancer._warm_start(_State(balancer.cluster_topology))
+
+        assert len(warm_pop) == 1
+        assignment = warm_pop[0].assignment
+        assert assignment[(u'T0', 0)] == ['4', '2']
+        assert assignment[(u'T1', 0)] == ['0', '1', '2', '3']
+
+    def test_rebalance_writes_checkpoint(self, tmpdir):
+        checkpoint_file = str(tmpdir.join('checkpoint.json'))
+        self.rebalance_assignment([
+            '--num-gens', '2',
+            '--max-exploration', '100',
+            '--checkpoint-file', checkpoint_file,
+        ])
+
+        with open(checkpoint_file) as f:
+            checkpoint = json.load(f)
+        assert checkpoint['version'] == 1
+        assert checkpoint['population']
+        assert not tmpdir.join('checkpoint.json.tmp').check()
+
+    @pytest.mark.parametrize('workers', ['1', '2'])
+    def test_rebalance_writes_telemetry(self, tmpdir, workers):
+        telemetry_file = str(tmpdir.join('telemetry.jsonl'))
+        balancer_args = [
+            '--num-gens', '3',
+            '--max-exploration', '100',
+            '--heuristic-mutation-ratio', '0.5',
+            '--workers', workers,
+        ]
+        self.rebalance_assignment(
+            balancer_args + ['--telemetry-file', telemetry_file],
+        )
+
+        with open(telemetry_file) as f:
+            records = [json.loads(line) for line in f]
+        assert [record['generation'] for record in records] == [0, 1, 2]
+        for record in records:
+            assert record['score']['worst'] <= record['score']['median'] <= \
+                record['score']['best']
+            assert set(record['mutations']) == set([
+                'move_partition',
+                'move_heavy_partition',
+                'move_leadership',
+                'move_heavy_leadership',
+            ])
+            # Every state of the population is explored equally.
+            assert 0 < sum(
+                counts['proposed'] for counts in record['mutations'].values()
+            ) <= 100
+            assert sum(
+                counts['kept'] for counts in record['mutations'].values()
+            ) <= record['population']
+            assert record['best']['movement_count'] <= 10
+            assert record['explore_seconds'] >= 0
+            assert record['prune_seconds'] >= 0
+            assert record['rss_bytes'] > 0
+
+    @pytest.mark.parametrize('workers', ['1', '2'])
+    def test_rebalance_telemetry_counts_duplicates(self, tmpdir, workers):
+        # The default cluster is so small that exploring it this much
+        # proposes the same assignment several times.
+        telemetry_file = str(tmpdir.join('telemetry.jsonl'))
+        self.rebalance_assignment([
+            '--num-gens', '1',
+            '--max-exploration', '1000',
+            '--workers', workers,
+            '--telemetry-file', telemetry_file,
+        ])
+
+        with open(telemetry_file) as f:
+            record = json.loads(f.readline())
+        assert sum(
+            counts['duplicate'] for counts in record['mutations'].values()
+        ) > 0
+
+    def test_rebalance_islands_writes_telemetry(self, tmpdir):
+        telemetry_file = str(tmpdir.join('telemetry.jsonl'))
+        self.rebalance_assignment([
+            '--islands', '2',
+            '--migration-interval', '2',
+            '--num-gens', '3',
+            '--max-exploration', '100',
+            '--telemetry-file', telemetry_file,
+        ])
+
+        with open(telemetry_file) as f:
+            records = [json.loads(line) for line in f]
+        assert [
+            (record['first_generation'], record['generation'])
+            for record in records
+        ] == [(0, 1), (2, 2)]
+
+    def test_pareto_assignments(self):
+        ct = self.create_cluster_topology()
+        original = ct.assignment
+        original_score = self.create_balancer().score()
+        balancer = self.create_balancer(
+            ct,
+            replication_groups=False,
+            max_partition_movements=5,
+            pareto_plans_dir='plans',
+            balancer_args=['--num-gens', '5', '--max-exploration', '200'],
+        )
+        balancer.rebalance()
+        front = balancer.pareto_assignments()
+
+        # Without partition movements, only leaders can change.
+        assert front[0]['movement_count'] == 0
+        assert all(
+            set(replicas) == set(original[partition])
+            for partition, replicas in six.iteritems(front[0]['assignment'])
+        )
+        assert front[0]['score'] >= original_score
+        assert abs(front[-1]['score'] - balancer.score()) < 1e-9
+        for i, entry in enumerate(front):
+            assert entry['movement_count'] <= 5
+            # No other assignment scores as well with fewer or smaller
+            # movements.
+            assert not any(
+                other['score'] >= entry['score']
+                for other in front[:i]
+                if other['movement_size'] <= entry['movement_size']
+            )
+
+    def test_pareto_assignments_movement_limit(self):
+        # More generations than movements let the population exceed
+        # max_partition_movements.
+        balancer = self.create_balancer(
+            replication_groups=False,
+            max_partition_movements=2,
+            pareto_plans_dir='plans',
+            balancer_args=['--num-gens', '10', '--max-exploration', '200'],
+        )
+        balancer.rebalance()
+        front = balancer.pareto_assignments()
+
+        assert front
+        assert all(entry['movement_count'] <= 2 for entry in front)
+
+    def test_pareto_assignments_size_buckets(self):
+        balancer = self.create_balancer(
+            replication_groups=False,
+            max_partition_movements=5,
+            max_movement_size=20,
+            pareto_plans_dir='plans',
+            pareto_size_buckets=4,
+            balancer_args=['--num-gens', '10', '--max-exploration', '200'],
+        )
+        balancer.rebalance()
+        front = balancer.pareto_assignments()
+
+        assert all(entry['movement_size'] <= 20 for entry in front)
+        buckets = [
+            (entry['movement_count'], entry['movement_size'] // 5)
+            for entry in front
+        ]
+        assert len(set(buckets)) == len(buckets)
+
+    def test_pareto_assignments_workers(self):
+        # The population keeps a single state, so the archive only gets
+        # the states of other movement sizes from the candidates the workers
+        # send back.
+        balancer = self.create_balancer(
+            replication_groups=False,
+            max_partition_movements=5,
+            max_movement_size=20,
+            pareto_plans_dir='plans',
+            pareto_size_buckets=20,
+            balancer_args=[
+                '--num-gens', '2',
+                '--max-exploration', '200',
+                '--max-pop', '1',
+                '--workers', '2',
+            ],
+        )
+        balancer.rebalance()
+
+        assert len(balancer._pareto_archive.states()) > 3
+
+    def test_pareto_assignments_not_tracked(self):
+        balancer = self.create_balancer(
+            max_partition_movements=5,
+            balancer_args=['--num-gens', '2', '--max-exploration', '10'],
+        )
+        balancer.rebalance()
+
+        assert balancer.pareto_assignments() is None
+
+    def test_decommission_brokers_updates_topology_once(self):
+        ct = self.create_cluster_topology({
+            (u'T0', 0): ['0', '1'],
+            (u'T0', 1): ['1', '2'],
+            (u'T1', 0): ['1', '3'],
+            (u'T1', 1): ['2', '4'],
+        })
+        balancer = self.create_balancer(ct)
+
+        with mock.patch.object(
+            ct,
+            'update_cluster_topology',
+            wraps=ct.update_cluster_topology,
+        ) as update:
+            balancer.decommission_brokers(['1', '2'])
+
+        assert update.call_count == 1
+        assert ct.brokers['1'].empty()
+        assert ct.brokers['2'].empty()
+        assert all(
+            partition.replication_factor == 2
+            for partition in ct.partitions.values()
+        )
+
+    def test_decommission_brokers_keeps_inactive_replicas(self):
+        ct = self.create_cluster_topology({
+            (u'T0', 0): ['0', '2'],
+            (u'T0', 1): ['1', '4'],
+        })
+        ct.brokers['4'].mark_inactive()
+        balancer = self.create_balancer(ct)
+
+        balancer.decommission_brokers(['1'])
+
+        assert ct.brokers['1'].empty()
+        replicas = ct.partitions[(u'T0', 1)].replicas
+        assert len(replicas) == 2
+        assert ct.brokers['4'] in replicas
+
+    def test_add_replicas_updates_topology_once(self):
+        ct = self.create_cluster_topology({
+            (u'T0', 0): ['0'],
+            (u'T0', 1): ['1'],
+            (u'T1', 0): ['2'],
+        })
+        balancer = self.create_balancer(ct)
+
+        with mock.patch.object(
+            ct,
+            'update_cluster_topology',
+            wraps=ct.update_cluster_topology,
+        ) as update:
+            balancer.add_replicas([(u'T0', 0), (u'T0', 1), (u'T1', 0)], 2)
+
+        assert update.call_count == 1
+        assert all(
+            partition.replication_factor == 3
+            for partition in ct.partitions.values()
+        )
+
 
 class Test_State(object):
 
@@ -318,6 +886,19 @@ class Test_State(object):
             self.ct.rgs['rg2'],
         )
 
+    def test_rgs_without_replication_group(self, create_cluster_topology):
+        """Test that brokers without a replication group are modeled in the
+        None RG.
+        """
+        ct = create_cluster_topology(
+            get_replication_group_id=lambda broker: None,
+        )
+        state = _State(ct)
+
+        assert state.rgs == (ct.rgs[None],)
+        assert state.broker_rg == (0, 0, 0, 0, 0)
+        assert state.rg_replicas == ((2, 2, 4, 4, 1, 3, 3),)
+
     def test_replicas(self):
         """Test that the state partition replica map matches the default
         assignment.
@@ -663,3 +1244,171 @@ class Test_State(object):
         assert new_state.movement_count == 0
         assert new_state.movement_size == 0
         assert new_state.leader_movement_count == 0
+
+    def test_running_cv_matches_recomputed(self):
+        """Test that the coefficients of variation kept with running sums match
+        the ones computed from scratch after a chain of mutations.
+        """
+        new_state = self.state.move(0, 1, 4) \
+            .move_leadership(2, 3) \
+            .add_replica(4, 3) \
+            .remove_replica(5, 2)
+
+        for cv, values in (
+            (new_state.broker_weight_cv, new_state.broker_weights),
+            (new_state.broker_leader_weight_cv,
+             new_state.broker_leader_weights),
+            (new_state.broker_partition_count_cv,
+             new_state.broker_partition_counts),
+            (new_state.broker_leader_count_cv,
+             new_state.broker_leader_counts),
+        ):
+            assert abs(cv - coefficient_of_variation(values)) < 1e-9
+
+    def test_running_cv_matches_recomputed_after_many_mutations(
+            self,
+            create_cluster_topology,
+            default_partition_weight,
+    ):
+        """Test that the running coefficients of variation do not drift from
+        the ones computed from scratch over a long chain of mutations with
+        weights that are not exactly representable.
+        """
+        for partition in default_partition_weight:
+            default_partition_weight[partition] /= 10
+        state = _State(create_cluster_topology())
+        rng = random.Random(0)
+
+        for _ in range(2000):
+            partition = rng.randrange(len(state.partitions))
+            replicas = state.replicas[partition]
+            if rng.random() < 0.5 and len(replicas) > 1:
+                state = state.move_leadership(
+                    partition,
+                    rng.choice(replicas[1:]),
+                )
+            else:
+                dest = rng.choice([
+                    broker for broker in range(len(state.brokers))
+                    if broker not in replicas
+                ])
+                state = state.move(partition, rng.choice(replicas), dest)
+
+            for cv, values in (
+                (state.broker_weight_cv, state.broker_weights),
+                (state.broker_leader_weight_cv, state.broker_leader_weights),
+                (state.broker_partition_count_cv,
+                 state.broker_partition_counts),
+                (state.broker_leader_count_cv, state.broker_leader_counts),
+            ):
+                assert abs(cv - coefficient_of_variation(values)) < 1e-12
+
+    def test_replicas_hash(self):
+        """Test that states with the same assignment have the same replicas
+        hash whatever mutations produced them.
+        """
+        new_state = self.state.move(0, 1, 4).move_leadership(2, 3)
+        other_state = self.state.move_leadership(2, 3).move(0, 1, 4)
+        assert new_state.replicas_hash == other_state.replicas_hash
+
+        self.ct.update_cluster_topology(new_state.assignment)
+        assert _State(self.ct).replicas_hash == new_state.replicas_hash
+        assert self.state.replicas_hash != new_state.replicas_hash
+
+    def test_move_shares_unchanged_chunks(self):
+        """Test that a derived state shares the chunks of its large sequences
+        that were not changed with its parent.
+        """
+        new_state = self.state.move(0, 1, 4)
+
+        changed = [
+            new_chunk is not chunk for new_chunk, chunk in
+            zip(new_state.replicas._chunks, self.state.replicas._chunks)
+        ]
+        assert changed.count(True) == 1
+        assert new_state.partition_weights is self.state.partition_weights
+
+    def test_encode_decode_state(self):
+        new_state = self.state.move(0, 1, 4).move_leadership(3, 2) \
+            .add_replica(2, 4)
+
+        data = _encode_state(self.state, new_state)
+        decoded = _decode_state(self.state, data)
+
+        # Partitions 0, 2 and 3 are stored with their index, count and replicas.
+        assert len(data) == 4 * ((2 + 2) + (2 + 5) + (2 + 4))
+        assert decoded.assignment == new_state.assignment
+        assert _encode_state(self.state, self.state) == b''
+
+    def test_reassign(self):
+        """Test that reassign reaches the same state as the equivalent
+        mutations.
+        """
+        new_state = self.state.reassign(3, (3, 4))
+        expected = self.state.move(3, 1, 4).move_leadership(3, 3) \
+            .remove_replica(3, 0).remove_replica(3, 2)
+
+        assert new_state.replicas[3] == (3, 4)
+        assert new_state.replicas == expected.replicas
+        assert new_state.broker_leader_counts == expected.broker_leader_counts
+        assert new_state.broker_partition_counts == \
+            expected.broker_partition_counts
+        assert new_state.rg_replicas == expected.rg_replicas
+        assert self.state.reassign(0, self.state.replicas[0]) is self.state
+
+
+class Test_ChunkedTuple(object):
+
+    def test_sequence(self):
+        items = tuple(range(10))
+        chunked = _ChunkedTuple(items)
+
+        assert len(chunked) == 10
+        assert tuple(chunked) == items
+        assert chunked[0] == 0
+        assert chunked[9] == 9
+        assert chunked[-1] == 9
+        with pytest.raises(IndexError):
+            chunked[10]
+
+    def test_equality(self):
+        chunked = _ChunkedTuple(range(10))
+
+        assert chunked == tuple(range(10))
+        assert tuple(range(10)) == chunked
+        assert chunked == list(range(10))
+        assert chunked == _ChunkedTuple(range(10))
+        assert chunked != tuple(range(9))
+        assert chunked != chunked.replace((3, 0))
+        assert hash(chunked) == hash(tuple(range(10)))
+
+    def test_alter(self):
+        chunked = _ChunkedTuple(range(10))
+        altered = chunked.alter((1, lambda x: x * 10), (8, lambda x: -x))
+
+        assert altered == (0, 10, 2, 3, 4, 5, 6, 7, -8, 9)
+        assert chunked == tuple(range(10))
+        # Only the chunks holding items 1 and 8 are copied.
+        shared = [
+            new_chunk is chunk
+            for new_chunk, chunk in zip(altered._chunks, chunked._chunks)
+        ]
+        assert shared == [False, True, False, True]
+
+    def test_replace(self):
+        chunked = _ChunkedTuple(range(5))
+
+        assert chunked.replace((0, 'a'), (4, 'b')) == ('a', 1, 2, 3, 'b')
+
+    def test_diff(self):
+        chunked = _ChunkedTuple(range(10))
+        changed = chunked.replace((1, 'a'), (8, 'b')).replace((1, 1))
+
+        assert changed.diff(chunked) == [8]
+        assert chunked.diff(chunked) == []
+
+    def test_empty(self):
+        chunked = _ChunkedTuple()
+
+        assert len(chunked) == 0
+        assert chunked == ()
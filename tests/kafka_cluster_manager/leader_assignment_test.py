@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import
+
+import six
+
+from .helper import broker_range
+from kafka_utils.kafka_cluster_manager.cluster_info.leader_assignment \
+    import assign_leaders
+
+
+def leader_counts(ct):
+    return {
+        broker.id: broker.count_preferred_replica()
+        for broker in six.itervalues(ct.brokers)
+    }
+
+
+def apply_leaders(new_leaders):
+    for partition, leader in six.iteritems(new_leaders):
+        partition.swap_leader(leader)
+
+
+class TestAssignLeaders(object):
+
+    def test_balanced(self, create_cluster_topology):
+        assignment = {
+            (u'T0', 0): ['1', '2'],
+            (u'T0', 1): ['2', '0'],
+            (u'T1', 0): ['0', '2'],
+        }
+        ct = create_cluster_topology(assignment, broker_range(3))
+
+        assert assign_leaders(
+            ct.partitions.values(),
+            ct.brokers.values(),
+        ) == {}
+
+    def test_chain_of_changes(self, create_cluster_topology):
+        # Broker 0 can only give leadership to broker 1, which has to give
+        # one of its own to broker 3, which gives one to broker 2.
+        assignment = {
+            (u'T0', 0): ['3', '2'],
+            (u'T0', 1): ['1', '3'],
+            (u'T1', 1): ['0', '1'],
+            (u'T1', 0): ['0'],
+        }
+        ct = create_cluster_topology(assignment, broker_range(4))
+
+        new_leaders = assign_leaders(ct.partitions.values(), ct.brokers.values())
+        apply_leaders(new_leaders)
+
+        assert len(new_leaders) == 3
+        assert leader_counts(ct) == {'0': 1, '1': 1, '2': 1, '3': 1}
+
+    def test_fewest_changes(self, create_cluster_topology):
+        # Every broker should lead two partitions, which a single change from
+        # broker 0 to broker 2 achieves.
+        assignment = {
+            (u'T0', 0): ['0', '1', '2'],
+            (u'T0', 1): ['0', '2'],
+            (u'T0', 2): ['0', '2'],
+            (u'T1', 0): ['1', '2'],
+            (u'T1', 1): ['1'],
+            (u'T1', 2): ['2'],
+        }
+        ct = create_cluster_topology(assignment, broker_range(3))
+
+        new_leaders = assign_leaders(ct.partitions.values(), ct.brokers.values())
+        apply_leaders(new_leaders)
+
+        assert len(new_leaders) == 1
+        assert leader_counts(ct) == {'0': 2, '1': 2, '2': 2}
+
+    def test_max_changes(self, create_cluster_topology):
+        assignment = {
+            (u'T0', 0): ['0', '1'],
+            (u'T0', 1): ['0', '2'],
+            (u'T0', 2): ['0', '3'],
+            (u'T0', 3): ['0', '1'],
+        }
+        ct = create_cluster_topology(assignment, broker_range(4))
+
+        new_leaders = assign_leaders(
+            ct.partitions.values(),
+            ct.brokers.values(),
+            max_changes=2,
+        )
+
+        assert len(new_leaders) == 2
+
+    def test_revoked_leadership(self, create_cluster_topology):
+        assignment = {
+            (u'T0', 0): ['2', '0'],
+            (u'T0', 1): ['2', '1'],
+            (u'T1', 0): ['2'],
+        }
+        ct = create_cluster_topology(assignment, broker_range(3))
+        ct.brokers['2'].mark_revoked_leadership()
+
+        new_leaders = assign_leaders(ct.partitions.values(), ct.brokers.values())
+        apply_leaders(new_leaders)
+
+        # (T1, 0) has no other replica to lead it.
+        assert leader_counts(ct) == {'0': 1, '1': 1, '2': 1}
+
+    def test_ignored_brokers(self, create_cluster_topology):
+        assignment = {
+            (u'T0', 0): ['0', '1'],
+            (u'T0', 1): ['0', '1'],
+        }
+        ct = create_cluster_topology(assignment, broker_range(2))
+
+        # Broker 1 can't lead, so nothing can change.
+        assert assign_leaders(
+            ct.partitions.values(),
+            [ct.brokers['0']],
+        ) == {}
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import
+
+from argparse import Namespace
+
+import mock
+import pytest
+import six
+
+from kafka_utils.kafka_cluster_manager.cluster_info.cluster_balancer \
+    import ClusterBalancer
+from kafka_utils.kafka_cluster_manager.cluster_info.genetic_balancer \
+    import _State
+from kafka_utils.kafka_cluster_manager.cluster_info.local_search_balancer \
+    import LocalSearchBalancer
+from kafka_utils.kafka_cluster_manager.main \
+    import LOCAL_SEARCH_BALANCER_MODULE
+from kafka_utils.util.utils import dynamic_import
+
+# A short search keeps the tests fast.
+SEARCH_ARGS = ['--max-iterations', '100', '--neighborhood-size', '5']
+
+
+class TestLocalSearchBalancer(object):
+
+    @pytest.fixture(autouse=True)
+    def _create_cluster_topology(self, create_cluster_topology):
+        """Make the create_cluster_topology fixture available as
+        self.create_cluster_topology.
+        """
+        self.create_cluster_topology = create_cluster_topology
+
+    def create_balancer(self, cluster_topology=None, **kwargs):
+        """Create a LocalSearchBalancer object."""
+        if cluster_topology is None:
+            cluster_topology = self.create_cluster_topology()
+        args = mock.Mock(spec=Namespace)
+        args.max_partition_movements = None
+        args.max_movement_size = None
+        args.max_leader_changes = None
+        args.replication_groups = False
+        args.brokers = True
+        args.leaders = True
+        args.balancer_args = []
+        args.configure_mock(**kwargs)
+        return LocalSearchBalancer(cluster_topology, args)
+
+    def rebalance(self, **kwargs):
+        """Rebalance the default cluster topology and return the original and
+        the new assignment along with the balancer.
+        """
+        ct = self.create_cluster_topology()
+        original = dict(ct.assignment)
+        balancer = self.create_balancer(ct, **kwargs)
+        balancer.rebalance()
+        return original, dict(ct.assignment), balancer
+
+    def test_dynamic_import(self):
+        """Test that --cluster-balancer finds LocalSearchBalancer and not the
+        GeneticBalancer it derives from.
+        """
+        assert dynamic_import(
+            LOCAL_SEARCH_BALANCER_MODULE,
+            ClusterBalancer,
+        ) is LocalSearchBalancer
+
+    def test_rebalance_improves_score(self):
+        original_score = self.create_balancer().score()
+        _, assignment, balancer = self.rebalance(
+            balancer_args=SEARCH_ARGS,
+        )
+
+        assert balancer.score() > original_score
+        _, other_assignment, _ = self.rebalance(
+            balancer_args=SEARCH_ARGS,
+        )
+        assert assignment == other_assignment
+
+    def test_rebalance_simulated_annealing(self):
+        original_score = self.create_balancer().score()
+        _, _, balancer = self.rebalance(
+            balancer_args=SEARCH_ARGS + [
+                '--initial-temperature', '0.01',
+                '--cooling-rate', '0.99',
+            ],
+        )
+
+        assert balancer.score() > original_score
+
+    def test_rebalance_max_partition_movements(self):
+        original, assignment, _ = self.rebalance(
+            max_partition_movements=1,
+            leaders=False,
+            balancer_args=SEARCH_ARGS,
+        )
+
+        moved = [
+            partition for partition, replicas in six.iteritems(assignment)
+            if set(replicas) != set(original[partition])
+        ]
+        assert len(moved) == 1
+
+    def test_rebalance_max_leader_changes(self):
+        original, assignment, _ = self.rebalance(
+            max_leader_changes=0,
+            brokers=False,
+            balancer_args=SEARCH_ARGS,
+        )
+
+        assert assignment == original
+
+    def test_move_partition_max_partition_movements(self):
+        balancer = self.create_balancer(max_partition_movements=1)
+        state = _State(balancer.cluster_topology).move(0, 1, 4)
+
+        assert balancer._move_partition(state) is None
+
+    def test_cooling_rate_too_large(self):
+        with pytest.raises(SystemExit):
+            self.create_balancer(balancer_args=['--cooling-rate', '1.5'])
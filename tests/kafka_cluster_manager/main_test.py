@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import
+from __future__ import absolute_import
+
+import pytest
+
+from kafka_utils.kafka_cluster_manager.main import parse_args
+
+
+class TestParseArgs(object):
+
+    @pytest.mark.parametrize('argv', [
+        ['rebalance', '--brokers'],
+        ['--genetic-balancer', 'decommission', '1'],
+        ['--min-cost-flow-balancer', 'decommission', '1'],
+        ['--genetic-balancer', 'revoke-leadership', '1'],
+        ['set_replication_factor', '--topic', 'T0', '3'],
+    ])
+    def test_columnar_topology_unsupported(self, argv, capsys):
+        with pytest.raises(SystemExit):
+            parse_args(['--cluster-type', 'test', '--columnar-topology'] + argv)
+
+        _, err = capsys.readouterr()
+        assert '--columnar-topology does not support' in err
+
+    @pytest.mark.parametrize('argv', [
+        ['--genetic-balancer', 'rebalance', '--brokers'],
+        ['--local-search-balancer', 'rebalance', '--brokers'],
+        ['--min-cost-flow-balancer', 'set_replication_factor', '--topic',
+         'T0', '3'],
+        ['revoke-leadership', '1'],
+        ['stats'],
+        ['--genetic-balancer', 'stats'],
+        ['store_assignments'],
+        ['replace-broker', '--source-broker', '1', '--dest-broker', '2'],
+    ])
+    def test_columnar_topology_supported(self, argv):
+        args = parse_args(
+            ['--cluster-type', 'test', '--columnar-topology'] + argv,
+        )
+
+        assert args.columnar_topology
+
+    def test_default_topology(self):
+        args = parse_args(['--cluster-type', 'test', 'decommission', '1'])
+
+        assert not args.columnar_topology
@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import
+
+import random
+from argparse import Namespace
+
+import mock
+import pytest
+import six
+
+from kafka_utils.kafka_cluster_manager.cluster_info.cluster_balancer \
+    import ClusterBalancer
+from kafka_utils.kafka_cluster_manager.cluster_info.min_cost_flow_balancer \
+    import _broker_enter_costs
+from kafka_utils.kafka_cluster_manager.cluster_info.min_cost_flow_balancer \
+    import _broker_leave_costs
+from kafka_utils.kafka_cluster_manager.cluster_info.min_cost_flow_balancer \
+    import _distance_bands
+from kafka_utils.kafka_cluster_manager.cluster_info.min_cost_flow_balancer \
+    import MinCostFlowBalancer
+from kafka_utils.kafka_cluster_manager.main \
+    import MIN_COST_FLOW_BALANCER_MODULE
+from kafka_utils.util.utils import dynamic_import
+
+
+class TestMinCostFlowBalancer(object):
+
+    @pytest.fixture(autouse=True)
+    def _create_cluster_topology(self, create_cluster_topology):
+        """Make the create_cluster_topology fixture available as
+        self.create_cluster_topology.
+        """
+        self.create_cluster_topology = create_cluster_topology
+
+    def create_balancer(self, cluster_topology, **kwargs):
+        """Create a MinCostFlowBalancer object."""
+        args = mock.Mock(spec=Namespace)
+        args.max_partition_movements = None
+        args.max_movement_size = None
+        args.max_leader_changes = None
+        args.replication_groups = False
+        args.brokers = True
+        args.leaders = False
+        args.balancer_args = []
+        args.configure_mock(**kwargs)
+        return MinCostFlowBalancer(cluster_topology, args)
+
+    def rebalance(self, assignment=None, **kwargs):
+        """Rebalance a cluster topology and return the original and the new
+        assignment along with the cluster topology.
+        """
+        ct = self.create_cluster_topology(assignment)
+        original = dict(ct.assignment)
+        self.create_balancer(ct, **kwargs).rebalance()
+        return original, dict(ct.assignment), ct
+
+    def moved_partitions(self, original, assignment):
+        return [
+            partition for partition, replicas in six.iteritems(assignment)
+            if set(replicas) != set(original[partition])
+        ]
+
+    def test_dynamic_import(self):
+        """Test that --cluster-balancer finds MinCostFlowBalancer and not the
+        GeneticBalancer it derives from.
+        """
+        assert dynamic_import(
+            MIN_COST_FLOW_BALANCER_MODULE,
+            ClusterBalancer,
+        ) is MinCostFlowBalancer
+
+    def test_rebalance_balances_brokers(self):
+        assignment = {
+            (u'T0', 0): ['0', '1'],
+            (u'T0', 1): ['0', '1'],
+            (u'T1', 0): ['0', '1'],
+            (u'T1', 1): ['0', '2'],
+            (u'T2', 0): ['0', '2'],
+        }
+        original, new_assignment, ct = self.rebalance(assignment)
+
+        counts = [len(broker.partitions) for broker in ct.brokers.values()]
+        # 10 replicas over brokers 0 to 4.
+        assert sorted(counts) == [2, 2, 2, 2, 2]
+        assert all(
+            len(set(replicas)) == len(replicas)
+            for replicas in new_assignment.values()
+        )
+        # Broker 0 gives away 3 replicas and broker 1 gives away 1.
+        assert len(self.moved_partitions(original, new_assignment)) == 4
+
+    def test_rebalance_keeps_leaders(self):
+        assignment = {
+            (u'T0', 0): ['0', '1'],
+            (u'T0', 1): ['0', '1'],
+            (u'T1', 0): ['0', '1'],
+        }
+        original, new_assignment, _ = self.rebalance(assignment)
+
+        for partition, replicas in six.iteritems(new_assignment):
+            if original[partition][0] in replicas:
+                assert replicas[0] == original[partition][0]
+
+    def test_rebalance_leaders(self):
+        assignment = {
+            (u'T0', 0): ['0', '1'],
+            (u'T0', 1): ['0', '2'],
+            (u'T1', 0): ['0', '3'],
+            (u'T1', 1): ['0', '4'],
+            (u'T2', 0): ['0', '1'],
+        }
+        _, new_assignment, ct = self.rebalance(
+            assignment,
+            brokers=False,
+            leaders=True,
+        )
+
+        leader_counts = [
+            broker.count_preferred_replica() for broker in ct.brokers.values()
+        ]
+        assert sorted(leader_counts) == [1, 1, 1, 1, 1]
+
+    def test_rebalance_max_leader_changes(self):
+        # Broker 0 leads every partition and gives away 3 of its replicas,
+        # changing their leaders and using up the leader changes before the
+        # leaders are balanced.
+        assignment = {
+            (u'T0', 0): ['0', '1'],
+            (u'T0', 1): ['0', '1'],
+            (u'T1', 0): ['0', '1'],
+            (u'T1', 1): ['0', '2'],
+            (u'T2', 0): ['0', '2'],
+        }
+        original, new_assignment, _ = self.rebalance(
+            assignment,
+            leaders=True,
+            max_leader_changes=3,
+        )
+
+        leader_changes = [
+            partition for partition, replicas in six.iteritems(new_assignment)
+            if replicas[0] != original[partition][0]
+        ]
+        assert len(leader_changes) == 3
+
+    def test_rebalance_balanced_cluster(self):
+        assignment = {
+            (u'T0', 0): ['0', '1'],
+            (u'T0', 1): ['2', '3'],
+            (u'T1', 0): ['4', '0'],
+            (u'T1', 1): ['1', '2'],
+            (u'T2', 0): ['3', '4'],
+        }
+        original, new_assignment, _ = self.rebalance(assignment)
+
+        assert new_assignment == original
+
+    def test_rebalance_max_partition_movements(self):
+        assignment = {
+            (u'T0', 0): ['0', '1'],
+            (u'T0', 1): ['0', '1'],
+            (u'T1', 0): ['0', '1'],
+            (u'T1', 1): ['0', '2'],
+            (u'T2', 0): ['0', '2'],
+        }
+        original, new_assignment, _ = self.rebalance(
+            assignment,
+            max_partition_movements=2,
+        )
+
+        assert len(self.moved_partitions(original, new_assignment)) == 2
+
+    def test_rebalance_max_movement_size(self, default_partition_size):
+        # The replicas of T0 are the first candidates to move but too large
+        # to fit in the movement size limit. Smaller replicas are moved
+        # instead.
+        default_partition_size[(u'T0', 0)] = 12
+        default_partition_size[(u'T0', 1)] = 12
+        assignment = {
+            (u'T0', 0): ['0'],
+            (u'T0', 1): ['0'],
+            (u'T1', 0): ['0'],
+            (u'T1', 1): ['0'],
+            (u'T2', 0): ['0'],
+        }
+        original, new_assignment, ct = self.rebalance(
+            assignment,
+            max_movement_size=11,
+        )
+
+        moved = self.moved_partitions(original, new_assignment)
+        assert sorted(moved) == [(u'T1', 0), (u'T1', 1)]
+
+    def test_rebalance_replication_groups(self):
+        # Replication group rg1 holds brokers 0, 1 and 4 and rg2 holds brokers
+        # 2 and 3.
+        original, new_assignment, ct = self.rebalance(replication_groups=True)
+
+        for partition in ct.partitions.values():
+            counts = sorted(
+                rg.count_replica(partition) for rg in ct.rgs.values()
+            )
+            assert counts[-1] - counts[0] <= 1
+        assert all(
+            len(set(replicas)) == len(replicas)
+            for replicas in new_assignment.values()
+        )
+
+    def test_rebalance_spreads_topics(self):
+        # Every topic has a replica on every broker except T4, whose replicas
+        # are all on broker 0. The replicas moved off broker 0 must be those
+        # of T4.
+        assignment = {
+            (u'T{0}'.format(topic), partition): [str(partition)]
+            for topic in range(4)
+            for partition in range(5)
+        }
+        assignment.update({(u'T4', partition): ['0'] for partition in range(5)})
+        original, new_assignment, ct = self.rebalance(assignment)
+
+        for topic in ct.topics.values():
+            assert sorted(
+                broker.id for partition in topic.partitions
+                for broker in partition.replicas
+            ) == ['0', '1', '2', '3', '4']
+        assert len(self.moved_partitions(original, new_assignment)) == 4
+
+    def test_rebalance_does_not_lower_score(self):
+        rand = random.Random(0)
+        assignment = {
+            (u'T{0}'.format(topic), partition):
+                rand.sample(['0', '1', '2', '3', '4'], 2)
+            for topic in range(4)
+            for partition in range(10)
+        }
+        ct = self.create_cluster_topology(assignment)
+        balancer = self.create_balancer(ct)
+        score = balancer.score()
+
+        balancer.rebalance()
+
+        assert balancer.score() >= score
+
+    def test_broker_costs(self):
+        assert _broker_leave_costs(7, 3, 4) == [(2, -2), (1, -1), (1, 0)]
+        assert _broker_leave_costs(4, 3, 4) == [(1, 0)]
+        assert _broker_leave_costs(3, 3, 4) == []
+        assert _broker_enter_costs(0, 3, 4) == [(2, -2), (1, -1), (1, 0)]
+        assert _broker_enter_costs(4, 3, 4) == []
+
+    def test_distance_bands(self):
+        assert _distance_bands(0) == []
+        assert _distance_bands(1) == [(1, 1)]
+        assert _distance_bands(7) == [(4, 4), (2, 2), (1, 1)]
+        assert _distance_bands(9) == [(2, 8), (4, 4), (2, 2), (1, 1)]
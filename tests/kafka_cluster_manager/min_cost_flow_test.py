@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import
+
+import pytest
+
+from kafka_utils.kafka_cluster_manager.cluster_info.min_cost_flow \
+    import MinCostFlow
+
+
+class TestMinCostFlow(object):
+
+    def test_augment_cheapest_path(self):
+        flow = MinCostFlow(4)
+        cheap = flow.add_edge(0, 2, 1, -5)
+        expensive = flow.add_edge(0, 3, 1, -1)
+        flow.add_edge(2, 1, 2, 0)
+        flow.add_edge(3, 1, 2, 2)
+
+        assert flow.augment(0, 1, lambda path, units: units) == 1
+        assert flow.edge_flow(cheap) == 1
+        assert flow.edge_flow(expensive) == 0
+
+    def test_augment_multiple_units(self):
+        # The second unit of flow takes the more expensive edge since the
+        # cheaper one is full.
+        flow = MinCostFlow(5)
+        flow.add_edge(0, 2, 2, -10)
+        top = flow.add_edge(2, 3, 1, 0)
+        bottom = flow.add_edge(2, 4, 1, 3)
+        flow.add_edge(3, 1, 1, 0)
+        flow.add_edge(4, 1, 1, 0)
+
+        assert flow.augment(0, 1, lambda path, units: units) == 2
+        assert flow.edge_flow(top) == 1
+        assert flow.edge_flow(bottom) == 1
+
+    def test_augment_stops_at_non_negative_cost(self):
+        flow = MinCostFlow(3)
+        flow.add_edge(0, 2, 3, -1)
+        flow.add_edge(2, 1, 1, 0)
+        flow.add_edge(2, 1, 2, 1)
+
+        assert flow.augment(0, 1, lambda path, units: units) == 1
+
+    def test_augment_rejected_path(self):
+        # The cheapest path is rejected, so the flow takes the next one.
+        flow = MinCostFlow(4)
+        flow.add_edge(0, 2, 1, -5)
+        rejected = flow.add_edge(2, 1, 1, 0)
+        flow.add_edge(0, 3, 1, -3)
+        accepted = flow.add_edge(3, 1, 1, 0)
+
+        def accept(path, units):
+            if rejected in path:
+                flow.block_edge(rejected)
+                return 0
+            return units
+
+        assert flow.augment(0, 1, accept) == 1
+        assert flow.edge_flow(rejected) == 0
+        assert flow.edge_flow(accepted) == 1
+
+    def test_augment_rejected_path_must_block_an_edge(self):
+        flow = MinCostFlow(3)
+        flow.add_edge(0, 2, 1, -1)
+        flow.add_edge(2, 1, 1, 0)
+
+        with pytest.raises(ValueError):
+            flow.augment(0, 1, lambda path, units: 0)
+
+    def test_augment_stopped(self):
+        flow = MinCostFlow(3)
+        flow.add_edge(0, 2, 3, -1)
+        flow.add_edge(2, 1, 3, 0)
+
+        assert flow.augment(0, 1, lambda path, units: None) == 0
+
+    def test_augment_bottleneck_capacity(self):
+        flow = MinCostFlow(3)
+        flow.add_edge(0, 2, 5, -1)
+        edge = flow.add_edge(2, 1, 3, 0)
+        units = []
+
+        def accept(path, path_units):
+            units.append(path_units)
+            return path_units
+
+        assert flow.augment(0, 1, accept) == 3
+        assert units == [3]
+        assert flow.edge_flow(edge) == 3
+
+    def test_add_node(self):
+        flow = MinCostFlow()
+        source = flow.add_node()
+        sink = flow.add_node()
+        flow.add_edge(source, sink, 2, -1)
+
+        assert (source, sink) == (0, 1)
+        assert flow.augment(source, sink, lambda path, units: units) == 2
@@ -388,6 +388,81 @@ class TestPartitionCountBalancer(object):
         # Verify minimum partition movements 2
         assert total_movements == 2
 
+    @pytest.mark.parametrize('decommissioned', [[], ['1']])
+    def test_rebalance_brokers_workers(
+            self,
+            create_balancer,
+            create_cluster_topology,
+            decommissioned,
+    ):
+        # rg1: brokers 0, 1, 4 and 7, rg2: brokers 2 and 3
+        assignment = {
+            (u'T{0}'.format(topic), partition): ['0', '1', '2']
+            for topic in range(3)
+            for partition in range(4)
+        }
+        brokers = broker_range(8)
+        assignments = []
+        for workers in (1, 2):
+            ct = create_cluster_topology(assignment, brokers)
+            for broker_id in decommissioned:
+                ct.brokers[broker_id].mark_decommissioned()
+            cb = create_balancer(
+                ct,
+                balancer_args=['--workers {0}'.format(workers)],
+            )
+            cb.rebalance_brokers()
+            assignments.append(ct.assignment)
+
+        # The brokers of each replication group are balanced and the result
+        # doesn't depend on the number of workers.
+        assert assignments[0] == assignments[1]
+        for broker_id in decommissioned:
+            assert ct.brokers[broker_id].empty()
+        for rg in ct.rgs.values():
+            counts = [
+                len(broker.partitions) for broker in rg.brokers
+                if not broker.decommissioned
+            ]
+            assert max(counts) - min(counts) <= 1
+
+    def test_rebalance_workers_weighted_replication_groups(
+            self,
+            create_balancer,
+            create_cluster_topology,
+            default_partition_weight,
+    ):
+        # rg1: brokers 0, 1, 4 and 7, rg2: brokers 2 and 3, rg3: broker 5 and
+        # rg4: broker 6. The replicas of most partitions span several groups.
+        # The replicas aren't moved across groups, since --workers only
+        # applies to rebalancing the brokers within each group.
+        assignment = {}
+        for topic in range(4):
+            for partition in range(5):
+                name = (u'T{0}'.format(topic), partition)
+                assignment[name] = [
+                    str((topic + partition) % 3),
+                    str(3 + (topic * partition) % 5),
+                ]
+                default_partition_weight[name] = 1 + 7 * topic + partition
+        plans = []
+        for workers in (1, 3):
+            ct = create_cluster_topology(assignment, broker_range(8))
+            cb = create_balancer(
+                ct,
+                replication_groups=False,
+                brokers=True,
+                leaders=True,
+                max_movement_size=None,
+                max_leader_changes=None,
+                balancer_args=['--workers {0}'.format(workers)],
+            )
+            cb.rebalance()
+            plans.append(ct.assignment)
+
+        assert plans[0] != assignment
+        assert plans[0] == plans[1]
+
     # Tests for leader-balancing
     def test_rebalance_leaders_balanced_case1(
             self,
@@ -15,11 +15,14 @@
 from __future__ import absolute_import
 
 import pytest
+from mock import Mock
 from mock import sentinel
 
+from kafka_utils.kafka_cluster_manager.cluster_info.broker import Broker
 from kafka_utils.kafka_cluster_manager.cluster_info.error \
     import InvalidPartitionMeasurementError
 from kafka_utils.kafka_cluster_manager.cluster_info.partition import Partition
+from kafka_utils.kafka_cluster_manager.cluster_info.topic import Topic
 
 
 class TestPartition(object):
@@ -36,6 +39,23 @@ class TestPartition(object):
             3,
         )
 
+    @pytest.fixture
+    def brokers(self):
+        return [Mock(spec=Broker), Mock(spec=Broker), Mock(spec=Broker)]
+
+    @pytest.fixture
+    def tracked_partition(self, brokers):
+        """A partition whose topic and replicas record the changes reported
+        to them.
+        """
+        return Partition(
+            Mock(spec=Topic, id='t1'),
+            0,
+            brokers[:2],
+            2,
+            3,
+        )
+
     def test_name(self, partition):
         assert partition.name == ('t1', 0)
 
@@ -72,20 +92,64 @@ class TestPartition(object):
     def test_partition_id(self, partition):
         assert partition.partition_id == 0
 
-    def test_add_replica(self, partition):
-        new_broker = sentinel.new_r
-        partition.add_replica(new_broker)
-        assert partition.replicas == [sentinel.r1, sentinel.r2, sentinel.new_r]
+    def test_add_replica(self, tracked_partition, brokers):
+        new_broker = brokers[2]
+        tracked_partition.add_replica(new_broker)
+        assert tracked_partition.replicas == brokers
+        tracked_partition.topic.add_replica.assert_called_once_with(
+            tracked_partition,
+        )
+        assert not new_broker.add_leadership.called
+
+    def test_add_first_replica(self, brokers):
+        partition = Partition(Mock(spec=Topic, id='t1'), 0)
+        partition.add_replica(brokers[0])
+
+        brokers[0].add_leadership.assert_called_once_with(partition)
+
+    def test_add_replica_leader(self, tracked_partition, brokers):
+        tracked_partition.add_replica(brokers[2], 0)
+
+        assert tracked_partition.replicas == [brokers[2]] + brokers[:2]
+        brokers[0].remove_leadership.assert_called_once_with(tracked_partition)
+        brokers[2].add_leadership.assert_called_once_with(tracked_partition)
+
+    def test_add_replica_follower(self, tracked_partition, brokers):
+        tracked_partition.add_replica(brokers[2], 1)
+
+        assert tracked_partition.replicas == \
+            [brokers[0], brokers[2], brokers[1]]
+        assert not brokers[0].remove_leadership.called
+        assert not brokers[2].add_leadership.called
+
+    def test_remove_replica_leader(self, tracked_partition, brokers):
+        assert tracked_partition.remove_replica(brokers[0]) == 0
+
+        assert tracked_partition.replicas == [brokers[1]]
+        tracked_partition.topic.remove_replica.assert_called_once_with(
+            tracked_partition,
+        )
+        brokers[0].remove_leadership.assert_called_once_with(tracked_partition)
+        brokers[1].add_leadership.assert_called_once_with(tracked_partition)
+
+    def test_remove_replica_follower(self, tracked_partition, brokers):
+        assert tracked_partition.remove_replica(brokers[1]) == 1
+
+        assert tracked_partition.replicas == [brokers[0]]
+        assert not brokers[0].remove_leadership.called
 
-    def test_swap_leader(self, partition):
-        b = sentinel.r2
-        old_replicas = partition.replicas
-        partition.swap_leader(b)
+    def test_swap_leader(self, tracked_partition, brokers):
+        b = brokers[1]
+        old_replicas = list(tracked_partition.replicas)
+        tracked_partition.swap_leader(b)
 
         # Verify leader changed to b
-        assert partition.leader == b
+        assert tracked_partition.leader == b
         # Verify that replica set remains same
-        assert sorted(old_replicas, key=id) == sorted(partition.replicas, key=id)
+        assert sorted(old_replicas, key=id) == \
+            sorted(tracked_partition.replicas, key=id)
+        brokers[0].remove_leadership.assert_called_once_with(tracked_partition)
+        b.add_leadership.assert_called_once_with(tracked_partition)
 
     def test_followers_1(self, partition):
         # Case:1 With followers
@@ -115,8 +179,10 @@ class TestPartition(object):
         p_group = []
         assert p1.count_siblings(p_group) == 0
 
-    def test_replace(self, partition):
-        curr_broker = partition.replicas[0]
-        partition.replace(curr_broker, sentinel.new_broker)
+    def test_replace(self, tracked_partition, brokers):
+        curr_broker = tracked_partition.replicas[0]
+        tracked_partition.replace(curr_broker, brokers[2])
 
-        assert partition.replicas[0] == sentinel.new_broker
+        assert tracked_partition.replicas[0] == brokers[2]
+        curr_broker.remove_leadership.assert_called_once_with(tracked_partition)
+        brokers[2].add_leadership.assert_called_once_with(tracked_partition)
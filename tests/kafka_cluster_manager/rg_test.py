@@ -14,6 +14,8 @@
 # limitations under the License.
 from __future__ import absolute_import
 
+import sys
+
 import pytest
 from mock import Mock
 from mock import sentinel
@@ -310,6 +312,9 @@ class TestReplicationGroup(object):
 
         assert sorted(expected, key=id) == sorted(rg.partitions, key=id)
 
+    def test_partition_count(self, rg_unbalanced):
+        assert rg_unbalanced.partition_count == len(rg_unbalanced.partitions)
+
     def test_acquire_partition(self, create_partition):
         p10 = create_partition('t1', 0)
         p11 = create_partition('t1', 1)
@@ -414,6 +419,30 @@ class TestReplicationGroup(object):
         assert rg.count_replica(p13) == 1
         assert rg.count_replica(create_partition('t1', 4)) == 0
 
+    def test_replica_counts_follow_partition_changes(self, create_partition):
+        p10 = create_partition('t1', 0)
+        p11 = create_partition('t1', 1)
+        b1 = create_broker('b1', [p10, p11])
+        b2 = create_broker('b2', [p10])
+        b3 = create_broker('b3', [])
+        rg = ReplicationGroup('test_rg', set([b1, b2]))
+        b1.replication_group = rg
+        b2.replication_group = rg
+
+        assert rg.count_replica(p10) == 2
+        b1.move_partition(p10, b3)
+        b2.add_partition(p11)
+        assert rg.count_replica(p10) == 1
+        assert rg.count_replica(p11) == 2
+
+        rg.add_broker(b3)
+        b3.replication_group = rg
+        assert rg.count_replica(p10) == 2
+        assert sorted(rg.partitions, key=id) == sorted(
+            [p10, p10, p11, p11],
+            key=id,
+        )
+
     def test__select_broker_pair(self, create_partition):
         p10 = create_partition('t1', 0)
         p11 = create_partition('t1', 1)
@@ -563,7 +592,7 @@ class TestReplicationGroup(object):
         }
         actual = rg.generate_sibling_distance()
 
-        assert dict(actual) == expected
+        assert self._distances(actual, [b1, b2, b3], [t1, t2, t3]) == expected
 
     def test_update_sibling_count(self):
         t1 = Topic('topic1', 2)
@@ -581,25 +610,54 @@ class TestReplicationGroup(object):
         b2 = create_broker('b2', [p12, p21, p22])
         b3 = create_broker('b3', [p10, p11, p22])
         rg = ReplicationGroup('rg', set([b1, b2, b3]))
-        sibling_distance = {
-            b2: {
-                b1: {t1: -1, t2: 0, t3: -2},
-                b3: {t1: 1, t2: -1, t3: -2}
-            },
-        }
+        sibling_distance = rg.generate_sibling_distance()
         # Move a p10 from b1 to b2
         b1.move_partition(p10, b2)
+        sibling_distance.move(t1, b1, b2)
 
-        # NOTE: b2: b1: t1: -1 -> 1 and b2: b3: t1: 1 -> 0
+        # NOTE: b2: b1: t1: -1 -> 1 and b2: b3: t1: -1 -> 0. The distances
+        # from b2 change as well.
         expected = {
-            b2: {
-                b1: {t1: 1, t2: 0, t3: -2},
-                b3: {t1: 0, t2: -1, t3: -2},
-            },
+            b1: {b2: {t1: -1, t2: 0, t3: 2}, b3: {t1: -1, t2: 1, t3: 2}},
+            b2: {b1: {t1: 1, t2: 0, t3: -2}, b3: {t1: 0, t2: 1, t3: 0}},
+            b3: {b1: {t1: 1, t2: -1, t3: -2}, b2: {t1: 0, t2: -1, t3: 0}},
         }
-        actual = rg.update_sibling_distance(sibling_distance, b2, t1)
 
-        assert dict(actual) == expected
+        assert self._distances(
+            sibling_distance,
+            [b1, b2, b3],
+            [t1, t2, t3],
+        ) == expected
+        assert sibling_distance.min_distance(b1) == -2
+        assert sibling_distance.min_distance(b2) == -2
+
+    def test_sibling_distance_best_partition(self):
+        t1 = Topic('topic1', 2)
+        t2 = Topic('topic2', 2)
+        p10 = create_and_attach_partition(t1, 0)
+        p11 = create_and_attach_partition(t1, 1)
+        p20 = create_and_attach_partition(t2, 0)
+        b1 = create_broker('b1', [p10, p11, p20])
+        b2 = create_broker('b2', [p10, p20])
+        rg = ReplicationGroup('rg', set([b1, b2]))
+        sibling_distance = rg.generate_sibling_distance()
+
+        # p10 and p20 are already in b2, so p11 is the only candidate.
+        assert sibling_distance.best_partition(b1, b2, sys.maxsize) == (-1, p11)
+        assert sibling_distance.best_partition(b1, b2, -1) == (None, None)
+        assert sibling_distance.best_partition(b2, b1, sys.maxsize) == (None, None)
+
+    def _distances(self, sibling_distance, brokers, topics):
+        return {
+            dest: {
+                source: {
+                    topic: sibling_distance.distance(dest, source, topic)
+                    for topic in topics
+                }
+                for source in brokers if source is not dest
+            }
+            for dest in brokers
+        }
 
     def test_rebalance_brokers_for_topic_partition_imbalance(self, create_partition):
         # Broker Topics:Partition
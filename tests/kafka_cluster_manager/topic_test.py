@@ -18,6 +18,7 @@ import pytest
 from mock import Mock
 from mock import sentinel
 
+from kafka_utils.kafka_cluster_manager.cluster_info.broker import Broker
 from kafka_utils.kafka_cluster_manager.cluster_info.partition import Partition
 from kafka_utils.kafka_cluster_manager.cluster_info.topic import Topic
 
@@ -52,3 +53,19 @@ class TestTopic(object):
         new_partition = Mock(spec=Partition, replicas=[sentinel.r2])
         topic.add_partition(new_partition)
         assert topic.partitions == mock_partitions | set([new_partition])
+
+    def test_weight(self):
+        topic = Topic('t0', 2)
+        p0 = Partition(topic, 0, weight=2)
+        p1 = Partition(topic, 1, weight=3)
+        topic.add_partition(p0)
+        p0.add_replica(Mock(spec=Broker))
+        p0.add_replica(Mock(spec=Broker))
+
+        assert topic.weight == 4
+
+        topic.add_partition(p1)
+        p1.add_replica(Mock(spec=Broker))
+        p0.remove_replica(p0.replicas[0])
+
+        assert topic.weight == 5
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import
+
+from collections import namedtuple
+
+import mock
+import pytest
+from kazoo.exceptions import NoNodeError
+
+from kafka_utils.util.cluster_snapshot import ClusterSnapshotCache
+from kafka_utils.util.serialization import dump_json
+from kafka_utils.util.zookeeper import ZK
+
+
+ZnodeStat = namedtuple('ZnodeStat', ['mzxid', 'cversion', 'pzxid'])
+
+
+class FakeZK(object):
+    """Serve the broker and topic znodes of a cluster, counting the nodes
+    whose data is read.
+    """
+
+    def __init__(self, brokers, topics):
+        self.zxid = 0
+        self.nodes = {}
+        self.parents = {
+            '/brokers/ids': ZnodeStat(0, 0, 0),
+            '/brokers/topics': ZnodeStat(0, 0, 0),
+        }
+        for broker_id, metadata in brokers.items():
+            self.set('/brokers/ids/{0}'.format(broker_id), metadata)
+        for topic, partitions in topics.items():
+            self.set_topic(topic, partitions)
+        self.reads = []
+
+    def set(self, path, value):
+        self.zxid += 1
+        parent = path.rsplit('/', 1)[0]
+        if path not in self.nodes:
+            stat = self.parents[parent]
+            self.parents[parent] = ZnodeStat(
+                stat.mzxid, stat.cversion + 1, self.zxid,
+            )
+        self.nodes[path] = (dump_json(value), self.zxid)
+
+    def set_topic(self, topic, partitions):
+        self.set(
+            '/brokers/topics/{0}'.format(topic),
+            {'version': 1, 'partitions': partitions},
+        )
+
+    def delete(self, path):
+        self.zxid += 1
+        del self.nodes[path]
+        parent = path.rsplit('/', 1)[0]
+        stat = self.parents[parent]
+        self.parents[parent] = ZnodeStat(
+            stat.mzxid, stat.cversion + 1, self.zxid,
+        )
+
+    def get_children_with_stat(self, path):
+        children = [
+            node.rsplit('/', 1)[1] for node in sorted(self.nodes)
+            if node.rsplit('/', 1)[0] == path
+        ]
+        return children, self.parents[path]
+
+    def get_stats(self, paths):
+        return [
+            ZnodeStat(self.nodes[path][1], 0, 0) if path in self.nodes
+            else None
+            for path in paths
+        ]
+
+    def get_many(self, paths):
+        self.reads.extend(paths)
+        return [
+            (self.nodes[path][0], ZnodeStat(self.nodes[path][1], 0, 0))
+            if path in self.nodes else None
+            for path in paths
+        ]
+
+
+class TestClusterSnapshotCache(object):
+
+    @pytest.fixture
+    def zk(self):
+        return FakeZK(
+            {1: {'host': 'host1'}, 2: {'host': 'host2'}},
+            {
+                'T0': {'0': [1, 2], '1': [2, 1]},
+                'T1': {'0': [1]},
+            },
+        )
+
+    @pytest.fixture
+    def cache(self, tmpdir):
+        return ClusterSnapshotCache(str(tmpdir.join('snapshot')), 'zk:2181')
+
+    def test_first_run(self, zk, cache):
+        brokers, assignment = cache.get_brokers_and_assignment(zk)
+
+        assert brokers == {1: {'host': 'host1'}, 2: {'host': 'host2'}}
+        assert assignment == {
+            (u'T0', 0): [1, 2],
+            (u'T0', 1): [2, 1],
+            (u'T1', 0): [1],
+        }
+        assert len(zk.reads) == 4
+
+    def test_unchanged(self, zk, cache):
+        expected = cache.get_brokers_and_assignment(zk)
+        zk.reads = []
+
+        assert cache.get_brokers_and_assignment(zk) == expected
+        assert zk.reads == []
+
+    def test_changed_topics(self, zk, cache):
+        cache.get_brokers_and_assignment(zk)
+        zk.reads = []
+        zk.set_topic('T0', {'0': [2, 1], '1': [2, 1]})
+        zk.set_topic('T2', {'0': [2]})
+        zk.delete('/brokers/topics/T1')
+
+        _, assignment = cache.get_brokers_and_assignment(zk)
+
+        assert assignment == {
+            (u'T0', 0): [2, 1],
+            (u'T0', 1): [2, 1],
+            (u'T2', 0): [2],
+        }
+        assert sorted(zk.reads) == [
+            '/brokers/topics/T0',
+            '/brokers/topics/T2',
+        ]
+
+    def test_changed_brokers(self, zk, cache):
+        cache.get_brokers_and_assignment(zk)
+        zk.reads = []
+        zk.set('/brokers/ids/3', {'host': 'host3'})
+
+        brokers, _ = cache.get_brokers_and_assignment(zk)
+
+        assert brokers == {
+            1: {'host': 'host1'},
+            2: {'host': 'host2'},
+            3: {'host': 'host3'},
+        }
+        assert sorted(zk.reads) == [
+            '/brokers/ids/1',
+            '/brokers/ids/2',
+            '/brokers/ids/3',
+        ]
+
+    def test_other_cluster(self, zk, cache):
+        cache.get_brokers_and_assignment(zk)
+        zk.reads = []
+        other_cache = ClusterSnapshotCache(cache.path, 'other:2181')
+
+        other_cache.get_brokers_and_assignment(zk)
+
+        assert len(zk.reads) == 4
+
+    def test_corrupt_snapshot(self, zk, cache):
+        with open(cache.path, 'w') as snapshot_file:
+            snapshot_file.write('not a snapshot')
+
+        _, assignment = cache.get_brokers_and_assignment(zk)
+
+        assert len(assignment) == 3
+
+
+@mock.patch(
+    'kafka_utils.util.zookeeper.KazooClient',
+    autospec=True
+)
+class TestZKPipelined(object):
+
+    def test_get_many_missing_node(self, mock_client):
+        with ZK(mock.Mock(zookeeper='some_ip')) as zk:
+            found = mock.Mock()
+            found.get.return_value = (b'{}', 'stat')
+            missing = mock.Mock()
+            missing.get.side_effect = NoNodeError
+            zk.zk.get_async.side_effect = [found, missing]
+
+            assert zk.get_many(['/a', '/b']) == [(b'{}', 'stat'), None]